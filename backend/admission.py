@@ -0,0 +1,159 @@
+import threading
+import time
+from flask import jsonify, request
+
+# Route classes, keyed by Flask endpoint name. Anything not listed is "normal".
+CRITICAL_ENDPOINTS = {
+    'orders.create_order',
+    'orders.update_order_status',
+}
+
+LOW_PRIORITY_ENDPOINTS = {
+    'orders.get_all_orders',
+    'products.get_products',
+    'products.get_product',
+    'serve_static',
+    'test_cors',
+    'loyalty.cors_test',
+    'metrics',
+}
+
+# Long polls hold their slot for seconds, so they get a lane of their own
+POLL_ENDPOINTS = {
+    'orders.poll_order',
+    'qr_order.poll_table_orders',
+}
+
+LANES = ('critical', 'normal', 'low', 'poll')
+
+
+class AdmissionController:
+    """Bounds in-flight requests per worker and sheds low-priority traffic first.
+
+    Critical requests (order placement, kitchen status updates) may use every
+    slot. Normal requests may not touch the slots reserved for critical ones,
+    and low-priority requests are additionally capped on their own. Long
+    polls only count against their own cap, so held polls never take slots
+    from ordering or browsing. A request that cannot get a slot within the
+    queue timeout gets a 503 with Retry-After. Limits are per worker
+    process, so they only matter with threaded (gthread) or multi-threaded
+    dev servers.
+    """
+
+    def __init__(self, app=None):
+        self.max_in_flight = 32
+        self.reserved_critical = 8
+        self.low_priority_limit = 8
+        self.poll_limit = 16
+        self.queue_timeout = 0.5
+        self.retry_after = 2
+        self._cond = threading.Condition()
+        self._in_flight = dict.fromkeys(LANES, 0)
+        self._counters = {
+            lane: {"admitted": 0, "shed": 0, "queued": 0, "queue_wait_total": 0.0, "queue_wait_max": 0.0}
+            for lane in LANES
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_in_flight = app.config.get('ADMISSION_MAX_IN_FLIGHT', self.max_in_flight)
+        self.reserved_critical = app.config.get('ADMISSION_RESERVED_CRITICAL', self.reserved_critical)
+        self.low_priority_limit = app.config.get('ADMISSION_LOW_PRIORITY_LIMIT', self.low_priority_limit)
+        self.poll_limit = app.config.get('ADMISSION_POLL_LIMIT', self.poll_limit)
+        self.queue_timeout = app.config.get('ADMISSION_QUEUE_TIMEOUT', self.queue_timeout)
+        self.retry_after = app.config.get('ADMISSION_RETRY_AFTER', self.retry_after)
+
+        app.extensions['admission'] = self
+        if app.config.get('ADMISSION_ENABLED', True):
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+
+    def route_class(self, endpoint):
+        if endpoint in CRITICAL_ENDPOINTS:
+            return 'critical'
+        if endpoint in POLL_ENDPOINTS:
+            return 'poll'
+        if endpoint in LOW_PRIORITY_ENDPOINTS or (endpoint or '').startswith('admin.'):
+            return 'low'
+        return 'normal'
+
+    def _has_capacity(self, lane):
+        if lane == 'poll':
+            return self._in_flight['poll'] < self.poll_limit
+        total = sum(self._in_flight.values()) - self._in_flight['poll']
+        if lane == 'critical':
+            return total < self.max_in_flight
+        if total >= self.max_in_flight - self.reserved_critical:
+            return False
+        if lane == 'low':
+            return self._in_flight['low'] < self.low_priority_limit
+        return True
+
+    def acquire(self, lane):
+        """Wait up to the queue timeout for a slot in the given lane."""
+        counters = self._counters[lane]
+        with self._cond:
+            start = time.monotonic()
+            if not self._has_capacity(lane):
+                counters["queued"] += 1
+                deadline = start + self.queue_timeout
+                while not self._has_capacity(lane):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        counters["shed"] += 1
+                        return False
+                    self._cond.wait(remaining)
+
+            waited = time.monotonic() - start
+            counters["admitted"] += 1
+            counters["queue_wait_total"] += waited
+            counters["queue_wait_max"] = max(counters["queue_wait_max"], waited)
+            self._in_flight[lane] += 1
+            return True
+
+    def release(self, lane):
+        with self._cond:
+            self._in_flight[lane] -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            lanes = {}
+            for lane in LANES:
+                counters = dict(self._counters[lane])
+                admitted = counters["admitted"]
+                counters["in_flight"] = self._in_flight[lane]
+                counters["queue_wait_avg"] = counters["queue_wait_total"] / admitted if admitted else 0.0
+                lanes[lane] = counters
+
+            return {
+                "max_in_flight": self.max_in_flight,
+                "reserved_critical": self.reserved_critical,
+                "low_priority_limit": self.low_priority_limit,
+                "poll_limit": self.poll_limit,
+                "queue_timeout": self.queue_timeout,
+                "in_flight": sum(self._in_flight.values()),
+                "lanes": lanes
+            }
+
+    def _before_request(self):
+        # CORS preflights are answered without touching the database
+        if request.method == 'OPTIONS':
+            return None
+
+        lane = self.route_class(request.endpoint)
+        if not self.acquire(lane):
+            response = jsonify({"error": "Server is busy, please retry shortly"})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(self.retry_after)
+            return response
+
+        # Kept on the request, not g: batch sub-requests share g and are torn down first
+        request.environ['cafe.admission_lane'] = lane
+        return None
+
+    def _teardown_request(self, exc):
+        lane = request.environ.pop('cafe.admission_lane', None)
+        if lane is not None:
+            self.release(lane)
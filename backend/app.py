@@ -1,76 +1,249 @@
 from flask import Flask, jsonify, send_from_directory, request
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
 from dotenv import load_dotenv
+import importlib
 import os
 
-from models import db
-from routes.auth import auth_bp
-from routes.products import products_bp
-from routes.orders import orders_bp
-from routes.loyalty import loyalty_bp
-from routes.gift_cards import gift_cards_bp
-from routes.qr_order import qr_order_bp
-
-# Load environment variables
-load_dotenv()
-
-app = Flask(__name__, static_folder='static')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 'sqlite:///digital_cafe.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'super-secret-key')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 60 * 60 * 24 * 7  # 7 days
-app.config['JWT_TOKEN_LOCATION'] = ['headers']
-app.config['JWT_HEADER_NAME'] = 'Authorization'
-app.config['JWT_HEADER_TYPE'] = 'Bearer'
-
-# Configure CORS properly - only apply once!
-CORS(app, resources={r"/*": {"origins": "*"}}, 
-     allow_headers=["Content-Type", "Authorization"],
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     supports_credentials=True)
-
-# Set up route blueprints
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
-
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(products_bp, url_prefix='/api/products')
-app.register_blueprint(orders_bp, url_prefix='/api/orders')
-app.register_blueprint(loyalty_bp, url_prefix='/api/loyalty')
-app.register_blueprint(gift_cards_bp, url_prefix='/api/gift-cards')
-app.register_blueprint(qr_order_bp, url_prefix='/api/qr-order')
-
-@app.route('/')
-def index():
-    return jsonify({"message": "Welcome to Digital Cafe API"}), 200
-
-# Serve static files directly
-@app.route('/static/images/<path:filename>')
-def serve_static(filename):
-    return send_from_directory(os.path.join(app.static_folder, 'images'), filename)
-
-@app.route('/api/test-cors', methods=['GET', 'OPTIONS'])
-def test_cors():
-    """Test endpoint for CORS headers"""
-    print("Testing CORS endpoint hit")
-    print("Request headers:")
-    for header, value in request.headers:
-        print(f"  {header}: {value}")
-        
-    if request.method == 'OPTIONS':
-        return '', 200
-        
-    return jsonify({
-        "message": "CORS test endpoint working",
-        "headers_received": {k: v for k, v in request.headers.items()},
-        "success": True
-    }), 200
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365  # 1 year
+VARIANT_MAX_AGE = 60 * 60 * 24  # 1 day, ?w= URLs are not content-hashed
+
+# Route modules are only imported when an app is built, so importing this module stays cheap
+BLUEPRINTS = [
+    ('routes.auth', 'auth_bp', '/api/auth'),
+    ('routes.products', 'products_bp', '/api/products'),
+    ('routes.orders', 'orders_bp', '/api/orders'),
+    ('routes.loyalty', 'loyalty_bp', '/api/loyalty'),
+    ('routes.gift_cards', 'gift_cards_bp', '/api/gift-cards'),
+    ('routes.qr_order', 'qr_order_bp', '/api/qr-order'),
+    ('routes.admin', 'admin_bp', '/api/admin'),
+    ('routes.batch', 'batch_bp', '/api/batch'),
+]
+
+def load_config(app):
+    """Default configuration, overridable through environment variables"""
+    from structured_logging import parse_sample_rates
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI', 'sqlite:///digital_cafe.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'super-secret-key')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 60 * 60 * 24 * 7  # 7 days
+    app.config['JWT_TOKEN_LOCATION'] = ['headers']
+    app.config['JWT_HEADER_NAME'] = 'Authorization'
+    app.config['JWT_HEADER_TYPE'] = 'Bearer'
+
+    # Product image uploads are streamed to this directory before background processing
+    app.config['MAX_IMAGE_UPLOAD_BYTES'] = int(os.getenv('MAX_IMAGE_UPLOAD_BYTES', 20 * 1024 * 1024))
+    app.config['IMAGE_UPLOAD_DIR'] = os.getenv('IMAGE_UPLOAD_DIR', os.path.join(app.instance_path, 'uploads'))
+
+    # Response compression (gzip, plus brotli when installed) for bodies above the threshold
+    app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.getenv('COMPRESSION_MIN_SIZE', 512))
+
+    # Admission control: per-worker in-flight limits, with slots reserved for order placement
+    app.config['ADMISSION_ENABLED'] = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+    app.config['ADMISSION_MAX_IN_FLIGHT'] = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', 32))
+    app.config['ADMISSION_RESERVED_CRITICAL'] = int(os.getenv('ADMISSION_RESERVED_CRITICAL', 8))
+    app.config['ADMISSION_LOW_PRIORITY_LIMIT'] = int(os.getenv('ADMISSION_LOW_PRIORITY_LIMIT', 8))
+    app.config['ADMISSION_POLL_LIMIT'] = int(os.getenv('ADMISSION_POLL_LIMIT', 16))
+    app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 0.5))
+    app.config['ADMISSION_RETRY_AFTER'] = int(os.getenv('ADMISSION_RETRY_AFTER', 2))
+
+    # Frequently-bought-together suggestions kept per product (recommendations.py)
+    app.config['RECOMMENDATIONS_TOP_K'] = int(os.getenv('RECOMMENDATIONS_TOP_K', 10))
+
+    # /api/batch: most sub-requests accepted in one batch
+    app.config['BATCH_MAX_REQUESTS'] = int(os.getenv('BATCH_MAX_REQUESTS', 10))
+
+    # Cache for menu bodies and QR codes: 'sqlite' shares one CACHE_PATH file between the workers on a host
+    app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'memory')
+    app.config['CACHE_PATH'] = os.getenv('CACHE_PATH', os.path.join(app.instance_path, 'cache.db'))
+
+    # Metrics: set METRICS_DIR to aggregate /metrics across worker processes
+    app.config['METRICS_DIR'] = os.getenv('METRICS_DIR')
+    app.config['METRICS_FLUSH_INTERVAL'] = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+    # SQLite: 'tuned' enables WAL, pooled connections, BEGIN IMMEDIATE for writes and periodic checkpoints
+    app.config['SQLITE_PROFILE'] = os.getenv('SQLITE_PROFILE', 'tuned')
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    app.config['SQLITE_POOL_SIZE'] = int(os.getenv('SQLITE_POOL_SIZE', 8))
+    app.config['SQLITE_CHECKPOINT_INTERVAL'] = float(os.getenv('SQLITE_CHECKPOINT_INTERVAL', 60))
+
+    # Read replica for @replica_read GET views; SQLite replicas are refreshed with the backup API
+    app.config['REPLICA_DATABASE_URI'] = os.getenv('REPLICA_DATABASE_URI')
+    app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] = float(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', 5))
+    app.config['REPLICA_SYNC_INTERVAL'] = float(os.getenv('REPLICA_SYNC_INTERVAL', 2))
+
+    # Long-poll endpoints (kitchen table feed, order status) hold a request at most this long
+    app.config['LIVE_MAX_WAIT'] = float(os.getenv('LIVE_MAX_WAIT', 30))
+    # Under WSGI a held poll takes a worker thread: beyond this many per worker, polls answer at once
+    app.config['LIVE_MAX_HELD'] = int(os.getenv('LIVE_MAX_HELD', 4))
+
+    # Slow-query log: statements over the threshold are grouped, explained and kept in a ring buffer
+    app.config['SLOW_QUERY_THRESHOLD_MS'] = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+    app.config['SLOW_QUERY_CAPTURE_PLANS'] = os.getenv('SLOW_QUERY_CAPTURE_PLANS', 'true').lower() == 'true'
+    app.config['SLOW_QUERY_BUFFER_SIZE'] = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', 200))
+    app.config['SLOW_QUERY_LOG_FILE'] = os.getenv('SLOW_QUERY_LOG_FILE')
+
+    # Profiling: signed X-Profile header or a random sample; PROFILER=pyinstrument if installed
+    app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config['PROFILE_SECRET'] = os.getenv('PROFILE_SECRET')
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    app.config['PROFILE_RETENTION'] = int(os.getenv('PROFILE_RETENTION', 20))
+    app.config['PROFILER'] = os.getenv('PROFILER', 'cprofile')
+
+    # Logging: JSON lines on stdout via a background thread, e.g. LOG_SAMPLE_RATES=routes.orders=0.1
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_QUEUE_SIZE'] = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    app.config['LOG_SAMPLE_RATES'] = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', ''))
+    app.config['LOG_REQUEST_DUMP_ENDPOINTS'] = [
+        endpoint for endpoint in os.getenv('LOG_REQUEST_DUMP_ENDPOINTS', '').split(',') if endpoint
+    ]
+
+def create_app(config=None):
+    """Build and configure an app; `config` overrides the environment-based defaults"""
+    import click
+    from flask_cors import CORS
+    from flask_jwt_extended import JWTManager
+    from models import db
+    from admission import AdmissionController
+    from compression import Compression
+    from metrics import Metrics
+    from slow_queries import SlowQueryLog
+    from sqlite_profile import SQLiteProfile
+    from replicas import ReadReplica
+    from live_updates import LiveUpdates
+    from menu_changes import MenuChanges
+    from profiling import Profiling
+    from structured_logging import configure_logging
+    from cache import configure_cache
+    from json_provider import FastJSONProvider
+
+    # Load environment variables
+    load_dotenv()
+
+    app = Flask(__name__, static_folder='static')
+    app.json = FastJSONProvider(app)
+    load_config(app)
+    app.config.update(config or {})
+    configure_logging(app)
+    configure_cache(app)
+
+    # Configure CORS properly - only apply once!
+    # X-Primary-Until carries the read replica pin (replicas.py), which the SPA reads and echoes back
+    CORS(app, resources={r"/*": {"origins": "*"}},
+         allow_headers=["Content-Type", "Authorization", "X-Primary-Until"],
+         expose_headers=["X-Primary-Until"],
+         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+         supports_credentials=True)
+
+    db.init_app(app)
+    SQLiteProfile(app)
+    ReadReplica(app)
+    LiveUpdates(app)
+    MenuChanges(app)
+    JWTManager(app)
+    AdmissionController(app)
+    Compression(app)
+    Metrics(app)
+    SlowQueryLog(app)
+    Profiling(app)
+
+    # Alembic is slow to import and only needed by `flask db`, so skip it when serving
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    # Register blueprints
+    for module_name, attr, url_prefix in BLUEPRINTS:
+        blueprint = getattr(importlib.import_module(module_name), attr)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+    register_core_routes(app)
+    return app
+
+def register_core_routes(app):
+    import images
+    from compression import send_static
+    from structured_logging import dump_request
+
+    @app.route('/')
+    def index():
+        return jsonify({"message": "Welcome to Digital Cafe API"}), 200
+
+    # Serve static files directly
+    @app.route('/static/images/<path:filename>')
+    def serve_static(filename):
+        images_dir = os.path.join(app.static_folder, 'images')
+
+        # Content-hashed variants never change, so they can be cached forever
+        if filename.startswith(images.VARIANTS_DIRNAME + '/'):
+            response = send_static(images_dir, filename, max_age=IMMUTABLE_MAX_AGE)
+            response.cache_control.immutable = True
+            return response
+
+        # ?w=<px> picks the closest pre-generated variant, WebP when the client accepts it
+        width = request.args.get('w', type=int)
+        if width:
+            accept_webp = 'image/webp' in request.accept_mimetypes
+            variant = images.pick_variant(images_dir, filename, width, accept_webp)
+            if variant:
+                response = send_from_directory(images.variants_dir(images_dir), variant, max_age=VARIANT_MAX_AGE)
+                response.vary.add('Accept')
+                return response
+
+        return send_static(images_dir, filename)
+
+    @app.route('/api/test-cors', methods=['GET', 'OPTIONS'])
+    def test_cors():
+        """Test endpoint for CORS headers"""
+        dump_request(app.logger)
+
+        if request.method == 'OPTIONS':
+            return '', 200
+
+        return jsonify({
+            "message": "CORS test endpoint working",
+            "headers_received": {k: v for k, v in request.headers.items()},
+            "success": True
+        }), 200
+
+def warm_up(app):
+    """Prime per-process caches and lazy imports before a worker takes traffic"""
+    from models import db, Product
+    from routes.products import build_products_body
+    from routes.qr_order import get_table_numbers, get_table_qr_png
+    import cache
+    import msgpack_codec
+
+    with app.app_context():
+        # Menu bodies for the full menu and each category, as JSON and (for kiosks) MessagePack
+        categories = [None] + [row[0] for row in db.session.query(Product.category).distinct()]
+        mimetypes = ['application/json'] + ([msgpack_codec.MIMETYPE] if msgpack_codec.msgpack is not None else [])
+        for category in categories:
+            for mimetype in mimetypes:
+                cache.get_cached(cache.MENU, ('products', category, mimetype),
+                                 lambda: build_products_body(category, mimetype))
+
+        # Valid table numbers and their QR codes (also pulls in qrcode/PIL)
+        for table_number in get_table_numbers():
+            get_table_qr_png(table_number)
+
+        db.session.remove()
+
+    # One request through the full stack warms Flask, CORS and the JSON provider
+    app.test_client().get('/')
+
+def __getattr__(name):
+    # `from app import app` (flask run, scripts) builds the default app on first use
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
+    from models import db
+    app = create_app()
     with app.app_context():
         db.create_all()
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,183 @@
+"""ASGI entry point: uvicorn asgi:app --workers 2
+
+The long-poll endpoints (kitchen table feed, customer order status) are
+served natively on the event loop: a held connection costs a coroutine,
+not a worker thread, so one process can keep hundreds of kitchen screens
+and customers waiting. Their queries go through an async driver when one
+is installed (aiosqlite, asyncpg) and a thread otherwise. Every other
+request runs through the regular Flask app behind asgiref's WSGI adapter.
+
+Natively served requests skip Flask's hooks, so they are not counted in
+/metrics or subject to admission control.
+"""
+import asyncio
+import re
+from urllib.parse import parse_qs
+
+from flask_jwt_extended import decode_token
+from sqlalchemy.engine import make_url
+
+import live_updates
+import msgpack_codec
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine
+except ImportError:
+    create_async_engine = None
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+class Reader:
+    """Runs Core selects with the async driver when it is installed, otherwise on a thread"""
+
+    def __init__(self, engine, busy_timeout_ms=5000):
+        self.engine = engine
+        self.async_engine = None
+        driver = ASYNC_DRIVERS.get(engine.dialect.name)
+        # In-memory SQLite lives in the sync engine's one connection, so it cannot be shared
+        in_memory = engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:')
+        if driver and create_async_engine is not None and not in_memory:
+            connect_args = {'timeout': busy_timeout_ms / 1000} if engine.dialect.name == 'sqlite' else {}
+            try:
+                self.async_engine = create_async_engine(make_url(engine.url).set(drivername=driver),
+                                                        connect_args=connect_args)
+            except ImportError:
+                pass
+
+    @property
+    def driver(self):
+        return self.async_engine.dialect.driver if self.async_engine is not None else 'thread'
+
+    async def all(self, statement):
+        if self.async_engine is not None:
+            async with self.async_engine.connect() as conn:
+                return (await conn.execute(statement)).all()
+        return await asyncio.to_thread(self._all, statement)
+
+    def _all(self, statement):
+        with self.engine.connect() as conn:
+            return conn.execute(statement).all()
+
+
+class CafeASGI:
+    def __init__(self, flask_app, wsgi=None):
+        from models import db
+
+        self.flask_app = flask_app
+        self.wsgi = wsgi
+        self.live = flask_app.extensions['live_updates']
+        with flask_app.app_context():
+            self.reader = Reader(db.engine, flask_app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+        self.routes = [
+            (re.compile(r'^/api/qr-order/tables/(\d+)/orders/poll$'), self.poll_table_orders),
+            (re.compile(r'^/api/orders/(\d+)/poll$'), self.poll_order),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            for pattern, handler in self.routes:
+                match = pattern.match(scope['path'])
+                if match:
+                    return await handler(scope, send, int(match.group(1)))
+
+        if self.wsgi is None:
+            raise RuntimeError("Serving the Flask routes over ASGI needs asgiref: pip install asgiref")
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.reader.async_engine is not None:
+                    await self.reader.async_engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def identity(self, scope):
+        """The JWT identity from the Authorization header, or None"""
+        header = dict(scope['headers']).get(b'authorization', b'').decode('latin-1')
+        if not header.startswith('Bearer '):
+            return None
+        with self.flask_app.app_context():
+            try:
+                return decode_token(header[len('Bearer '):])[self.flask_app.config['JWT_IDENTITY_CLAIM']]
+            except Exception:
+                return None
+
+    async def respond(self, scope, send, status, body):
+        accept = dict(scope['headers']).get(b'accept', b'').decode('latin-1')
+        mimetype = msgpack_codec.preferred_for_header(accept)
+        if mimetype == msgpack_codec.MIMETYPE:
+            data = msgpack_codec.packb(body)
+        else:
+            data = self.flask_app.json.dumps(body).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', mimetype.encode()),
+            (b'content-length', str(len(data)).encode()),
+            (b'access-control-allow-origin', b'*'),
+            (b'vary', b'Accept'),
+        ]})
+        await send({'type': 'http.response.body', 'body': data})
+
+    def poll_args(self, scope):
+        args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+        return args.get('since'), live_updates.wait_seconds(args, self.live.max_wait)
+
+    async def poll_table_orders(self, scope, send, table_id):
+        if self.identity(scope) is None:
+            return await self.respond(scope, send, 401, {"msg": "Missing or invalid Authorization Header"})
+
+        async def snapshot():
+            rows = await self.reader.all(live_updates.table_number_query(table_id))
+            if not rows:
+                return None
+            return live_updates.table_orders_body(await self.reader.all(live_updates.table_orders_query(rows[0][0])))
+
+        since, wait = self.poll_args(scope)
+        body = await self.live.hold_async(snapshot, since, wait)
+        if body is None:
+            return await self.respond(scope, send, 404, {"error": "Table not found"})
+        await self.respond(scope, send, 200, body)
+
+    async def poll_order(self, scope, send, order_id):
+        user_id = self.identity(scope)
+        if user_id is None:
+            return await self.respond(scope, send, 401, {"msg": "Missing or invalid Authorization Header"})
+
+        async def snapshot():
+            rows = await self.reader.all(live_updates.order_status_query(order_id, user_id))
+            return live_updates.order_status_body(rows[0]) if rows else None
+
+        since, wait = self.poll_args(scope)
+        body = await self.live.hold_async(snapshot, since, wait)
+        if body is None:
+            return await self.respond(scope, send, 404, {"error": "Order not found"})
+        await self.respond(scope, send, 200, body)
+
+
+def create_asgi_app(config=None):
+    from app import create_app
+
+    if WsgiToAsgi is None:
+        raise RuntimeError("ASGI mode needs asgiref (and a server such as uvicorn): pip install asgiref uvicorn")
+    flask_app = create_app(config)
+    return CafeASGI(flask_app, WsgiToAsgi(flask_app))
+
+
+def __getattr__(name):
+    # `uvicorn asgi:app` builds the default app on first use, like `from app import app`
+    if name == 'app':
+        globals()['app'] = create_asgi_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
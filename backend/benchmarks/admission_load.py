@@ -0,0 +1,78 @@
+"""Local load test for admission control.
+
+Floods the admin order listing (low priority) from many concurrent clients
+while a smaller number of clients keep placing orders (critical), then
+prints per-lane status counts, latencies and the controller's counters.
+Critical requests should keep succeeding while low-priority ones are shed.
+
+    python -m benchmarks.admission_load [--clients 48] [--duration 10]
+"""
+import argparse
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.support import add_orders, boot_app, create_user, percentile, serve_in_thread
+
+
+def run_client(base_url, token, lane, deadline, results):
+    session = requests.Session()
+    session.headers['Authorization'] = f"Bearer {token}"
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        if lane == 'critical':
+            response = session.post(f"{base_url}/api/orders/", json={"items": [{"product_id": 1, "quantity": 1}]})
+        else:
+            response = session.get(f"{base_url}/api/orders/admin/all")
+        results[lane].append((response.status_code, time.monotonic() - start))
+        if response.status_code == 503:
+            # Honour Retry-After loosely so shed clients don't spin
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=48, help='low-priority clients')
+    parser.add_argument('--critical-clients', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--orders', type=int, default=2000, help='orders seeded before the run')
+    args = parser.parse_args()
+
+    app = boot_app(
+        ADMISSION_MAX_IN_FLIGHT=8,
+        ADMISSION_RESERVED_CRITICAL=3,
+        ADMISSION_LOW_PRIORITY_LIMIT=3,
+        ADMISSION_QUEUE_TIMEOUT=0.2
+    )
+    user_id, token = create_user(app)
+    add_orders(app, user_id, args.orders)
+    server, base_url = serve_in_thread(app)
+
+    results = defaultdict(list)
+    deadline = time.monotonic() + args.duration
+    lanes = ['low'] * args.clients + ['critical'] * args.critical_clients
+    with ThreadPoolExecutor(max_workers=len(lanes)) as pool:
+        for lane in lanes:
+            pool.submit(run_client, base_url, token, lane, deadline, results)
+
+    server.shutdown()
+
+    for lane in ('critical', 'low'):
+        samples = results[lane]
+        statuses = defaultdict(int)
+        for status, _ in samples:
+            statuses[status] += 1
+        ok = [elapsed for status, elapsed in samples if status < 500]
+        print(f"{lane:>8}: {len(samples)} requests, statuses {dict(statuses)}, "
+              f"p50 {percentile(ok, 50) * 1000:.1f}ms p99 {percentile(ok, 99) * 1000:.1f}ms")
+
+    stats = app.extensions['admission'].stats()
+    for lane, counters in stats['lanes'].items():
+        print(f"{lane:>8}: admitted {counters['admitted']}, shed {counters['shed']}, "
+              f"queued {counters['queued']}, max queue wait {counters['queue_wait_max'] * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Held long-poll connections per process: gunicorn threads versus ASGI.
+
+Opens --connections kitchen long polls (/api/qr-order/tables/<id>/orders/poll)
+against one server process, then, while they are held, times a menu request
+and an order placed at the polled table, and how long it takes for every poll
+to come back with the new order. Under gunicorn only LIVE_MAX_HELD polls
+are held and the rest come back unchanged at once. Runs gunicorn with one gthread worker and
+--threads threads, then uvicorn serving asgi:app with one worker (skipped
+when uvicorn or asgiref is not installed).
+
+    python -m benchmarks.asgi_capacity [--connections 200] [--threads 8] [--wait 10]
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import loadgen
+from benchmarks.load_suite import RESULTS_DIR, free_port, start_gunicorn, start_server
+from benchmarks.support import boot_app, create_user
+
+TABLE_ID = 1
+TABLE_NUMBER = 1
+
+
+async def measure(port, token, connections, wait):
+    headers = {'Authorization': f"Bearer {token}"}
+    probe = loadgen.HttpConnection('127.0.0.1', port)
+    _, _, body = await probe.request('GET', f"/api/qr-order/tables/{TABLE_ID}/orders/poll", headers)
+    version = json.loads(body)["version"]
+
+    async def hold():
+        connection = loadgen.HttpConnection('127.0.0.1', port)
+        try:
+            status, _, body = await connection.request(
+                'GET', f"/api/qr-order/tables/{TABLE_ID}/orders/poll?since={version}&wait={wait}", headers)
+            return status == 200 and json.loads(body)["version"] != version, time.monotonic()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return False, time.monotonic()
+        finally:
+            connection.close()
+
+    async def timed(method, path, json_body=None):
+        # Anything still queued after one full wait is reported as blocked
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(probe.request(method, path, headers, json_body), wait + 5)
+            return time.monotonic() - start
+        except asyncio.TimeoutError:
+            return None
+
+    polls = [asyncio.ensure_future(hold()) for _ in range(connections)]
+    await asyncio.sleep(1.0)
+    held = sum(not poll.done() for poll in polls)
+
+    menu_latency = await timed('GET', '/api/products/')
+    order_sent = time.monotonic()
+    order_latency = None
+    if menu_latency is not None:
+        order_latency = await timed('POST', '/api/orders/',
+                                    {"items": [{"product_id": 1, "quantity": 1}], "table_number": TABLE_NUMBER})
+    probe.close()
+
+    done, pending = await asyncio.wait(polls, timeout=wait + 5)
+    for poll in pending:
+        poll.cancel()
+    woken = [finished - order_sent for changed, finished in (poll.result() for poll in done) if changed]
+    return {
+        "held": held,
+        "menu_ms": menu_latency * 1000 if menu_latency is not None else None,
+        "order_ms": order_latency * 1000 if order_latency is not None else None,
+        "woken": len(woken),
+        "all_woken_s": max(woken) if woken else None,
+        "unchanged": len(done) - len(woken),
+        "still_queued": len(pending),
+    }
+
+
+def stop(server):
+    # Graceful shutdown would wait for the polls that are still queued
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def report(name, result, connections, wait):
+    def ms(value):
+        return f"{value:.0f}ms" if value is not None else f"blocked for more than {wait + 5:.0f}s"
+
+    print(f"\n{name}:")
+    print(f"  polls held after 1s:     {result['held']}/{connections}")
+    print(f"  menu request while held: {ms(result['menu_ms'])}")
+    print(f"  order placed while held: {ms(result['order_ms'])}")
+    woken = f", the last {result['all_woken_s']:.2f}s after the order" if result['woken'] else ''
+    print(f"  polls woken by the order: {result['woken']}{woken}; answered unchanged: {result['unchanged']}; "
+          f"still queued: {result['still_queued']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads in the single worker')
+    parser.add_argument('--wait', type=float, default=10.0, help='long-poll wait in seconds')
+    args = parser.parse_args()
+
+    boot_app(LOG_LEVEL='WARNING', LIVE_MAX_WAIT=args.wait)
+    from app import app
+    _, token = create_user(app, username='kitchen')
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    port = free_port()
+    server = start_gunicorn(port, 1, args.threads, os.path.join(RESULTS_DIR, 'gunicorn.log'))
+    try:
+        report(f"gunicorn, 1 worker x {args.threads} threads",
+               asyncio.run(measure(port, token, args.connections, args.wait)), args.connections, args.wait)
+    finally:
+        stop(server)
+
+    if importlib.util.find_spec('uvicorn') is None or importlib.util.find_spec('asgiref') is None:
+        print("\nuvicorn/asgiref not installed, skipping ASGI mode (pip install uvicorn asgiref aiosqlite)")
+        return
+
+    port = free_port()
+    server = start_server(
+        [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port), '--workers', '1', '--log-level', 'warning'],
+        port, os.path.join(RESULTS_DIR, 'uvicorn.log')
+    )
+    try:
+        report("uvicorn asgi:app, 1 worker",
+               asyncio.run(measure(port, token, args.connections, args.wait)), args.connections, args.wait)
+    finally:
+        stop(server)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Bytes on the wire and compression CPU cost per endpoint.
+
+Seeds a user with order history, then requests each endpoint with identity,
+gzip and (if installed) brotli encodings through the test client and prints
+the average response size and the CPU time spent compressing.
+
+    python -m benchmarks.compression_bench [--orders 200] [--repeat 50]
+"""
+import argparse
+import time
+
+from benchmarks.support import add_orders, boot_app, create_user
+
+ENDPOINTS = [
+    ('menu', '/api/products/'),
+    ('order history', '/api/orders/'),
+    ('admin orders', '/api/orders/admin/all'),
+    ('loyalty points', '/api/loyalty/points'),
+    ('gift cards', '/api/gift-cards/'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = boot_app()
+    import compression
+
+    user_id, token = create_user(app)
+    add_orders(app, user_id, args.orders)
+    client = app.test_client()
+    middleware = app.extensions['compression']
+
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+    print(f"{'endpoint':<16}{'encoding':<10}{'wire bytes':>12}{'ratio':>8}{'compress ms':>13}{'request ms':>12}")
+    for label, path in ENDPOINTS:
+        for encoding in encodings:
+            middleware.reset_stats()
+            headers = {'Authorization': f"Bearer {token}", 'Accept-Encoding': encoding}
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                response = client.get(path, headers=headers)
+                assert response.status_code == 200, (path, response.status_code)
+            elapsed = (time.perf_counter() - start) / args.repeat
+
+            stats = next(iter(middleware.stats().values()))
+            responses = stats['responses']
+            raw = stats['raw_bytes'] / responses
+            wire = stats['wire_bytes'] / responses
+            cpu_ms = stats['cpu_seconds'] / responses * 1000
+            print(f"{label:<16}{encoding:<10}{wire:>12.0f}{raw / wire:>8.1f}{cpu_ms:>13.3f}{elapsed * 1000:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
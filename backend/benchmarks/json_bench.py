@@ -0,0 +1,91 @@
+"""Serializing the admin order listing: hand-built dicts + json versus serializers + orjson.
+
+Loads --orders orders once, then times turning them into the listing body
+the old way (a dict literal with strftime per row, encoded by Flask's
+default provider) and the new way (serializers.order_summary, encoded by
+FastJSONProvider), and finally the whole GET /api/orders/admin/all request.
+
+    python -m benchmarks.json_bench [--orders 10000] [--repeat 20]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.support import boot_app, create_user
+
+
+def hand_built(orders):
+    return {"orders": [{
+        "id": order.id,
+        "user_id": order.user_id,
+        "status": order.status,
+        "total_amount": order.total_amount,
+        "order_date": order.order_date.strftime('%Y-%m-%d %H:%M:%S'),
+        "table_number": order.table_number
+    } for order in orders]}
+
+
+def timed(fn, repeat):
+    """Best wall time of `repeat` runs, in milliseconds, and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = boot_app(LOG_LEVEL='WARNING')
+    import json_provider
+    import serializers
+    from models import db, Order
+
+    user_id, token = create_user(app)
+    start = datetime.utcnow() - timedelta(days=90)
+    with app.app_context():
+        db.session.bulk_insert_mappings(Order, [{
+            "user_id": user_id,
+            "status": ('pending', 'processing', 'completed')[i % 3],
+            "total_amount": 4.5 + i % 7,
+            "order_date": start + timedelta(minutes=i, microseconds=i),
+            "table_number": i % 5 or None,
+        } for i in range(args.orders)])
+        db.session.commit()
+
+    default = DefaultJSONProvider(app)
+    fast = app.json
+    with app.test_request_context():
+        orders = Order.query.order_by(Order.order_date.desc()).all()
+
+        build_before, body_before = timed(lambda: hand_built(orders), args.repeat)
+        encode_before, data_before = timed(lambda: default.dumps(body_before, separators=(',', ':')).encode(), args.repeat)
+        build_after, body_after = timed(
+            lambda: {"orders": [serializers.order_summary(order) for order in orders]}, args.repeat)
+        encode_after, data_after = timed(lambda: fast.dump_bytes(body_after), args.repeat)
+
+    assert fast.loads(data_after) == default.loads(data_before), "the two listings differ"
+
+    client = app.test_client()
+    headers = {'Authorization': f"Bearer {token}", 'Accept-Encoding': 'identity'}
+    request_ms, _ = timed(lambda: client.get('/api/orders/admin/all', headers=headers), max(args.repeat // 4, 1))
+
+    print(f"{args.orders} orders, {len(data_after) / 1024:.0f} KiB, best of {args.repeat}, "
+          f"fast provider backend: {json_provider.FastJSONProvider(app).backend}")
+    print(f"{'':<34}{'build ms':>10}{'encode ms':>11}{'total ms':>10}")
+    print(f"{'before: dict + strftime, json':<34}{build_before:>10.1f}{encode_before:>11.1f}"
+          f"{build_before + encode_before:>10.1f}")
+    print(f"{'after: serializer, fast provider':<34}{build_after:>10.1f}{encode_after:>11.1f}"
+          f"{build_after + encode_after:>10.1f}")
+    print(f"full GET /api/orders/admin/all (query + serialize): {request_ms:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""End-to-end load benchmark: gunicorn plus an asyncio load generator.
+
+Seeds a throwaway database (menu, users, order history), starts the app
+under gunicorn with gunicorn.conf.py, and drives a weighted mix of
+customer and staff flows from local virtual users:
+
+    browse     menu, one category, one product
+    qr_order   validate table -> category menu -> place order at the table
+    loyalty    points, rewards, order history
+    gift_card  send a gift card to another user, who redeems it
+    kitchen    list a table's open orders, mark one completed
+
+Throughput and p50/p95/p99 per endpoint are written to a JSON file and
+compared against the stored baseline, so a slower endpoint shows up next to
+the commit that caused it.
+
+    python -m benchmarks.load_suite [--duration 20] [--concurrency 32] [--workers 2]
+    python -m benchmarks.load_suite --save-baseline   # after an intended change
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import loadgen
+from benchmarks.support import add_orders, boot_app, create_user
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(BACKEND_DIR, 'benchmarks', 'baselines', 'load_suite.json')
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+# Endpoints with fewer requests than this in either run are too noisy to flag
+MIN_SAMPLES = 100
+
+DEFAULT_MIX = {'browse': 40, 'qr_order': 20, 'loyalty': 20, 'gift_card': 5, 'kitchen': 15}
+
+
+def build_scenarios(users, admin_headers, products, categories, tables):
+    """Scenario coroutines over the seeded data; `users` is a list of (email, headers)."""
+
+    async def browse(c):
+        await c.call('GET /api/products/', 'GET', '/api/products/')
+        await c.call('GET /api/products/?category', 'GET', f"/api/products/?category={c.rng.choice(categories)}")
+        await c.call('GET /api/products/<id>', 'GET', f"/api/products/{c.rng.choice(products)}")
+
+    async def qr_order(c):
+        table_id, table_number = c.rng.choice(tables)
+        _, headers = c.rng.choice(users)
+        await c.call('GET /api/qr-order/validate/<n>', 'GET', f"/api/qr-order/validate/{table_number}")
+        await c.call('GET /api/products/?category', 'GET', '/api/products/?category=coffee')
+        items = [{"product_id": p, "quantity": c.rng.randint(1, 2)} for p in c.rng.sample(products, c.rng.randint(1, 3))]
+        await c.call('POST /api/orders/', 'POST', '/api/orders/', headers,
+                     {"items": items, "table_number": table_number})
+
+    async def loyalty(c):
+        _, headers = c.rng.choice(users)
+        await c.call('GET /api/loyalty/points', 'GET', '/api/loyalty/points', headers)
+        await c.call('GET /api/loyalty/rewards', 'GET', '/api/loyalty/rewards', headers)
+        await c.call('GET /api/orders/', 'GET', '/api/orders/', headers)
+
+    async def gift_card(c):
+        (_, sender), (receiver_email, receiver) = c.rng.sample(users, 2)
+        status, data = await c.call('POST /api/gift-cards/', 'POST', '/api/gift-cards/', sender,
+                                    {"amount": 10, "receiver_email": receiver_email, "message": "Enjoy!"})
+        if status == 201:
+            await c.call('POST /api/gift-cards/redeem', 'POST', '/api/gift-cards/redeem', receiver,
+                         {"code": data["gift_card"]["code"]})
+
+    async def kitchen(c):
+        table_id, _ = c.rng.choice(tables)
+        status, data = await c.call('GET /api/qr-order/tables/<id>/orders', 'GET',
+                                    f"/api/qr-order/tables/{table_id}/orders", admin_headers)
+        if status == 200 and data["orders"]:
+            order = c.rng.choice(data["orders"])
+            next_status = 'processing' if order["status"] == 'pending' else 'completed'
+            await c.call('PUT /api/orders/<id>/status', 'PUT', f"/api/orders/{order['id']}/status",
+                         admin_headers, {"status": next_status})
+
+    return {'browse': browse, 'qr_order': qr_order, 'loyalty': loyalty, 'gift_card': gift_card, 'kitchen': kitchen}
+
+
+def seed(users, orders_per_user):
+    """Seed a temporary database; returns the data the scenarios need."""
+    from models import Product, Table
+
+    app = boot_app(LOG_LEVEL='WARNING')
+    accounts = []
+    for i in range(users):
+        user_id, token = create_user(app, username=f"loaduser{i}", loyalty_points=100)
+        add_orders(app, user_id, orders_per_user, seed=i)
+        accounts.append((f"loaduser{i}@example.com", {'Authorization': f"Bearer {token}"}))
+
+    with app.app_context():
+        products = [p.id for p in Product.query.filter_by(is_available=True)]
+        categories = sorted({p.category for p in Product.query})
+        tables = [(t.id, t.table_number) for t in Table.query]
+    return accounts, products, categories, tables
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(command, port, log_path, **env):
+    """Start a server subprocess from the backend directory and wait until it accepts connections."""
+    env = dict(os.environ, LOG_LEVEL='WARNING', METRICS_DIR=tempfile.mkdtemp(prefix='cafe-metrics-'), **env)
+    log = open(log_path, 'w')
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{command[2]} exited with {process.returncode}, see {log_path}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{command[2]} did not start, see {log_path}")
+
+
+def start_gunicorn(port, workers, threads, log_path):
+    return start_server(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{port}",
+         '--workers', str(workers), '--threads', str(threads)],
+        port, log_path
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline, tolerance):
+    """Print per-endpoint changes against the baseline; returns the labels that regressed."""
+    regressions = []
+    print(f"\n{'endpoint':<40} {'rps':>8} {'Δrps':>7} {'p95 ms':>8} {'Δp95':>7} {'p99 ms':>8}")
+    for label, current in results["endpoints"].items():
+        before = baseline["endpoints"].get(label)
+        if before is None:
+            print(f"{label:<40} {current['rps']:>8.1f} {'new':>7} {current['p95_ms']:>8.1f} {'':>7} {current['p99_ms']:>8.1f}")
+            continue
+        rps_change = (current['rps'] - before['rps']) / before['rps'] if before['rps'] else 0.0
+        p95_change = (current['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        enough = min(current['requests'], before['requests']) >= MIN_SAMPLES
+        regressed = enough and (rps_change < -tolerance or p95_change > tolerance)
+        if regressed:
+            regressions.append(label)
+        note = '  REGRESSION' if regressed else ('' if enough else '  (few samples)')
+        print(f"{label:<40} {current['rps']:>8.1f} {rps_change:>+7.0%} {current['p95_ms']:>8.1f} "
+              f"{p95_change:>+7.0%} {current['p99_ms']:>8.1f}{note}")
+    return regressions
+
+
+def parse_mix(values):
+    mix = dict(DEFAULT_MIX)
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in mix:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of {', '.join(mix)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--concurrency', type=int, default=32, help='virtual users')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--orders-per-user', type=int, default=20)
+    parser.add_argument('--mix', action='append', default=[], metavar='SCENARIO=WEIGHT',
+                        help=f"override a scenario weight (defaults: {DEFAULT_MIX})")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results file (default benchmarks/results/load-<commit>.json)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative change before flagging')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    print(f"Seeding {args.users} users with {args.orders_per_user} orders each...")
+    users, products, categories, tables = seed(args.users, args.orders_per_user)
+    scenarios = build_scenarios(users, users[0][1], products, categories, tables)
+
+    port = free_port()
+    commit = git_commit()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    log_path = os.path.join(RESULTS_DIR, 'gunicorn.log')
+    server = start_gunicorn(port, args.workers, args.threads, log_path)
+    try:
+        print(f"Running {args.concurrency} virtual users for {args.duration}s against gunicorn "
+              f"({args.workers} workers x {args.threads} threads)...")
+        weighted = [(scenarios[name], weight) for name, weight in mix.items() if weight > 0]
+        recorder = asyncio.run(loadgen.run('127.0.0.1', port, weighted, args.concurrency,
+                                           args.duration, args.warmup, args.seed))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    results = recorder.summary()
+    results["meta"] = {
+        "commit": commit,
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "workers": args.workers,
+        "threads": args.threads,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "users": args.users,
+        "orders_per_user": args.orders_per_user,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{commit}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    total = results["total"]
+    print(f"\n{total['requests']} requests, {total['errors']} errors, {total['rps']:.1f} req/s, "
+          f"p50 {total['p50_ms']:.1f}ms p95 {total['p95_ms']:.1f}ms p99 {total['p99_ms']:.1f}ms")
+    print(f"Results written to {output}")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared with baseline from commit {baseline['meta']['commit']} "
+              f"({baseline['meta']['cpus']} CPUs; compare runs from the same machine):")
+        regressions = compare(results, baseline, args.tolerance)
+    else:
+        print(f"No baseline at {args.baseline}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(f"{len(regressions)} endpoint(s) regressed beyond {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
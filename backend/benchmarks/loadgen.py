@@ -0,0 +1,188 @@
+"""Minimal asyncio HTTP/1.1 load generator.
+
+Speaks just enough HTTP/1.1 over asyncio streams (keep-alive,
+Content-Length and chunked bodies) to drive the API from many virtual
+users in one process, so benchmarks need no outside service or extra
+dependency. Each virtual user owns one connection and runs scenarios in a
+closed loop; latencies are recorded per endpoint label once the warm-up
+period is over.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+from benchmarks.support import percentile
+
+
+class HttpConnection:
+    """One keep-alive connection; reconnects transparently when the server closes it."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, json_body=None):
+        body = json.dumps(json_body).encode() if json_body is not None else b''
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        if json_body is not None:
+            lines.append("Content-Type: application/json")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+        # A kept-alive connection may have been closed by the server since the last request
+        for attempt in (1, 2):
+            reused = self.writer is not None
+            if not reused:
+                await self._connect()
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if not reused or attempt == 2:
+                    raise
+
+    async def _read_response(self):
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        status = int(status_line.split(' ', 2)[1])
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b''.join(chunks)
+        else:
+            body = await self.reader.read()
+            self.close()
+            return status, headers, body
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, headers, body
+
+
+class Recorder:
+    """Latencies and error counts per endpoint label."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+        self.started = None
+        self.stopped = None
+
+    def start(self):
+        self.recording = True
+        self.started = time.monotonic()
+
+    def stop(self):
+        self.recording = False
+        self.stopped = time.monotonic()
+
+    def observe(self, label, elapsed, ok):
+        if not self.recording:
+            return
+        self.latencies[label].append(elapsed)
+        if not ok:
+            self.errors[label] += 1
+
+    def summary(self):
+        wall = (self.stopped or time.monotonic()) - self.started
+        endpoints = {}
+        for label in sorted(self.latencies):
+            samples = self.latencies[label]
+            endpoints[label] = {
+                "requests": len(samples),
+                "errors": self.errors[label],
+                "rps": round(len(samples) / wall, 2),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            }
+        every = [s for samples in self.latencies.values() for s in samples]
+        total = {
+            "requests": len(every),
+            "errors": sum(self.errors.values()),
+            "rps": round(len(every) / wall, 2) if wall else 0.0,
+            "p50_ms": round(percentile(every, 50) * 1000, 2),
+            "p95_ms": round(percentile(every, 95) * 1000, 2),
+            "p99_ms": round(percentile(every, 99) * 1000, 2),
+        }
+        return {"duration": round(wall, 2), "total": total, "endpoints": endpoints}
+
+
+class Client:
+    """What a scenario sees: timed requests labelled by endpoint."""
+
+    def __init__(self, connection, recorder, rng):
+        self.connection = connection
+        self.recorder = recorder
+        self.rng = rng
+
+    async def call(self, label, method, path, headers=None, json_body=None):
+        start = time.perf_counter()
+        try:
+            status, _, body = await self.connection.request(method, path, headers, json_body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.recorder.observe(label, time.perf_counter() - start, False)
+            return 0, None
+        self.recorder.observe(label, time.perf_counter() - start, status < 400)
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+
+async def _virtual_user(host, port, recorder, rng, mix, deadline):
+    client = Client(HttpConnection(host, port), recorder, rng)
+    scenarios, weights = zip(*mix)
+    try:
+        while time.monotonic() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            await scenario(client)
+    finally:
+        client.connection.close()
+
+
+async def run(host, port, mix, concurrency, duration, warmup=2.0, seed=1):
+    """Run `concurrency` virtual users over a weighted scenario mix; returns the Recorder.
+
+    `mix` is a list of (async scenario(client), weight) pairs.
+    """
+    recorder = Recorder()
+    deadline = time.monotonic() + warmup + duration
+    users = [
+        asyncio.ensure_future(_virtual_user(host, port, recorder, random.Random(seed + i), mix, deadline))
+        for i in range(concurrency)
+    ]
+    await asyncio.sleep(warmup)
+    recorder.start()
+    await asyncio.gather(*users)
+    recorder.stop()
+    return recorder
@@ -0,0 +1,99 @@
+"""MessagePack versus JSON for the payloads kitchen and kiosk clients poll.
+
+Generates --orders orders (seed_data.generate_scale), builds three response
+bodies the way their views do and reports for each encoding the body size,
+its gzip size and the best encode and decode time:
+
+  menu          GET /api/products/
+  admin orders  GET /api/orders/admin/all
+  table orders  GET /api/qr-order/tables/<id>/orders, for the busiest table
+
+JSON goes through the app's provider (orjson when installed), MessagePack
+through msgpack_codec.
+
+    python -m benchmarks.msgpack_bench [--orders 20000] [--repeat 20]
+"""
+import argparse
+import gzip
+import time
+from datetime import datetime
+
+from benchmarks.support import boot_app
+
+
+def bodies():
+    from sqlalchemy import func, select
+
+    import live_updates
+    import serializers
+    from models import db, Order, Product
+
+    products = Product.query.filter_by(is_available=True).all()
+    menu = {"products": [serializers.product(product) for product in products]}
+
+    query = serializers.select_fields(Order, serializers.ORDER_SUMMARY_FIELDS).order_by(Order.order_date.desc())
+    admin = {"orders": serializers.rows_as_dicts(serializers.ORDER_SUMMARY_FIELDS, db.session.execute(query))}
+
+    busiest = db.session.execute(
+        select(Order.table_number).where(Order.table_number.isnot(None), Order.status.in_(live_updates.OPEN_STATUSES))
+        .group_by(Order.table_number).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    table = live_updates.table_orders_body(db.session.execute(live_updates.table_orders_query(busiest)))
+
+    return [('menu', menu), ('admin orders', admin), ('table orders', table)]
+
+
+def json_values(value):
+    if isinstance(value, dict):
+        return {key: json_values(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [json_values(item) for item in value]
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None).isoformat(sep=' ')
+    return value
+
+
+def timed(fn, repeat):
+    """Best wall time of `repeat` runs, in milliseconds, and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = boot_app(LOG_LEVEL='ERROR')
+    import msgpack_codec
+    from seed_data import generate_scale
+
+    if msgpack_codec.msgpack is None:
+        raise SystemExit("msgpack is not installed: pip install msgpack")
+
+    generate_scale(app, args.orders)
+    provider = app.json
+
+    print(f"{'payload':<14}{'format':<9}{'bytes':>10}{'gzip':>9}{'encode ms':>11}{'decode ms':>11}")
+    with app.app_context():
+        for name, body in bodies():
+            encoders = (
+                ('json', provider.dump_bytes, provider.loads),
+                ('msgpack', msgpack_codec.packb, msgpack_codec.unpackb),
+            )
+            decoded = {}
+            for label, encode, decode in encoders:
+                encode_ms, data = timed(lambda: encode(body), args.repeat)
+                decode_ms, decoded[label] = timed(lambda: decode(data), args.repeat)
+                print(f"{name:<14}{label:<9}{len(data):>10}{len(gzip.compress(data, 6)):>9}"
+                      f"{encode_ms:>11.2f}{decode_ms:>11.2f}")
+            assert json_values(decoded['msgpack']) == decoded['json'], f"{name}: the two encodings differ"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Co-occurrence index: full rebuild, per-order update and serving.
+
+Generates --orders orders (seed_data.generate_scale, about 1.75 items
+each) in a fresh temporary database, then reports:
+
+  rebuild   recommendations.rebuild() over every order item, with NumPy
+            (when installed) and in pure Python, best of --repeat
+  record    recommendations.record_order() for a random 2-4 product order,
+            the work create_order adds, rolled back after each call
+  serve     GET /api/products/<id>/recommendations
+
+    python -m benchmarks.recommendations_bench [--orders 2000000] [--repeat 3] [--requests 2000]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.support import boot_app, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = boot_app(LOG_LEVEL='ERROR', SLOW_QUERY_THRESHOLD_MS='inf')
+    import recommendations
+    from models import db, OrderItem, Product
+    from seed_data import generate_scale
+
+    generate_scale(app, args.orders)
+    top_k = app.config['RECOMMENDATIONS_TOP_K']
+
+    with app.app_context():
+        items = db.session.query(OrderItem).count()
+        product_ids = [row[0] for row in db.session.query(Product.id).filter_by(is_available=True)]
+    print(f"{items} order items, {len(product_ids)} products, top {top_k} kept per product")
+
+    builds = [('python', False)] + ([('numpy', True)] if recommendations.np is not None else [])
+    for label, use_numpy in builds:
+        best = float('inf')
+        for _ in range(args.repeat):
+            with app.app_context():
+                start = time.perf_counter()
+                stats = recommendations.rebuild(db.session, top_k, use_numpy=use_numpy)
+                db.session.commit()
+                best = min(best, time.perf_counter() - start)
+        print(f"rebuild ({label}): {best:.2f}s, {stats['pairs']} pairs, {stats['recommendations']} recommendations")
+
+    rng = random.Random(42)
+    timings = []
+    with app.app_context():
+        for _ in range(args.requests):
+            order = rng.sample(product_ids, rng.randint(2, 4))
+            start = time.perf_counter()
+            recommendations.record_order(db.session, order, top_k)
+            timings.append((time.perf_counter() - start) * 1000)
+            db.session.rollback()
+    print(f"record: p50 {percentile(timings, 50):.2f}ms, p95 {percentile(timings, 95):.2f}ms")
+
+    client = app.test_client()
+    timings = []
+    for _ in range(args.requests):
+        product_id = rng.choice(product_ids)
+        start = time.perf_counter()
+        response = client.get(f'/api/products/{product_id}/recommendations')
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    print(f"serve: p50 {percentile(timings, 50):.2f}ms, p95 {percentile(timings, 95):.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Order writes under reporting and kitchen reads, with and without a read replica.
+
+Seeds an order history, then forks writer processes that place orders and
+reader processes that poll the admin order listing and a table's open orders
+(like reporting and kitchen screens). Runs once with every query on the
+primary and once with REPLICA_DATABASE_URI pointing at a second SQLite file
+kept in sync with the backup API, and reports write latency and read
+throughput for both.
+
+    python -m benchmarks.replica_reads [--writers 2] [--readers 4] [--duration 10]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.support import add_orders, create_user, percentile
+
+MODES = ('primary', 'replica')
+
+
+def build_app(db_dir, mode, sync_interval):
+    from app import create_app
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(db_dir, 'primary.db')}",
+        'ADMISSION_ENABLED': False,
+        'LOG_LEVEL': 'CRITICAL',
+    }
+    if mode == 'replica':
+        config.update({
+            'REPLICA_DATABASE_URI': f"sqlite:///{os.path.join(db_dir, 'replica.db')}",
+            'REPLICA_SYNC_INTERVAL': sync_interval,
+        })
+    return create_app(config)
+
+
+def worker(db_dir, mode, role, token, table_ids, threads, duration, sync_interval, seed, queue):
+    app = build_app(db_dir, mode, sync_interval)
+    headers = {'Authorization': f"Bearer {token}"}
+    results = defaultdict(list)
+    deadline = time.monotonic() + duration
+
+    def run(thread_index):
+        rng = random.Random(seed * 1000 + thread_index)
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            if role == 'writer':
+                kind = 'write'
+                items = [{"product_id": rng.randint(1, 10), "quantity": 1} for _ in range(rng.randint(1, 3))]
+                response = client.post('/api/orders/', json={"items": items, "table_number": rng.randint(1, 5)},
+                                       headers=headers)
+            elif rng.random() < 0.5:
+                kind = 'report'
+                response = client.get('/api/orders/admin/all?status=completed', headers=headers)
+            else:
+                kind = 'kitchen'
+                response = client.get(f"/api/qr-order/tables/{rng.choice(table_ids)}/orders", headers=headers)
+            results[kind].append((response.status_code, time.perf_counter() - start))
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    queue.put((dict(results), app.extensions['read_replica'].stats()))
+
+
+def run_mode(mode, args):
+    from models import db, Table
+    from seed_data import seed_database
+
+    db_dir = tempfile.mkdtemp(prefix='cafe-replica-')
+    app = build_app(db_dir, mode, args.sync_interval)
+    seed_database(app, generate_images=False)
+    user_id, token = create_user(app, username='staff', loyalty_points=0)
+    add_orders(app, user_id, args.orders)
+    with app.app_context():
+        table_ids = [table.id for table in Table.query]
+        db.session.remove()
+        db.engine.dispose()
+    if mode == 'replica':
+        app.extensions['read_replica'].sync()
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    roles = ['writer'] * args.writers + ['reader'] * args.readers
+    processes = [
+        context.Process(target=worker, args=(db_dir, mode, role, token, table_ids, args.threads, args.duration,
+                                             args.sync_interval, seed, queue))
+        for seed, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    merged = defaultdict(list)
+    syncs = 0
+    for _ in processes:
+        results, stats = queue.get()
+        syncs += stats["syncs"]["runs"]
+        for kind, samples in results.items():
+            merged[kind].extend(samples)
+    for process in processes:
+        process.join()
+
+    print(f"\n{mode}:" + (f" ({syncs} replica syncs)" if mode == 'replica' else ''))
+    for kind in ('write', 'report', 'kitchen'):
+        samples = merged[kind]
+        ok = [elapsed for status, elapsed in samples if status < 500]
+        failed = len(samples) - len(ok)
+        print(f"  {kind:>7}: {len(ok) / args.duration:7.1f} ok/s, {failed} failed, "
+              f"p50 {percentile(ok, 50) * 1000:.1f}ms p95 {percentile(ok, 95) * 1000:.1f}ms "
+              f"p99 {percentile(ok, 99) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=2, help='writer processes')
+    parser.add_argument('--readers', type=int, default=4, help='reader processes')
+    parser.add_argument('--threads', type=int, default=2, help='threads per process')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--orders', type=int, default=5000, help='orders seeded before the run')
+    parser.add_argument('--sync-interval', type=float, default=2.0)
+    parser.add_argument('--mode', choices=MODES, action='append', help='modes to run (default: both)')
+    args = parser.parse_args()
+
+    for mode in args.mode or MODES:
+        run_mode(mode, args)
+
+
+if __name__ == '__main__':
+    main()
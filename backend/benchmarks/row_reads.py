@@ -0,0 +1,83 @@
+"""Admin order listing: full ORM instances versus column-only Core rows.
+
+For each size, generates that many orders (seed_data.generate_scale) in a
+fresh temporary database, then builds the /api/orders/admin/all body both
+ways and reports the best wall time and the peak memory traced while doing
+it:
+
+  orm   Order.query ... .all() and serializers.order_summary per instance
+  rows  select_fields(Order, ORDER_SUMMARY_FIELDS) and rows_as_dicts
+
+    python -m benchmarks.row_reads [--sizes 100000,1000000] [--repeat 3]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.support import boot_app
+
+
+def orm_listing():
+    import serializers
+    from models import Order
+
+    orders = Order.query.order_by(Order.order_date.desc()).all()
+    return [serializers.order_summary(order) for order in orders]
+
+
+def row_listing():
+    import serializers
+    from models import db, Order
+
+    query = serializers.select_fields(Order, serializers.ORDER_SUMMARY_FIELDS).order_by(Order.order_date.desc())
+    return serializers.rows_as_dicts(serializers.ORDER_SUMMARY_FIELDS, db.session.execute(query))
+
+
+def measure(app, build, repeat):
+    """(best seconds, peak traced MiB) for building the listing in a fresh session"""
+    from models import db
+
+    best = float('inf')
+    for _ in range(repeat):
+        with app.app_context():
+            gc.collect()
+            start = time.perf_counter()
+            result = build()
+            best = min(best, time.perf_counter() - start)
+            del result
+            db.session.remove()
+
+    with app.app_context():
+        gc.collect()
+        tracemalloc.start()
+        result = build()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+        db.session.remove()
+    return best, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000', help='comma-separated order counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = boot_app(LOG_LEVEL='ERROR')
+    from seed_data import generate_scale
+
+    print(f"{'orders':>9}{'path':>6}{'best s':>9}{'per row µs':>12}{'peak MiB':>10}")
+    for size in (int(value) for value in args.sizes.split(',')):
+        generate_scale(app, size)
+        results = {name: measure(app, build, args.repeat) for name, build in (('orm', orm_listing),
+                                                                                ('rows', row_listing))}
+        for name, (seconds, peak) in results.items():
+            print(f"{size:>9}{name:>6}{seconds:>9.2f}{seconds / size * 1e6:>12.1f}{peak:>10.0f}")
+        (orm_s, orm_mib), (rows_s, rows_mib) = results['orm'], results['rows']
+        print(f"{'':>9}  rows take {rows_s / orm_s:.0%} of the time and {rows_mib / orm_mib:.0%} of the memory")
+
+
+if __name__ == '__main__':
+    main()
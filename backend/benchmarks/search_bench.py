@@ -0,0 +1,118 @@
+"""Product search latency on a large multi-brand catalog.
+
+Adds --products synthetic products (brand x drink x size names, a short
+description each) to a fresh temporary database with one executemany, so
+the insert time includes the FTS5 triggers. Then runs each kind of query
+--repeat times through search.search() and through
+GET /api/products/search, and reports the median, p95 and worst latency
+in milliseconds and the number of results:
+
+  word      one whole word
+  prefix    a few letters, as typed so far
+  words     two words that must both match
+  category  a word within one category
+  typo      a misspelt name, answered by the trigram fallback
+  miss      matches nothing, the trigram fallback included
+
+    python -m benchmarks.search_bench [--products 50000] [--repeat 50]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.support import boot_app, percentile
+
+BRANDS = ["Northside", "Bluebird", "Harbor", "Copper Kettle", "Atlas", "Marigold", "Juniper", "Roastery 9",
+          "Little Fox", "Summit", "Saltwater", "Old Mill", "Kinfolk", "Ember", "Wildflower", "Granite"]
+DRINKS = ["Espresso", "Americano", "Cappuccino", "Latte", "Flat White", "Mocha", "Macchiato", "Cortado",
+          "Cold Brew", "Chai Latte", "Matcha Latte", "Green Tea", "Earl Grey", "Hot Chocolate", "Smoothie",
+          "Croissant", "Muffin", "Bagel", "Brownie", "Cheesecake"]
+FLAVORS = ["", "Vanilla", "Caramel", "Hazelnut", "Oat", "Coconut", "Honey", "Cinnamon", "Mint", "Salted"]
+SIZES = ["Small", "Regular", "Large", "Family"]
+CATEGORIES = ["coffee", "tea", "food", "dessert", "seasonal"]
+WORDS = ["smooth", "rich", "bold", "creamy", "light", "fresh", "roasted", "single origin", "organic",
+         "handmade", "seasonal", "spiced", "double", "iced", "steamed milk", "dark chocolate"]
+
+QUERIES = {
+    'word': ['cappuccino', 'latte', 'croissant', 'juniper', 'hazelnut'],
+    'prefix': ['cap', 'lat', 'choc', 'jun', 'mat'],
+    'words': ['vanilla latte', 'bluebird mocha', 'iced americano', 'caramel brownie', 'oat cortado'],
+    'category': ['latte', 'smooth', 'cinnamon', 'large', 'harbor'],
+    'typo': ['capucino', 'expresso', 'croisant', 'machiato', 'chesecake'],
+    'miss': ['zzyzx', 'qwertyuiop', 'xylophone', 'kumquat', 'blorf'],
+}
+
+
+def add_catalog(app, count, seed=42):
+    """Insert `count` synthetic products; returns the seconds taken"""
+    from models import db, Product
+
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        brand, drink, flavor, size = rng.choice(BRANDS), rng.choice(DRINKS), rng.choice(FLAVORS), rng.choice(SIZES)
+        name = ' '.join(part for part in (brand, flavor, drink, size) if part)
+        rows.append({
+            "name": name,
+            "description": f"{rng.choice(WORDS).capitalize()} and {rng.choice(WORDS)} {drink.lower()} by {brand}.",
+            "price": round(rng.uniform(2, 9), 2),
+            "category": rng.choice(CATEGORIES),
+            "is_available": rng.random() < 0.95,
+            "points_value": rng.randrange(1, 10),
+            "revision": 0,
+            "is_deleted": False,
+        })
+
+    with app.app_context():
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            conn.execute(Product.__table__.insert(), rows)
+        return time.perf_counter() - start
+
+
+def measure(call, repeat):
+    """Per-call milliseconds of `repeat` calls, and the last result"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = boot_app(LOG_LEVEL='ERROR')
+    import search
+    from models import db
+
+    seconds = add_catalog(app, args.products)
+    print(f"Inserted {args.products} products in {seconds:.1f}s ({args.products / seconds:.0f}/s, index included)")
+
+    client = app.test_client()
+    print(f"{'query':<10}{'via':<10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'results':>9}")
+    for kind, queries in QUERIES.items():
+        category = 'coffee' if kind == 'category' else None
+        timings = {'function': [], 'http': []}
+        results = 0
+        with app.app_context():
+            for q in queries:
+                ms, (products, _) = measure(lambda: search.search(db.session, q, category=category), args.repeat)
+                timings['function'] += ms
+                results += len(products)
+            db.session.remove()
+        for q in queries:
+            params = {"q": q, "category": category} if category else {"q": q}
+            ms, _ = measure(lambda: client.get('/api/products/search', query_string=params), args.repeat)
+            timings['http'] += ms
+        for via, ms in timings.items():
+            print(f"{kind:<10}{via:<10}{percentile(ms, 50):>9.2f}{percentile(ms, 95):>9.2f}{max(ms):>9.2f}"
+                  f"{results / len(queries):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
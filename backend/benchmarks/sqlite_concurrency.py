@@ -0,0 +1,120 @@
+"""Concurrent readers and writers on one SQLite file, per SQLite profile.
+
+For each profile, seeds a fresh database and forks several worker processes
+(like gunicorn workers), each running threads that place orders and read
+order history through the app. Reports throughput, latency percentiles and
+failed requests ("database is locked" surfaces as a 500) per profile.
+
+    python -m benchmarks.sqlite_concurrency [--processes 4] [--threads 4] [--duration 10]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.support import add_orders, create_user, percentile
+
+PROFILES = ('default', 'tuned')
+
+
+def build_app(uri, profile):
+    from app import create_app
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLITE_PROFILE': profile,
+        'ADMISSION_ENABLED': False,
+        'LOG_LEVEL': 'CRITICAL',
+    })
+
+
+def worker(uri, profile, tokens, threads, duration, write_ratio, seed, queue):
+    app = build_app(uri, profile)
+    results = defaultdict(list)
+    deadline = time.monotonic() + duration
+
+    def run(thread_index):
+        rng = random.Random(seed * 1000 + thread_index)
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            headers = {'Authorization': f"Bearer {rng.choice(tokens)}"}
+            start = time.perf_counter()
+            if rng.random() < write_ratio:
+                kind = 'write'
+                items = [{"product_id": rng.randint(1, 10), "quantity": 1} for _ in range(rng.randint(1, 3))]
+                response = client.post('/api/orders/', json={"items": items}, headers=headers)
+            else:
+                kind = 'read'
+                response = client.get('/api/orders/', headers=headers)
+            results[kind].append((response.status_code, time.perf_counter() - start))
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    queue.put(dict(results))
+
+
+def run_profile(profile, args):
+    db_dir = tempfile.mkdtemp(prefix='cafe-sqlite-')
+    uri = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+
+    from seed_data import seed_database
+    app = build_app(uri, profile)
+    seed_database(app, generate_images=False)
+    tokens = []
+    for i in range(args.users):
+        user_id, token = create_user(app, username=f"user{i}", loyalty_points=0)
+        add_orders(app, user_id, args.orders_per_user, seed=i)
+        tokens.append(token)
+    with app.app_context():
+        from models import db
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(uri, profile, tokens, args.threads, args.duration,
+                                             args.write_ratio, seed, queue))
+        for seed in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    merged = defaultdict(list)
+    for _ in processes:
+        for kind, samples in queue.get().items():
+            merged[kind].extend(samples)
+    for process in processes:
+        process.join()
+
+    print(f"\n{profile}:")
+    for kind in ('read', 'write'):
+        samples = merged[kind]
+        ok = [elapsed for status, elapsed in samples if status < 500]
+        failed = len(samples) - len(ok)
+        print(f"  {kind:>5}: {len(ok) / args.duration:7.1f} ok/s, {failed} failed, "
+              f"p50 {percentile(ok, 50) * 1000:.1f}ms p95 {percentile(ok, 95) * 1000:.1f}ms "
+              f"p99 {percentile(ok, 99) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--orders-per-user', type=int, default=50)
+    parser.add_argument('--profile', choices=PROFILES, action='append', help='profiles to run (default: all)')
+    args = parser.parse_args()
+
+    for profile in args.profile or PROFILES:
+        run_profile(profile, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Import time and time-to-first-request for a fresh process.
+
+Each measurement runs in a new interpreter against a seeded temporary
+database: importing the app module, building the app with create_app(),
+and the latency of the first menu and QR requests with and without
+warm_up() having run first.
+
+    python -m benchmarks.startup_bench [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.support import boot_app
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app()
+built = time.perf_counter()
+if sys.argv[1] == 'warm':
+    app_module.warm_up(app)
+warmed = time.perf_counter()
+client = app.test_client()
+t0 = time.perf_counter()
+client.get('/api/products/')
+t1 = time.perf_counter()
+client.get('/api/qr-order/tables/1/qr')
+t2 = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "create_app": built - imported,
+    "warm_up": warmed - built,
+    "first_menu": t1 - t0,
+    "first_qr": t2 - t1,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    boot_app()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    for mode in ('cold', 'warm'):
+        samples = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, '-c', PROBE, mode], cwd=backend_dir, env=os.environ,
+                capture_output=True, text=True, check=True
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+
+        print(f"{mode}:")
+        for key in samples[0]:
+            median = statistics.median(sample[key] for sample in samples)
+            print(f"  {key:<12}{median * 1000:>9.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Per-call cost of the hot lookups: legacy Model.query chains versus statements.py.
+
+Runs each lookup --calls times in one app context against a small seeded
+database, clearing the identity map after every call so both versions
+really execute. The SQL and database work are the same either way, so the
+difference is the Python spent building the query. Also prints the
+compiled-cache results counted while each version ran.
+
+    python -m benchmarks.statement_overhead [--calls 5000]
+"""
+import argparse
+import time
+
+from benchmarks.support import add_orders, boot_app, create_user
+
+
+def lookups(user_id, code):
+    from sqlalchemy.orm import selectinload
+
+    import statements
+    from models import GiftCard, Order, OrderItem, Product, Table, User
+
+    return [
+        ('product by id',
+         lambda: Product.query.get(1),
+         lambda: statements.product(1)),
+        ('user by id',
+         lambda: User.query.get(user_id),
+         lambda: statements.user(user_id)),
+        ('orders by user',
+         lambda: Order.query.options(selectinload(Order.items).joinedload(OrderItem.product))
+         .filter_by(user_id=user_id).order_by(Order.order_date.desc()).all(),
+         lambda: statements.orders_for_user(user_id)),
+        ('table by number',
+         lambda: Table.query.filter_by(table_number=2).first(),
+         lambda: statements.table_by_number(2)),
+        ('gift card by code',
+         lambda: GiftCard.query.filter_by(code=code).first(),
+         lambda: statements.gift_card_by_code(code)),
+    ]
+
+
+def per_call_us(fn, calls):
+    from models import db
+
+    for _ in range(50):
+        fn()
+        db.session.expunge_all()
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+        db.session.expunge_all()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = boot_app(LOG_LEVEL='ERROR', SLOW_QUERY_THRESHOLD_MS=10000)
+    import metrics
+    from models import db, GiftCard
+
+    user_id, _ = create_user(app)
+    add_orders(app, user_id, 5)
+    with app.app_context():
+        gift_card = GiftCard(sender_id=user_id, receiver_email='friend@example.com', amount=10)
+        db.session.add(gift_card)
+        db.session.commit()
+        code = gift_card.code
+
+    print(f"{'lookup':<20}{'legacy µs':>11}{'prebuilt µs':>13}{'saved µs':>10}")
+    cache_results = {'legacy': {'hit': 0, 'miss': 0, 'uncached': 0}, 'prebuilt': {'hit': 0, 'miss': 0, 'uncached': 0}}
+    with app.app_context():
+        for name, legacy, prebuilt in lookups(user_id, code):
+            timings = {}
+            for label, fn in (('legacy', legacy), ('prebuilt', prebuilt)):
+                before = metrics.compiled_cache_counts()
+                timings[label] = per_call_us(fn, args.calls)
+                after = metrics.compiled_cache_counts()
+                for result in after:
+                    cache_results[label][result] += after[result] - before[result]
+            print(f"{name:<20}{timings['legacy']:>11.1f}{timings['prebuilt']:>13.1f}"
+                  f"{timings['legacy'] - timings['prebuilt']:>10.1f}")
+
+    for label, counts in cache_results.items():
+        cached = counts['hit'] + counts['miss']
+        ratio = f"{counts['hit'] / cached:.2%}" if cached else 'n/a'
+        print(f"compiled cache, {label}: {counts['hit']} hits, {counts['miss']} misses, "
+              f"{counts['uncached']} uncached (hit ratio {ratio})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks are run from the backend directory as modules, e.g.
+``python -m benchmarks.admission_load``, and always work on a throwaway
+SQLite database so the development database is never touched.
+"""
+import logging
+import os
+import random
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+
+def boot_app(**env):
+    """Point the app at a fresh temporary database, seed the menu and return the app."""
+    db_dir = tempfile.mkdtemp(prefix='cafe-bench-')
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.update({key: str(value) for key, value in env.items()})
+
+    from app import app
+    from seed_data import seed_database
+
+    seed_database()
+    return app
+
+
+def create_user(app, username='bench', loyalty_points=0):
+    """Create a user and return (user_id, access_token)."""
+    from flask_jwt_extended import create_access_token
+    from werkzeug.security import generate_password_hash
+    from models import db, User
+
+    with app.app_context():
+        user = User(
+            username=username,
+            email=f"{username}@example.com",
+            password=generate_password_hash('password'),
+            first_name='Bench',
+            last_name='User',
+            loyalty_points=loyalty_points
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user.id, create_access_token(identity=user.id)
+
+
+def add_orders(app, user_id, count, seed=42):
+    """Insert `count` orders with one to three items each for the given user."""
+    from models import db, Order, OrderItem, Product
+
+    rng = random.Random(seed)
+    with app.app_context():
+        products = Product.query.all()
+        start = datetime.utcnow() - timedelta(days=90)
+        for i in range(count):
+            order = Order(
+                user_id=user_id,
+                status=rng.choice(['pending', 'processing', 'completed']),
+                order_date=start + timedelta(minutes=i),
+                total_amount=0,
+                table_number=rng.choice([None, 1, 2, 3, 4])
+            )
+            db.session.add(order)
+            db.session.flush()
+            for product in rng.sample(products, rng.randint(1, 3)):
+                db.session.add(OrderItem(
+                    order_id=order.id,
+                    product_id=product.id,
+                    quantity=1,
+                    customizations={},
+                    unit_price=product.price,
+                    total_price=product.price
+                ))
+                order.total_amount += product.price
+        db.session.commit()
+
+
+def serve_in_thread(app):
+    """Run the app on a threaded werkzeug server on a free local port."""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
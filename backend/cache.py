@@ -0,0 +1,275 @@
+"""Version counters for cached data.
+
+Anything cached from the database is keyed by the version of the namespace
+it was built from; writes bump the version so stale entries stop matching.
+
+Entries and versions live in a pluggable backend. The default `memory`
+backend is private to the process. With CACHE_BACKEND=sqlite they are kept
+in one SQLite file (CACHE_PATH) shared by every worker on the host: a value
+is built once per host rather than once per worker, and a version bump in
+one worker invalidates the entry for all of them on their next lookup.
+
+The backend also holds a few runtime settings changed through the admin API
+(such as the request dump switch), so a change reaches every worker that
+shares the backend rather than only the one that took the call.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MENU = 'menu'
+TABLES = 'tables'
+
+MAX_ENTRIES_PER_NAMESPACE = 256
+
+
+class MemoryBackend:
+    """Entries and versions in this process only"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = {}
+        self._settings = {}
+
+    def get_version(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    def bump_version(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+    def get(self, namespace, key, version):
+        with self._lock:
+            entries = self._entries.get(namespace)
+            entry = entries.get(key) if entries is not None else None
+            if entry is not None and entry[0] == version:
+                entries.move_to_end(key)
+                return True, entry[1]
+        return False, None
+
+    def set(self, namespace, key, version, value):
+        with self._lock:
+            entries = self._entries.setdefault(namespace, OrderedDict())
+            entries[key] = (version, value)
+            entries.move_to_end(key)
+            while len(entries) > MAX_ENTRIES_PER_NAMESPACE:
+                entries.popitem(last=False)
+
+    def get_setting(self, name, default):
+        with self._lock:
+            return self._settings.get(name, default)
+
+    def update_setting(self, name, update, default):
+        with self._lock:
+            self._settings[name] = update(self._settings.get(name, default))
+            return self._settings[name]
+
+    def sizes(self):
+        with self._lock:
+            return {
+                namespace: {"entries": len(entries), "bytes": sum(_size_of(value) for _, value in entries.values())}
+                for namespace, entries in self._entries.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+            self._entries.clear()
+            self._settings.clear()
+
+
+class SQLiteBackend:
+    """Entries (pickled) and versions in a SQLite file shared by the processes on a host"""
+
+    name = 'sqlite'
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS versions (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS entries (namespace TEXT NOT NULL, key TEXT NOT NULL, version INTEGER NOT NULL,"
+        " value BLOB NOT NULL, PRIMARY KEY (namespace, key))",
+        "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value BLOB NOT NULL)",
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork; opened on first use so a
+        # preloading master never creates the file before gunicorn's on_starting clears it
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a lost cache only costs a rebuild
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_version(self, namespace):
+        row = self._connection().execute("SELECT version FROM versions WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def bump_version(self, namespace):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO versions (namespace, version) VALUES (?, 0)", (namespace,))
+            conn.execute("UPDATE versions SET version = version + 1 WHERE namespace = ?", (namespace,))
+            return conn.execute("SELECT version FROM versions WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def get(self, namespace, key, version):
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ? AND version = ?",
+            (namespace, repr(key), version)
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def set(self, namespace, key, version, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, version, value) VALUES (?, ?, ?, ?)",
+                (namespace, repr(key), version, data)
+            )
+            # Entries from older versions can never match again; beyond the cap, drop the oldest
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND version < ?", (namespace, version))
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND rowid NOT IN "
+                "(SELECT rowid FROM entries WHERE namespace = ? ORDER BY rowid DESC LIMIT ?)",
+                (namespace, namespace, MAX_ENTRIES_PER_NAMESPACE)
+            )
+
+    def get_setting(self, name, default):
+        row = self._connection().execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def update_setting(self, name, update, default):
+        # Read and written in one write transaction, so concurrent updates from two workers both apply
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+            value = update(pickle.loads(row[0]) if row else default)
+            conn.execute(
+                "INSERT OR REPLACE INTO settings (name, value) VALUES (?, ?)",
+                (name, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            )
+            return value
+
+    def sizes(self):
+        rows = self._connection().execute(
+            "SELECT namespace, COUNT(*), SUM(LENGTH(value)) FROM entries GROUP BY namespace"
+        ).fetchall()
+        return {namespace: {"entries": count, "bytes": size} for namespace, count, size in rows}
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM versions")
+        conn.execute("DELETE FROM settings")
+
+
+def _size_of(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return getattr(value, 'size', 0)
+
+
+_backend = MemoryBackend()
+_counters_lock = threading.Lock()
+_counters = {}
+
+
+def configure_cache(app):
+    """Pick the backend from CACHE_BACKEND ('memory' or 'sqlite' with CACHE_PATH)"""
+    global _backend
+    name = app.config.get('CACHE_BACKEND', 'memory')
+    if name == 'sqlite':
+        _backend = SQLiteBackend(app.config['CACHE_PATH'])
+    elif name == 'memory':
+        _backend = MemoryBackend()
+    else:
+        raise ValueError(f"CACHE_BACKEND must be 'memory' or 'sqlite', not {name!r}")
+    with _counters_lock:
+        _counters.clear()
+
+
+def _count(namespace, outcome):
+    with _counters_lock:
+        counts = _counters.setdefault(namespace, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+
+def get_version(namespace):
+    return _backend.get_version(namespace)
+
+
+def bump_version(namespace):
+    return _backend.bump_version(namespace)
+
+
+def get_cached(namespace, key, builder):
+    """Return the cached value for key, rebuilding it if the namespace version moved on."""
+    version = get_version(namespace)
+    found, value = _backend.get(namespace, key, version)
+    if found:
+        _count(namespace, "hits")
+        return value
+
+    _count(namespace, "misses")
+    value = builder()
+    _backend.set(namespace, key, version, value)
+    return value
+
+
+def get_setting(name, default=None):
+    return _backend.get_setting(name, default)
+
+
+def update_setting(name, update, default=None):
+    """Replace a setting with update(current value) atomically and return the new value"""
+    return _backend.update_setting(name, update, default)
+
+
+def counters():
+    """Hits and misses per namespace in this process."""
+    with _counters_lock:
+        return {namespace: dict(counts) for namespace, counts in _counters.items()}
+
+
+def stats():
+    sizes = _backend.sizes()
+    result = {}
+    for namespace, counts in counters().items():
+        lookups = counts["hits"] + counts["misses"]
+        result[namespace] = dict(counts, hit_ratio=round(counts["hits"] / lookups, 4) if lookups else None)
+    for namespace, size in sizes.items():
+        result.setdefault(namespace, {}).update(size)
+    return {"backend": _backend.name, "namespaces": result}
+
+
+def clear():
+    """Drop every entry, version counter and setting (e.g. between apps in tests)."""
+    _backend.clear()
+    with _counters_lock:
+        _counters.clear()
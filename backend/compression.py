@@ -0,0 +1,187 @@
+"""Response compression with negotiated encoding.
+
+Dynamic responses are compressed in an after_request hook (brotli when the
+`brotli` package is installed, otherwise gzip) once they cross a size
+threshold and have an allowlisted content type. Bodies that are cached
+anyway, like the menu, are compressed once up front with PrecompressedBody,
+and static files can ship .br/.gz siblings made by ``python compression.py``.
+"""
+import gzip
+import mimetypes
+import os
+import sys
+import threading
+import time
+
+from flask import Response, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/msgpack',
+    'application/javascript',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/plain',
+}
+
+STATIC_EXTENSIONS = ('.json', '.js', '.css', '.svg', '.html', '.txt')
+
+# Cheap settings for per-request work, maximum settings for bodies compressed once
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 6}
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+
+SIDECAR_EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def negotiate():
+    """Pick the best encoding the client accepts, or None for identity."""
+    return request.accept_encodings.best_match(supported_encodings())
+
+
+class PrecompressedBody:
+    """A response body stored once per supported encoding."""
+
+    def __init__(self, data, mimetype='application/json', min_size=0):
+        self.data = data
+        self.mimetype = mimetype
+        self.encoded = {}
+        if len(data) >= min_size:
+            for encoding in supported_encodings():
+                self.encoded[encoding] = compress(data, encoding, STATIC_LEVELS[encoding])
+
+    @property
+    def size(self):
+        return len(self.data) + sum(len(body) for body in self.encoded.values())
+
+    def to_response(self, status=200):
+        encoding = negotiate() if self.encoded else None
+        if encoding:
+            response = Response(self.encoded[encoding], status=status, mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = Response(self.data, status=status, mimetype=self.mimetype)
+        response.vary.add('Accept-Encoding')
+        response.raw_size = len(self.data)
+        return response
+
+
+def send_static(directory, filename, **kwargs):
+    """send_from_directory, preferring a pre-compressed .br/.gz sibling when one exists."""
+    if filename.endswith(STATIC_EXTENSIONS):
+        encoding = negotiate()
+        if encoding:
+            sidecar = filename + SIDECAR_EXTENSIONS[encoding]
+            if os.path.isfile(os.path.join(directory, sidecar)):
+                response = send_from_directory(directory, sidecar, **kwargs)
+                response.headers['Content-Encoding'] = encoding
+                response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                response.vary.add('Accept-Encoding')
+                return response
+    return send_from_directory(directory, filename, **kwargs)
+
+
+def precompress_tree(root):
+    """Write .br/.gz siblings for every compressible file under root."""
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith(STATIC_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding in supported_encodings():
+                with open(path + SIDECAR_EXTENSIONS[encoding], 'wb') as out:
+                    out.write(compress(data, encoding, STATIC_LEVELS[encoding]))
+                written += 1
+    return written
+
+
+class Compression:
+    """after_request middleware compressing eligible responses on the fly."""
+
+    def __init__(self, app=None):
+        self.min_size = 512
+        self._lock = threading.Lock()
+        self._stats = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', self.min_size)
+        app.extensions['compression'] = self
+        if app.config.get('COMPRESSION_ENABLED', True):
+            app.after_request(self._after_request)
+
+    def _record(self, endpoint, encoding, raw_bytes, wire_bytes, cpu_seconds):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint or 'unknown', {
+                "responses": 0, "compressed": 0, "raw_bytes": 0, "wire_bytes": 0, "cpu_seconds": 0.0
+            })
+            stats["responses"] += 1
+            stats["raw_bytes"] += raw_bytes
+            stats["wire_bytes"] += wire_bytes
+            if encoding:
+                stats["compressed"] += 1
+                stats["cpu_seconds"] += cpu_seconds
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _after_request(self, response):
+        raw_size = getattr(response, 'raw_size', None)
+        if raw_size is not None:
+            # Already encoded by PrecompressedBody, only account for it
+            wire_size = response.calculate_content_length() or 0
+            self._record(request.endpoint, response.headers.get('Content-Encoding'), raw_size, wire_size, 0.0)
+            return response
+
+        if (response.direct_passthrough
+                or response.is_streamed
+                or response.status_code < 200
+                or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        data = response.get_data()
+        encoding = negotiate() if len(data) >= self.min_size else None
+        if not encoding:
+            self._record(request.endpoint, None, len(data), len(data), 0.0)
+            return response
+
+        start = time.thread_time()
+        compressed = compress(data, encoding, DYNAMIC_LEVELS[encoding])
+        cpu_seconds = time.thread_time() - start
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        self._record(request.endpoint, encoding, len(data), len(compressed), cpu_seconds)
+        return response
+
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    print(f"Wrote {precompress_tree(root)} pre-compressed files under {root}")
@@ -0,0 +1,76 @@
+"""Per-user data versions and weak ETags for the personal endpoints.
+
+Every user row carries a `data_version`. Write paths call bump() with each
+user whose profile, orders, loyalty history or gift cards they change, in
+the same transaction as the write. Views decorated with @user_etag send a
+weak ETag built from the caller's version; a conditional GET whose
+If-None-Match still matches is answered 304 after one primary-key lookup of
+the caller, without building the payload.
+"""
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import update
+from sqlalchemy.orm.util import identity_key
+
+import cache
+import statements
+from models import db, User
+
+# Browsers store the response but revalidate it on every use
+CACHE_CONTROL = 'private, no-cache'
+
+
+def bump(*user_ids):
+    """Move the data version of every given user on, as part of the current transaction"""
+    ids = set()
+    for user_id in user_ids:
+        if user_id is None:
+            continue
+        user = db.session.identity_map.get(identity_key(User, user_id))
+        if user is not None:
+            # Already loaded: the increment rides along with the UPDATE the flush issues for it
+            user.data_version = User.data_version + 1
+        else:
+            ids.add(user_id)
+    if ids:
+        db.session.execute(
+            update(User).where(User.id.in_(ids)).values(data_version=User.data_version + 1),
+            execution_options={"synchronize_session": False}
+        )
+
+
+def user_etag(*namespaces):
+    """Answer conditional GETs for the caller's data with 304 while their version stands.
+
+    Goes under @jwt_required(). Payloads that also embed shared data (product
+    names in order history) name its cache namespaces, whose versions become
+    part of the tag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = get_jwt_identity()
+            # Read before the payload: a write landing in between leaves an older tag, never a newer one.
+            # The view's own statements.user() lookup then hits the identity map while `user` holds it.
+            user = statements.user(user_id)
+            if user is None:
+                return view(*args, **kwargs)
+
+            parts = [f"u{user_id}", f"v{user.data_version}"] + [f"{ns}{cache.get_version(ns)}" for ns in namespaces]
+            etag = '.'.join(parts)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,50 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py
+
+The app is built once in the master (preload) so workers fork with every
+module already imported, then each worker warms its own caches before it
+starts accepting connections. That keeps rolling restarts from sending
+traffic to cold workers.
+"""
+import os
+import tempfile
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Workers write metric snapshots here so /metrics can report all of them
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'cafe-metrics'))
+
+# Workers share one cache file, so the menu and QR codes are built and stored once per host
+os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+os.environ.setdefault('CACHE_PATH', os.path.join(tempfile.gettempdir(), 'cafe-cache', 'cache.db'))
+
+
+def on_starting(server):
+    # Start every deployment with fresh counters and a cache that matches the current database
+    from metrics import clear_snapshots
+    clear_snapshots(os.environ['METRICS_DIR'])
+    if os.environ['CACHE_BACKEND'] == 'sqlite':
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(os.environ['CACHE_PATH'] + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with forked workers
+    if preload_app:
+        from models import db
+        app = worker.app.wsgi()
+        with app.app_context():
+            db.engine.dispose()
+
+
+def post_worker_init(worker):
+    from app import warm_up
+    warm_up(worker.wsgi)
+    worker.log.info("Worker %s warmed up", worker.pid)
@@ -0,0 +1,153 @@
+"""Streaming product image uploads with background transcoding.
+
+The request thread only streams the body to disk and checks that Pillow can
+read it. Transcoding, variant generation and the Product.image_url update
+run on a single background worker thread. Job status is kept in the
+image_job table, so a job can be polled through any worker.
+"""
+import hashlib
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import cache
+import images
+
+CHUNK_SIZE = 64 * 1024
+MAX_SOURCE_DIMENSION = 2048
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF', 'MPO'}
+MAX_TRACKED_JOBS = 200
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-upload')
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def save_stream(stream, upload_dir, max_bytes):
+    """Copy a request body stream to a temp file in fixed-size chunks."""
+    os.makedirs(upload_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=upload_dir, prefix='upload-')
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"Image exceeds {max_bytes} bytes")
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    if written == 0:
+        os.unlink(path)
+        raise InvalidImage("Request body is empty")
+    return path
+
+
+def validate(path):
+    """Make sure Pillow can parse the file header and it is an accepted format."""
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            image.verify()
+    except Exception:
+        raise InvalidImage("Not a valid image file")
+
+    if image_format not in ACCEPTED_FORMATS:
+        raise InvalidImage(f"Unsupported image format: {image_format}")
+
+
+def transcode(source_path, images_dir, product_id):
+    """Normalise an upload to a bounded-size JPEG in images_dir and return its filename."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as source:
+        # Let the JPEG decoder scale down while decoding to keep memory flat
+        source.draft('RGB', (MAX_SOURCE_DIMENSION, MAX_SOURCE_DIMENSION))
+        image = ImageOps.exif_transpose(source).convert('RGB')
+    image.thumbnail((MAX_SOURCE_DIMENSION, MAX_SOURCE_DIMENSION), Image.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=88, optimize=True, progressive=True)
+    data = buffer.getvalue()
+    filename = f"product_{product_id}.{hashlib.sha256(data).hexdigest()[:12]}.jpg"
+    images._atomic_write(os.path.join(images_dir, filename), data)
+    return filename
+
+
+def get_job(job_id):
+    from models import db, ImageJob
+
+    job = db.session.get(ImageJob, job_id)
+    if not job:
+        return None
+    result = {"id": job.id, "product_id": job.product_id, "status": job.status}
+    for field in ('image_url', 'error'):
+        if getattr(job, field) is not None:
+            result[field] = getattr(job, field)
+    return result
+
+
+def _set_job(app, job_id, **fields):
+    from models import db, ImageJob
+
+    with app.app_context():
+        db.session.query(ImageJob).filter_by(id=job_id).update(fields)
+        db.session.commit()
+
+
+def _process(app, job_id, product_id, upload_path):
+    from models import db, ImageJob, Product
+
+    images_dir = os.path.join(app.static_folder, 'images')
+    try:
+        _set_job(app, job_id, status='processing')
+        filename = transcode(upload_path, images_dir, product_id)
+        images.update_manifest(images_dir, {
+            filename: images.generate_variants(os.path.join(images_dir, filename), images.variants_dir(images_dir))
+        })
+
+        image_url = f"/static/images/{filename}"
+        with app.app_context():
+            product = db.session.get(Product, product_id)
+            if not product:
+                raise LookupError(f"Product {product_id} no longer exists")
+            product.image_url = image_url
+            db.session.query(ImageJob).filter_by(id=job_id).update({"status": 'completed', "image_url": image_url})
+            db.session.commit()
+        cache.bump_version(cache.MENU)
+    except Exception as e:
+        app.logger.exception("Image upload %s for product %s failed", job_id, product_id)
+        _set_job(app, job_id, status='failed', error=str(e))
+    finally:
+        if os.path.exists(upload_path):
+            os.unlink(upload_path)
+
+
+def submit(app, product_id, upload_path):
+    """Record a job for an uploaded file, queue it for transcoding and return the job."""
+    from models import db, ImageJob
+
+    job = {"id": uuid.uuid4().hex, "product_id": product_id, "status": 'queued'}
+    db.session.add(ImageJob(**job))
+    # Keep only the most recent jobs
+    recent = db.session.query(ImageJob.id).order_by(ImageJob.created_at.desc()).limit(MAX_TRACKED_JOBS)
+    db.session.query(ImageJob).filter(ImageJob.id.notin_(recent.scalar_subquery())).delete(synchronize_session=False)
+    db.session.commit()
+
+    _executor.submit(_process, app, job["id"], product_id, upload_path)
+    return job
@@ -0,0 +1,189 @@
+"""Responsive image variants for product images.
+
+Each source image under static/images gets width-bucketed WebP and JPEG
+variants written to static/images/variants with content-hashed filenames,
+plus a manifest.json mapping source filename -> width -> format -> variant.
+Variants are generated ahead of time (seed or upload) so requests only
+ever pick an existing file.
+
+    python images.py            # regenerate variants for every image
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are then only serialized within a process
+    fcntl = None
+
+VARIANT_WIDTHS = (160, 320, 640, 1024)
+VARIANTS_DIRNAME = 'variants'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# Pillow save arguments per output format
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_manifest_cache = {}
+_manifest_lock = threading.Lock()
+
+
+def variants_dir(images_dir):
+    return os.path.join(images_dir, VARIANTS_DIRNAME)
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def generate_variants(source_path, output_dir, widths=VARIANT_WIDTHS):
+    """Write every width/format variant of one image.
+
+    Returns {width: {format: variant_filename}}. Widths larger than the
+    source are collapsed into a single variant at the source width so we
+    never upscale.
+    """
+    from PIL import Image, ImageOps
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+
+    buckets = sorted({min(width, image.width) for width in widths})
+    variants = {}
+    for width in buckets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+
+        variants[width] = {}
+        for fmt, (pil_format, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            data = buffer.getvalue()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            ext = 'jpg' if fmt == 'jpeg' else fmt
+            filename = f"{stem}-{width}w.{digest}.{ext}"
+            path = os.path.join(output_dir, filename)
+            if not os.path.exists(path):
+                _atomic_write(path, data)
+            variants[width][fmt] = filename
+
+    return variants
+
+
+def _generate_one(args):
+    source_path, output_dir = args
+    return os.path.basename(source_path), generate_variants(source_path, output_dir)
+
+
+def load_manifest(images_dir):
+    """Return the variant manifest, re-reading it only when the file changes."""
+    path = os.path.join(variants_dir(images_dir), MANIFEST_NAME)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    cached = _manifest_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    manifest = _read_manifest(path)
+    _manifest_cache[path] = (mtime, manifest)
+    return manifest
+
+
+def _read_manifest(path):
+    try:
+        with open(path) as f:
+            return {
+                name: {int(width): formats for width, formats in widths.items()}
+                for name, widths in json.load(f).items()
+            }
+    except FileNotFoundError:
+        return {}
+
+
+@contextmanager
+def _manifest_write_lock(output_dir):
+    """One manifest writer at a time, across threads and worker processes"""
+    with _manifest_lock, open(os.path.join(output_dir, MANIFEST_NAME + '.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+        yield
+
+
+def update_manifest(images_dir, entries):
+    """Merge {source_filename: variants} into the manifest atomically."""
+    output_dir = variants_dir(images_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with _manifest_write_lock(output_dir):
+        # Re-read under the lock, not through the mtime cache: two writes can share an mtime
+        manifest = _read_manifest(path)
+        manifest.update(entries)
+        data = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+        _atomic_write(path, data)
+    return manifest
+
+
+def generate_all(images_dir, filenames=None, workers=None):
+    """Generate variants for the given source images (default: all) on a process pool."""
+    if filenames is None:
+        filenames = sorted(
+            name for name in os.listdir(images_dir)
+            if name.lower().endswith(SOURCE_EXTENSIONS) and os.path.isfile(os.path.join(images_dir, name))
+        )
+
+    output_dir = variants_dir(images_dir)
+    jobs = [(os.path.join(images_dir, name), output_dir) for name in filenames]
+    if not jobs:
+        return load_manifest(images_dir)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        entries = dict(pool.map(_generate_one, jobs))
+
+    return update_manifest(images_dir, entries)
+
+
+def pick_variant(images_dir, filename, width, accept_webp):
+    """Return the variants/ filename best matching `width`, or None if there is none.
+
+    Picks the smallest bucket at least as wide as requested, falling back to
+    the largest one available.
+    """
+    entry = load_manifest(images_dir).get(filename)
+    if not entry:
+        return None
+
+    buckets = sorted(entry)
+    bucket = next((b for b in buckets if b >= width), buckets[-1])
+    formats = entry[bucket]
+    if accept_webp and 'webp' in formats:
+        return formats['webp']
+    return formats.get('jpeg')
+
+
+if __name__ == '__main__':
+    images_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images')
+    manifest = generate_all(images_path)
+    print(f"Generated variants for {len(manifest)} images in {variants_dir(images_path)}")
@@ -0,0 +1,76 @@
+"""JSON provider: orjson when it is installed, the standard library otherwise.
+
+Datetimes are written as 'YYYY-MM-DD HH:MM:SS' and dates as 'YYYY-MM-DD',
+the formats the API has always returned, so views hand model values over
+as they are instead of calling strftime on every row. Everything else
+Flask's default provider knows (Decimal, UUID, dataclasses) still works.
+
+orjson writes non-ASCII characters as UTF-8 rather than \\u escapes; both
+decode to the same values.
+"""
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+import msgpack_codec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Keyword arguments the orjson path understands; anything else goes to json.dumps
+ORJSON_KWARGS = {'indent', 'separators'}
+
+
+def encode_default(o):
+    if isinstance(o, datetime):
+        return o.isoformat(sep=' ', timespec='seconds')
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(encode_default)
+
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+
+    def dump_bytes(self, obj, indent=None):
+        """Serialize to UTF-8 bytes, the form responses and caches need anyway"""
+        if orjson is None:
+            kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+            return self.dumps(obj, **kwargs).encode('utf-8')
+
+        # Datetimes go through encode_default so they keep the API's format
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - ORJSON_KWARGS:
+            return super().dumps(obj, **kwargs)
+        return self.dump_bytes(obj, kwargs.get('indent')).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Every jsonify() and dict return value comes through here, so this is where
+        # kitchen and kiosk clients asking for MessagePack get it, on any blueprint
+        if msgpack_codec.wants_msgpack():
+            response = self._app.response_class(msgpack_codec.packb(obj), mimetype=msgpack_codec.MIMETYPE)
+        else:
+            pretty = (self.compact is None and self._app.debug) or self.compact is False
+            response = self._app.response_class(self.dump_bytes(obj, indent=pretty) + b'\n', mimetype=self.mimetype)
+        if msgpack_codec.msgpack is not None:
+            response.vary.add('Accept')
+        return response
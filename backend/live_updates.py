@@ -0,0 +1,214 @@
+"""Long-poll support for kitchen screens and customers waiting on an order.
+
+A client sends the `version` it last saw and the request is held until the
+data changes or `wait` seconds pass. Waiters are woken by the ChangeWatcher:
+commits made through this process's session wake them at once, and on a
+SQLite file a background thread polls PRAGMA data_version to notice commits
+from other workers. Every waiter also re-checks every RECHECK_SECONDS, which
+is all that detects other processes' writes on other databases.
+
+Under WSGI each held request occupies a worker thread, so at most
+LIVE_MAX_HELD polls are held per worker; beyond that a poll is answered at
+once with the current data, as if it had sent wait=0. The ASGI mode
+(asgi.py) serves the same endpoints from the event loop instead, without
+the cap, so one process can hold hundreds of them.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event, select
+
+import serializers
+from models import Order, Table
+
+OPEN_STATUSES = ('pending', 'processing')
+
+MAX_WAIT_SECONDS = 30.0
+MAX_HELD = 4
+RECHECK_SECONDS = 5.0
+
+
+def wait_seconds(args, max_wait=MAX_WAIT_SECONDS):
+    """The `wait` query argument clamped to [0, max_wait]"""
+    try:
+        wait = float(args.get('wait', 0))
+    except ValueError:
+        wait = 0.0
+    return min(max(wait, 0.0), max_wait)
+
+
+def table_number_query(table_id):
+    return select(Table.table_number).where(Table.id == table_id)
+
+
+def table_orders_query(table_number):
+    return serializers.select_fields(Order, serializers.TABLE_ORDER_FIELDS).where(
+        Order.table_number == table_number, Order.status.in_(OPEN_STATUSES)
+    ).order_by(Order.id)
+
+
+def order_status_query(order_id, user_id):
+    return select(Order.id, Order.status).where(Order.id == order_id, Order.user_id == user_id)
+
+
+def table_orders_body(rows):
+    orders = serializers.rows_as_dicts(serializers.TABLE_ORDER_FIELDS, rows)
+    version = hashlib.sha1(','.join(f"{o['id']}:{o['status']}" for o in orders).encode()).hexdigest()[:16]
+    return {"orders": orders, "version": version}
+
+
+def order_status_body(row):
+    return {"order": {"id": row.id, "status": row.status}, "version": row.status}
+
+
+class ChangeWatcher:
+    """Wakes long-poll waiters, threads and coroutines alike, when the database may have changed"""
+
+    def __init__(self, engine, poll_interval=0.2):
+        self.version = 0
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._futures = set()
+        self._path = None
+        self._poller_pid = None
+        if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            self._path = engine.url.database
+
+    def notify(self):
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+            futures, self._futures = self._futures, set()
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def wait(self, seen, timeout):
+        """Block until the version moves past `seen` or the timeout passes"""
+        self._ensure_poller()
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != seen, timeout)
+
+    async def wait_async(self, seen, timeout):
+        self._ensure_poller()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = (loop, future)
+        with self._condition:
+            if self.version != seen:
+                return
+            self._futures.add(entry)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._futures.discard(entry)
+
+    def _ensure_poller(self):
+        if self._path is None or self._poller_pid == os.getpid():
+            return
+        with self._condition:
+            if self._poller_pid == os.getpid():
+                return
+            self._poller_pid = os.getpid()
+        threading.Thread(target=self._poll, name='change-watcher', daemon=True).start()
+
+    def _poll(self):
+        # data_version changes whenever another connection (in any process) commits
+        conn = sqlite3.connect(self._path, check_same_thread=False)
+        last = conn.execute("PRAGMA data_version").fetchone()[0]
+        while True:
+            time.sleep(self.poll_interval)
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            if current != last:
+                last = current
+                self.notify()
+
+
+def _after_commit(session):
+    # Runs once the commit has landed, so woken waiters see the new rows
+    live = session.app.extensions.get('live_updates')
+    if live is not None:
+        live.watcher.notify()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LiveUpdates:
+    def __init__(self, app=None):
+        self.watcher = None
+        self.max_wait = MAX_WAIT_SECONDS
+        self.max_held = MAX_HELD
+        self._lock = threading.Lock()
+        self._held = 0
+        self._counters = {"held": 0, "answered_at_once": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from models import db
+
+        self.max_wait = app.config.get('LIVE_MAX_WAIT', self.max_wait)
+        self.max_held = app.config.get('LIVE_MAX_HELD', self.max_held)
+        with app.app_context():
+            self.watcher = ChangeWatcher(db.engine)
+        app.extensions['live_updates'] = self
+
+        if not event.contains(db.session, 'after_commit', _after_commit):
+            event.listen(db.session, 'after_commit', _after_commit)
+
+    def hold(self, snapshot, since, wait):
+        """Call snapshot() until its version differs from `since` or `wait` runs out.
+
+        Holds a worker thread, so once max_held polls are waiting in this
+        process the snapshot is returned unchanged straight away.
+        """
+        deadline = time.monotonic() + wait
+        held = False
+        try:
+            while True:
+                seen = self.watcher.version
+                body = snapshot()
+                remaining = deadline - time.monotonic()
+                if body is None or body["version"] != since or remaining <= 0:
+                    return body
+                if not held:
+                    held = self._claim()
+                    if not held:
+                        return body
+                self.watcher.wait(seen, min(remaining, RECHECK_SECONDS))
+        finally:
+            if held:
+                with self._lock:
+                    self._held -= 1
+
+    def _claim(self):
+        with self._lock:
+            if self._held >= self.max_held:
+                self._counters["answered_at_once"] += 1
+                return False
+            self._held += 1
+            self._counters["held"] += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, holding=self._held, max_held=self.max_held, max_wait=self.max_wait)
+
+    async def hold_async(self, snapshot, since, wait):
+        deadline = time.monotonic() + wait
+        while True:
+            seen = self.watcher.version
+            body = await snapshot()
+            remaining = deadline - time.monotonic()
+            if body is None or body["version"] != since or remaining <= 0:
+                return body
+            await self.watcher.wait_async(seen, min(remaining, RECHECK_SECONDS))
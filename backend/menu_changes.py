@@ -0,0 +1,81 @@
+"""Menu revisions for the kiosk change feed (GET /api/products/changes).
+
+Every transaction that writes products or customizations takes the next
+menu revision from the one-row `menu_revision` table and stamps it on each
+row it changes, so a kiosk that has seen revision N only needs the rows
+with a revision above N: one index range scan, however large the menu.
+Deleted products stay as tombstones (is_deleted) so the feed can report
+them.
+
+The counter is bumped with an UPDATE that holds the row's write lock until
+the transaction ends. Menu writes therefore commit in revision order, and
+a reader can never see revision N+1 while N is still uncommitted and about
+to appear behind it.
+
+ORM writes are stamped by a before_flush hook. Bulk inserts and Core
+statements bypass it and must call allocate() themselves.
+"""
+from sqlalchemy import event, select, update
+
+from models import db, Customization, MenuRevision, Product
+
+MENU_MODELS = (Product, Customization)
+SESSION_KEY = 'menu_revision'
+
+COUNTER = MenuRevision.__table__
+
+
+def allocate(session):
+    """This transaction's menu revision, taking the next one on first use"""
+    revision = session.info.get(SESSION_KEY)
+    if revision is None:
+        bumped = session.execute(update(COUNTER).values(revision=COUNTER.c.revision + 1))
+        if bumped.rowcount == 0:
+            # First menu write on a database created without the migration
+            session.execute(COUNTER.insert().values(id=1, revision=1, reset_revision=0))
+        revision = session.execute(select(COUNTER.c.revision)).scalar_one()
+        session.info[SESSION_KEY] = revision
+    return revision
+
+
+def mark_reset(session):
+    """Record that the menu was replaced wholesale: older kiosks must resync from scratch"""
+    revision = allocate(session)
+    session.execute(update(COUNTER).values(reset_revision=revision))
+    return revision
+
+
+def current(session):
+    """(revision, reset_revision) as last committed"""
+    row = session.execute(select(COUNTER.c.revision, COUNTER.c.reset_revision)).first()
+    return tuple(row) if row else (0, 0)
+
+
+def _stamp_menu_rows(session, flush_context, instances):
+    changed = [
+        obj for obj in session.new if isinstance(obj, MENU_MODELS)
+    ] + [
+        obj for obj in session.dirty if isinstance(obj, MENU_MODELS) and session.is_modified(obj)
+    ]
+    if changed:
+        revision = allocate(session)
+        for obj in changed:
+            obj.revision = revision
+
+
+def _forget_revision(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(SESSION_KEY, None)
+
+
+class MenuChanges:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['menu_changes'] = self
+
+        if not event.contains(db.session, 'before_flush', _stamp_menu_rows):
+            event.listen(db.session, 'before_flush', _stamp_menu_rows)
+            event.listen(db.session, 'after_transaction_end', _forget_revision)
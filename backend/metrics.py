@@ -0,0 +1,287 @@
+"""Per-endpoint request latency, SQL query count and DB time metrics.
+
+Flask request signals time each request and SQLAlchemy cursor events count
+the statements it runs, the time spent in the database and whether the SQL
+came from SQLAlchemy's compiled statement cache. Each process
+keeps its own counters and periodically writes a snapshot to METRICS_DIR;
+/metrics merges every worker's snapshot and renders Prometheus text format.
+Without METRICS_DIR only the current process is reported.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import cache
+from flask import Response, g, has_app_context, request
+from flask.signals import request_finished, request_started, signals_available
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+EXCLUDED_ENDPOINTS = {'metrics', 'serve_static'}
+
+# Worker snapshot files; with their in-progress temporaries, nothing else in METRICS_DIR is ours
+SNAPSHOT_NAME = re.compile(r'^metrics-\d+-\d+\.json$')
+TMP_PREFIX = '.tmp-metrics-'
+
+# Textual SQL and statements without a cache key count as uncached
+COMPILED_CACHE_RESULTS = {CACHE_HIT: 'hit', CACHE_MISS: 'miss'}
+
+_compiled_cache_lock = threading.Lock()
+_compiled_cache = {'hit': 0, 'miss': 0, 'uncached': 0}
+
+
+def _observe(buckets, bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            buckets[i] += 1
+            return
+    buckets[-1] += 1  # +Inf
+
+
+def _new_endpoint_stats():
+    return {
+        "requests": {},
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "latency_sum": 0.0,
+        "query_buckets": [0] * (len(QUERY_COUNT_BUCKETS) + 1),
+        "queries": 0,
+        "db_time": 0.0,
+    }
+
+
+def compiled_cache_counts():
+    """SQL executions in this process by compiled cache result."""
+    with _compiled_cache_lock:
+        return dict(_compiled_cache)
+
+
+def _reset_compiled_cache_counts():
+    with _compiled_cache_lock:
+        for result in _compiled_cache:
+            _compiled_cache[result] = 0
+
+
+def clear_snapshots(metrics_dir):
+    """Delete every worker's snapshot from metrics_dir, leaving any other files alone"""
+    try:
+        filenames = os.listdir(metrics_dir)
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        if SNAPSHOT_NAME.match(filename) or filename.startswith(TMP_PREFIX):
+            try:
+                os.remove(os.path.join(metrics_dir, filename))
+            except FileNotFoundError:
+                pass
+
+
+def _merge(into, snapshot):
+    for result, count in snapshot.get("compiled_cache", {}).items():
+        into["compiled_cache"][result] = into["compiled_cache"].get(result, 0) + count
+    for namespace, counts in snapshot.get("cache", {}).items():
+        target = into["cache"].setdefault(namespace, {"hits": 0, "misses": 0})
+        for key in ("hits", "misses"):
+            target[key] += counts[key]
+    for endpoint, stats in snapshot.get("endpoints", {}).items():
+        target = into["endpoints"].setdefault(endpoint, _new_endpoint_stats())
+        for status, count in stats["requests"].items():
+            target["requests"][status] = target["requests"].get(status, 0) + count
+        for key in ("latency_buckets", "query_buckets"):
+            target[key] = [a + b for a, b in zip(target[key], stats[key])]
+        for key in ("latency_sum", "queries", "db_time"):
+            target[key] += stats[key]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    result = COMPILED_CACHE_RESULTS.get(getattr(context, 'cache_hit', None), 'uncached')
+    with _compiled_cache_lock:
+        _compiled_cache[result] += 1
+    if has_app_context() and 'metrics_queries' in g:
+        g.metrics_queries += 1
+        g.metrics_db_time += elapsed
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.metrics_dir = None
+        self.flush_interval = 5.0
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._last_flush = 0.0
+        self._snapshot_path = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.metrics_dir = app.config.get('METRICS_DIR')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', self.flush_interval)
+        app.extensions['metrics'] = self
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        if signals_available:
+            request_started.connect(self._request_started, app)
+            request_finished.connect(self._request_finished, app)
+        else:
+            app.before_request(lambda: self._request_started(app))
+            app.after_request(lambda response: self._request_finished(app, response) or response)
+
+        app.add_url_rule('/metrics', 'metrics', self.render_response)
+
+    def _request_started(self, sender, **extra):
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_time = 0.0
+
+    def _request_finished(self, sender, response, **extra):
+        if 'metrics_start' not in g or request.endpoint in EXCLUDED_ENDPOINTS:
+            return
+        elapsed = time.perf_counter() - g.metrics_start
+        self.observe(request.endpoint or 'unmatched', response.status_code, elapsed, g.metrics_queries, g.metrics_db_time)
+
+    def observe(self, endpoint, status, elapsed, queries, db_time):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, _new_endpoint_stats())
+            status = str(status)
+            stats["requests"][status] = stats["requests"].get(status, 0) + 1
+            _observe(stats["latency_buckets"], LATENCY_BUCKETS, elapsed)
+            stats["latency_sum"] += elapsed
+            _observe(stats["query_buckets"], QUERY_COUNT_BUCKETS, queries)
+            stats["queries"] += queries
+            stats["db_time"] += db_time
+
+        if self.metrics_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = json.loads(json.dumps(self._stats))
+        return {"endpoints": endpoints, "cache": cache.counters(), "compiled_cache": compiled_cache_counts()}
+
+    def _reset_after_fork(self):
+        # Workers forked from a preloaded master start with their own counters and file
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._snapshot_path = None
+        _reset_compiled_cache_counts()
+
+    def _path(self):
+        # One file per process (pid plus start time, so reused pids don't collide)
+        if self._snapshot_path is None:
+            self._snapshot_path = os.path.join(self.metrics_dir, f"metrics-{os.getpid()}-{int(time.time() * 1000)}.json")
+        return self._snapshot_path
+
+    def flush(self):
+        """Atomically write this process's counters to its snapshot file."""
+        self._last_flush = time.monotonic()
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        path = self._path()
+        fd, tmp_path = tempfile.mkstemp(dir=self.metrics_dir, prefix=TMP_PREFIX)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Merge every worker's last snapshot with this process's live counters."""
+        merged = {"endpoints": {}, "cache": {}, "compiled_cache": {}}
+        own_path = self._path() if self.metrics_dir else None
+        if self.metrics_dir and os.path.isdir(self.metrics_dir):
+            for filename in os.listdir(self.metrics_dir):
+                path = os.path.join(self.metrics_dir, filename)
+                if not SNAPSHOT_NAME.match(filename) or path == own_path:
+                    continue
+                try:
+                    with open(path) as f:
+                        _merge(merged, json.load(f))
+                except (OSError, ValueError):
+                    continue
+        _merge(merged, self.snapshot())
+        return merged
+
+    def render(self):
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, endpoint, bounds, buckets, total):
+            cumulative = 0
+            for bound, count in zip(bounds, buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            cumulative += buckets[-1]
+            lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {cumulative}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {total}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {cumulative}')
+
+        collected = self.collect()
+        stats = sorted(collected["endpoints"].items())
+
+        header('cafe_requests_total', 'counter', 'Requests by endpoint and status code')
+        for endpoint, s in stats:
+            for status, count in sorted(s["requests"].items()):
+                lines.append(f'cafe_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        header('cafe_request_duration_seconds', 'histogram', 'Request latency by endpoint')
+        for endpoint, s in stats:
+            histogram('cafe_request_duration_seconds', endpoint, LATENCY_BUCKETS, s["latency_buckets"], s["latency_sum"])
+
+        header('cafe_db_queries_per_request', 'histogram', 'SQL statements issued per request')
+        for endpoint, s in stats:
+            histogram('cafe_db_queries_per_request', endpoint, QUERY_COUNT_BUCKETS, s["query_buckets"], s["queries"])
+
+        header('cafe_db_time_seconds_total', 'counter', 'Time spent executing SQL per endpoint')
+        for endpoint, s in stats:
+            lines.append(f'cafe_db_time_seconds_total{{endpoint="{endpoint}"}} {s["db_time"]}')
+
+        header('cafe_db_compiled_cache_total', 'counter', 'SQL executions by compiled statement cache result')
+        for result, count in sorted(collected["compiled_cache"].items()):
+            lines.append(f'cafe_db_compiled_cache_total{{result="{result}"}} {count}')
+
+        header('cafe_cache_lookups_total', 'counter', 'Cache lookups by namespace and result')
+        for namespace, counts in sorted(collected["cache"].items()):
+            lines.append(f'cafe_cache_lookups_total{{namespace="{namespace}",result="hit"}} {counts["hits"]}')
+            lines.append(f'cafe_cache_lookups_total{{namespace="{namespace}",result="miss"}} {counts["misses"]}')
+
+        # Sizes come from the backend: the whole host for the shared one, this process otherwise
+        sizes = cache.stats()["namespaces"]
+        header('cafe_cache_entries', 'gauge', 'Cached entries by namespace')
+        for namespace, s in sorted(sizes.items()):
+            lines.append(f'cafe_cache_entries{{namespace="{namespace}"}} {s.get("entries", 0)}')
+        header('cafe_cache_bytes', 'gauge', 'Approximate size of cached values by namespace')
+        for namespace, s in sorted(sizes.items()):
+            lines.append(f'cafe_cache_bytes{{namespace="{namespace}"}} {s.get("bytes", 0)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def compiled_cache_stats(self, engine):
+        """This process's compiled cache results and the size of `engine`'s cache"""
+        counts = compiled_cache_counts()
+        cached = counts['hit'] + counts['miss']
+        compiled = getattr(engine, '_compiled_cache', None)
+        return dict(
+            counts,
+            hit_ratio=round(counts['hit'] / cached, 4) if cached else None,
+            entries=len(compiled) if compiled is not None else None,
+            capacity=getattr(compiled, 'capacity', None)
+        )
+
+    def render_response(self):
+        return Response(self.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -71,6 +71,12 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # The search indexes (search.py) and their FTS5 shadow tables are not models
+    def include_name(name, type_, parent_names):
+        if type_ == 'table':
+            return not name.startswith(('product_search', 'product_trigrams'))
+        return True
+
     connectable = current_app.extensions['migrate'].db.get_engine()
 
     with connectable.connect() as connection:
@@ -78,6 +84,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_name=include_name,
             **current_app.extensions['migrate'].configure_args
         )
 
@@ -0,0 +1,41 @@
+"""Add product recommendations
+
+Revision ID: 5e1c7b3a9d04
+Revises: 9a4f6c2e8b13
+Create Date: 2026-10-18 23:48:16.402957
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1c7b3a9d04'
+down_revision = '9a4f6c2e8b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_pair',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('other_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['other_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'other_id')
+    )
+    op.create_table('product_recommendation',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('recommended_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['recommended_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'position')
+    )
+
+
+def downgrade():
+    op.drop_table('product_recommendation')
+    op.drop_table('product_pair')
@@ -0,0 +1,42 @@
+"""Add menu revisions
+
+Revision ID: 7d2b8e4c91a6
+Revises: 3c9e7a1d52f0
+Create Date: 2026-10-18 14:40:09.518233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2b8e4c91a6'
+down_revision = '3c9e7a1d52f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    menu_revision = op.create_table('menu_revision',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.Column('reset_revision', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(menu_revision, [{'id': 1, 'revision': 0, 'reset_revision': 0}])
+
+    for table in ('product', 'customization'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('is_deleted', sa.Boolean(), server_default=sa.false(), nullable=False))
+            batch_op.create_index(batch_op.f(f'ix_{table}_revision'), ['revision'], unique=False)
+
+
+def downgrade():
+    for table in ('customization', 'product'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_revision'))
+            batch_op.drop_column('is_deleted')
+            batch_op.drop_column('revision')
+
+    op.drop_table('menu_revision')
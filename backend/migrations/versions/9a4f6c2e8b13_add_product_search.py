@@ -0,0 +1,85 @@
+"""Add product search indexes
+
+Revision ID: 9a4f6c2e8b13
+Revises: 7d2b8e4c91a6
+Create Date: 2026-10-18 17:05:42.730115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4f6c2e8b13'
+down_revision = '7d2b8e4c91a6'
+branch_labels = None
+depends_on = None
+
+# As created by search.py for new databases
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE product_search USING fts5("
+    "name, description, category, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE product_trigrams USING fts5("
+    "name, content='product', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER product_search_insert AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_search (rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); "
+    "INSERT INTO product_trigrams (rowid, name) VALUES (new.id, new.name); "
+    "END",
+    "CREATE TRIGGER product_search_delete AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_search (product_search, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); "
+    "INSERT INTO product_trigrams (product_trigrams, rowid, name) VALUES ('delete', old.id, old.name); "
+    "END",
+    "CREATE TRIGGER product_search_update AFTER UPDATE OF name, description, category ON product BEGIN "
+    "INSERT INTO product_search (product_search, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); "
+    "INSERT INTO product_trigrams (product_trigrams, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO product_search (rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); "
+    "INSERT INTO product_trigrams (rowid, name) VALUES (new.id, new.name); "
+    "END",
+    # Index the products already there
+    "INSERT INTO product_search (product_search) VALUES ('rebuild')",
+    "INSERT INTO product_trigrams (product_trigrams) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER product_search_update",
+    "DROP TRIGGER product_search_delete",
+    "DROP TRIGGER product_search_insert",
+    "DROP TABLE product_trigrams",
+    "DROP TABLE product_search",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX ix_product_search ON product USING gin (("
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')))",
+    "CREATE INDEX ix_product_name_trgm ON product USING gin (name gin_trgm_ops)",
+]
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX ix_product_name_trgm",
+    "DROP INDEX ix_product_search",
+]
+
+
+def _statements(upgrade):
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return SQLITE_UPGRADE if upgrade else SQLITE_DOWNGRADE
+    if dialect == 'postgresql':
+        return POSTGRES_UPGRADE if upgrade else POSTGRES_DOWNGRADE
+    return []
+
+
+def upgrade():
+    for statement in _statements(upgrade=True):
+        op.execute(statement)
+
+
+def downgrade():
+    for statement in _statements(upgrade=False):
+        op.execute(statement)
@@ -1,10 +1,10 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import uuid
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import foreign
+from replicas import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -16,6 +16,7 @@ class User(db.Model):
     birthday = db.Column(db.Date, nullable=True)
     loyalty_points = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped by writes to the user's data (etags.py)
     
     # Relationships
     orders = db.relationship('Order', backref='customer', lazy=True)
@@ -31,6 +32,8 @@ class Product(db.Model):
     image_url = db.Column(db.String(255), nullable=True)
     is_available = db.Column(db.Boolean, default=True)
     points_value = db.Column(db.Integer, default=0)  # Points earned per purchase
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)  # Menu revision of the last change (menu_changes.py)
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # Tombstone kept for the change feed
     
     # Relationships
     customizations = db.relationship('Customization', backref='product', lazy=True)
@@ -42,6 +45,14 @@ class Customization(db.Model):
     name = db.Column(db.String(100), nullable=False)
     options = db.Column(db.JSON, nullable=False)  # List of possible options
     price_impact = db.Column(db.JSON, nullable=False)  # Price impact per option
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+class MenuRevision(db.Model):
+    # A single row: the last revision handed out to a menu write (menu_changes.py)
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    reset_revision = db.Column(db.Integer, nullable=False, default=0)  # Set when the menu is rebuilt from scratch
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -65,6 +76,28 @@ class OrderItem(db.Model):
     unit_price = db.Column(db.Float, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
 
+class ProductPair(db.Model):
+    # Orders containing both products, stored in both directions (recommendations.py)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    other_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+class ProductRecommendation(db.Model):
+    # Each product's most frequent pairs, best first (position 1)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    recommended_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    orders = db.Column(db.Integer, nullable=False)
+
+class ImageJob(db.Model):
+    # Background product image upload (image_uploads.py), stored here so every worker can report it
+    id = db.Column(db.String(32), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, processing, completed, failed
+    image_url = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
 class GiftCard(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(20), unique=True, nullable=False, default=lambda: str(uuid.uuid4())[:8].upper())
@@ -0,0 +1,160 @@
+"""On-demand per-request profiling.
+
+A request is profiled when it carries a valid signed X-Profile header, or when
+it falls in the PROFILE_SAMPLE_RATE random sample. It runs under cProfile, or
+under pyinstrument when that is installed and PROFILER=pyinstrument. The result
+is written to PROFILE_DIR/<endpoint>/, keeping the newest PROFILE_RETENTION
+files per endpoint, and the admin API lists and downloads them.
+
+Header tokens are "<expires>.<signature>", an HMAC-SHA256 of the expiry time
+keyed with PROFILE_SECRET, so only holders of the secret (or an admin, via
+POST /api/admin/profiles/token) can make a production request pay the
+profiling overhead.
+"""
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import re
+import time
+
+from flask import g, request
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+HEADER = 'X-Profile'
+TOKEN_TTL = 15 * 60
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+# <created ms>-<pid>-<status>-<duration>ms.<prof|txt>, as written by Profiling.save()
+_PROFILE_NAME = re.compile(r'^(\d+)-(\d+)-(\d+)-(\d+)ms\.(?:prof|txt)$')
+
+
+def _signature(secret, expires):
+    return hmac.new(secret.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def make_token(secret, ttl=TOKEN_TTL):
+    expires = int(time.time()) + ttl
+    return f"{expires}.{_signature(secret, expires)}", expires
+
+
+def verify_token(secret, token):
+    expires, _, signature = (token or '').partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(secret, int(expires)))
+
+
+class Profiling:
+    def __init__(self, app=None):
+        self.profile_dir = None
+        self.secret = None
+        self.sample_rate = 0.0
+        self.retention = 20
+        self.use_pyinstrument = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.profile_dir = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+        self.secret = app.config.get('PROFILE_SECRET') or app.config['JWT_SECRET_KEY']
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', self.sample_rate)
+        self.retention = app.config.get('PROFILE_RETENTION', self.retention)
+        self.use_pyinstrument = app.config.get('PROFILER') == 'pyinstrument' and pyinstrument is not None
+
+        app.extensions['profiling'] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def should_profile(self):
+        if request.method == 'OPTIONS' or request.endpoint is None:
+            return False
+        if HEADER in request.headers:
+            return verify_token(self.secret, request.headers[HEADER])
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _before_request(self):
+        if not self.should_profile():
+            return
+        if self.use_pyinstrument:
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        g._profiler = profiler
+        g._profile_start = time.perf_counter()
+
+    def _after_request(self, response):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return response
+
+        elapsed = time.perf_counter() - g.pop('_profile_start')
+        if self.use_pyinstrument:
+            profiler.stop()
+        else:
+            profiler.disable()
+
+        profile_id = self.save(profiler, request.endpoint, response.status_code, elapsed)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def _endpoint_dir(self, endpoint):
+        return os.path.join(self.profile_dir, _UNSAFE_CHARS.sub('_', endpoint))
+
+    def save(self, profiler, endpoint, status, elapsed):
+        """Write a profile and trim the endpoint's directory to the retention cap."""
+        directory = self._endpoint_dir(endpoint)
+        os.makedirs(directory, exist_ok=True)
+        # Sortable by time; status and duration are kept in the name for listing
+        stem = f"{int(time.time() * 1000)}-{os.getpid()}-{status}-{elapsed * 1000:.0f}ms"
+        if self.use_pyinstrument:
+            filename = f"{stem}.txt"
+            with open(os.path.join(directory, filename), 'w') as f:
+                f.write(profiler.output_text())
+        else:
+            filename = f"{stem}.prof"
+            profiler.dump_stats(os.path.join(directory, filename))
+
+        for old in sorted(name for name in os.listdir(directory) if _PROFILE_NAME.match(name))[:-self.retention]:
+            try:
+                os.remove(os.path.join(directory, old))
+            except OSError:
+                pass  # another worker got there first
+
+        return f"{os.path.basename(directory)}/{filename}"
+
+    def list_profiles(self):
+        profiles = []
+        if not os.path.isdir(self.profile_dir):
+            return profiles
+        for endpoint in sorted(os.listdir(self.profile_dir)):
+            directory = os.path.join(self.profile_dir, endpoint)
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory), reverse=True):
+                # Anything else in the directory (editor droppings, a partial write) is not a profile
+                match = _PROFILE_NAME.match(filename)
+                if not match:
+                    continue
+                try:
+                    size = os.path.getsize(os.path.join(directory, filename))
+                except OSError:
+                    continue  # trimmed by another worker since the listing
+                created_ms, pid, status, duration = match.groups()
+                profiles.append({
+                    "id": f"{endpoint}/{filename}",
+                    "endpoint": endpoint,
+                    "created_at": int(created_ms) / 1000,
+                    "pid": int(pid),
+                    "status": int(status),
+                    "duration_ms": int(duration),
+                    "size": size,
+                })
+        return profiles
@@ -0,0 +1,183 @@
+"""Frequently-bought-together recommendations (GET /api/products/<id>/recommendations).
+
+product_pair is the co-occurrence matrix, stored sparsely: for every two
+products bought together, the number of orders containing both, once in
+each direction. product_recommendation keeps each product's top
+RECOMMENDATIONS_TOP_K partners by that count. Serving a product's
+suggestions is a primary-key range read of the second table, and never
+touches the order history.
+
+rebuild() recomputes both tables from order_item in one batch pass,
+vectorized with NumPy when it is installed. After that, create_order calls
+record_order() in the order's own transaction. It adds one to the counts of
+the new order's pairs and re-ranks the top-k rows of the products in it.
+That is three statements, and only for orders with two or more products.
+Rows are written in sorted key order and upserted in place, so concurrent
+orders that share a product wait on each other's row locks rather than
+deadlocking or inserting the same position twice.
+Incremental updates need INSERT ... ON CONFLICT (SQLite and Postgres). On
+other databases the tables change only when rebuild() runs.
+"""
+import heapq
+import itertools
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import ProductPair, ProductRecommendation
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PAIRS = ProductPair.__table__
+RECOMMENDATIONS = ProductRecommendation.__table__
+
+UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Rows written per executemany by rebuild()
+INSERT_BATCH_SIZE = 50000
+
+# Read straight through the driver: SQLAlchemy's per-row processing would cost more than the pass itself
+ORDER_ITEMS_SQL = 'SELECT order_id, product_id FROM order_item'
+
+
+def record_order(session, product_ids, top_k):
+    """Count a new order's product pairs and refresh the top-k rows of its products"""
+    ids = sorted(set(product_ids))
+    upsert = UPSERTS.get(session.get_bind(mapper=ProductPair.__mapper__).dialect.name)
+    if len(ids) < 2 or upsert is None:
+        return
+
+    # permutations() of the sorted ids follows the primary key order
+    statement = upsert(PAIRS).on_conflict_do_update(
+        index_elements=[PAIRS.c.product_id, PAIRS.c.other_id],
+        set_={"orders": PAIRS.c.orders + 1}
+    )
+    session.execute(statement, [
+        {"product_id": a, "other_id": b, "orders": 1}
+        for a, b in itertools.permutations(ids, 2)
+    ])
+
+    # Re-rank from the products' pair rows: an index range per product, bounded by the menu size
+    ranked = select(
+        PAIRS.c.product_id, PAIRS.c.other_id, PAIRS.c.orders,
+        func.row_number().over(
+            partition_by=PAIRS.c.product_id, order_by=(PAIRS.c.orders.desc(), PAIRS.c.other_id)
+        ).label('position')
+    ).where(PAIRS.c.product_id.in_(ids)).subquery()
+    statement = upsert(RECOMMENDATIONS).from_select(
+        ['product_id', 'recommended_id', 'orders', 'position'],
+        select(ranked.c.product_id, ranked.c.other_id, ranked.c.orders, ranked.c.position)
+        .where(ranked.c.position <= top_k)
+        .order_by(ranked.c.product_id, ranked.c.position)
+    )
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[RECOMMENDATIONS.c.product_id, RECOMMENDATIONS.c.position],
+        set_={"recommended_id": statement.excluded.recommended_id, "orders": statement.excluded.orders}
+    ))
+
+    # Only positions past the new ranking go, e.g. after RECOMMENDATIONS_TOP_K was lowered
+    partners = select(func.count()).where(PAIRS.c.product_id == RECOMMENDATIONS.c.product_id).scalar_subquery()
+    session.execute(delete(RECOMMENDATIONS).where(
+        RECOMMENDATIONS.c.product_id.in_(ids),
+        or_(RECOMMENDATIONS.c.position > top_k, RECOMMENDATIONS.c.position > partners)
+    ))
+
+
+def _pairs_numpy(rows):
+    """(product_ids, other_ids, counts) arrays, both directions, from (order_id, product_id) rows"""
+    items = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+    if not len(items):
+        return items[:, 0], items[:, 0], items[:, 0]
+
+    # Sort by order, then product, and drop repeated products within an order
+    items = items[np.lexsort((items[:, 1], items[:, 0]))]
+    orders, products = items[:, 0], items[:, 1]
+    keep = np.ones(len(items), dtype=bool)
+    keep[1:] = (orders[1:] != orders[:-1]) | (products[1:] != products[:-1])
+    orders, products = orders[keep], products[keep]
+
+    # Item i pairs with item i + d of the same order; no order longer than d means none longer than d + 1
+    firsts, seconds = [], []
+    for distance in itertools.count(1):
+        same_order = orders[distance:] == orders[:-distance]
+        if not same_order.any():
+            break
+        firsts.append(products[:-distance][same_order])
+        seconds.append(products[distance:][same_order])
+    if not firsts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    width = int(products.max()) + 1
+    codes = np.concatenate((first * width + second, second * width + first))
+    codes, counts = np.unique(codes, return_counts=True)
+    return codes // width, codes % width, counts
+
+
+def _top_numpy(product_ids, other_ids, counts, top_k):
+    """(product_id, position, recommended_id, orders) rows of each product's top_k pairs"""
+    order = np.lexsort((other_ids, -counts, product_ids))
+    product_ids, other_ids, counts = product_ids[order], other_ids[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, product_ids[1:] != product_ids[:-1]])
+    positions = np.arange(len(product_ids)) - np.repeat(starts, np.diff(np.r_[starts, len(product_ids)])) + 1
+    keep = positions <= top_k
+    return zip(product_ids[keep].tolist(), positions[keep].tolist(),
+               other_ids[keep].tolist(), counts[keep].tolist())
+
+
+def _pairs_python(rows):
+    counts = Counter()
+    for _, items in itertools.groupby(rows, key=lambda row: row[0]):
+        products = sorted({product_id for _, product_id in items})
+        counts.update(itertools.permutations(products, 2))
+    return counts
+
+
+def _top_python(counts, top_k):
+    partners = defaultdict(list)
+    for (product_id, other_id), orders in counts.items():
+        partners[product_id].append((-orders, other_id))
+    for product_id in sorted(partners):
+        for position, (orders, other_id) in enumerate(heapq.nsmallest(top_k, partners[product_id]), 1):
+            yield product_id, position, other_id, -orders
+
+
+def _insert(session, table, fields, rows):
+    written = 0
+    for batch in iter(lambda: list(itertools.islice(rows, INSERT_BATCH_SIZE)), []):
+        session.execute(table.insert(), [dict(zip(fields, row)) for row in batch])
+        written += len(batch)
+    return written
+
+
+def rebuild(session, top_k, use_numpy=True):
+    """Recompute both tables from every order; the caller commits.
+
+    The old rows are deleted first, which takes the write lock before
+    order_item is read, so no order can commit between the read and the
+    write and be counted twice or missed.
+    """
+    session.execute(delete(RECOMMENDATIONS))
+    session.execute(delete(PAIRS))
+
+    connection = session.connection()
+    if use_numpy and np is not None:
+        # Sorted in NumPy, which is faster than asking the database for an ORDER BY
+        product_ids, other_ids, counts = _pairs_numpy(connection.exec_driver_sql(ORDER_ITEMS_SQL))
+        pairs = zip(product_ids.tolist(), other_ids.tolist(), counts.tolist())
+        top = _top_numpy(product_ids, other_ids, counts, top_k)
+    else:
+        counts = _pairs_python(connection.exec_driver_sql(ORDER_ITEMS_SQL + ' ORDER BY order_id'))
+        pairs = ((a, b, orders) for (a, b), orders in counts.items())
+        top = _top_python(counts, top_k)
+
+    return {
+        "pairs": _insert(session, PAIRS, ('product_id', 'other_id', 'orders'), iter(pairs)),
+        "recommendations": _insert(session, RECOMMENDATIONS,
+                                   ('product_id', 'position', 'recommended_id', 'orders'), iter(top)),
+    }
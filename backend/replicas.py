@@ -0,0 +1,285 @@
+"""Read replica routing.
+
+With REPLICA_DATABASE_URI set, GET views marked with @replica_read run their
+queries against the replica while everything else stays on the primary, so
+menu, order history, loyalty and kitchen/reporting reads stop competing with
+order writes. After a successful write, a client is pinned to the primary for
+REPLICA_READ_YOUR_WRITES_SECONDS so it always sees its own changes. The pin's
+expiry is returned in an X-Primary-Until header, which the SPA echoes on its
+next requests (the API is cross-origin, so it never sends cookies), and that
+brings the pin to whichever worker or host serves them. Same-origin clients
+get it as a cookie too, and the worker that took the write also pins the JWT
+identity itself.
+
+When both databases are SQLite files the replica is a copy of the primary,
+refreshed every REPLICA_SYNC_INTERVAL seconds with SQLite's online backup API.
+This is a stand-in for a real replica (PostgreSQL streaming replication,
+Litestream, ...) that makes routing testable on one machine; with a real
+replica set REPLICA_SYNC_INTERVAL=0.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+
+try:
+    import fcntl
+except ImportError:  # Windows: workers' syncs are then only spaced out by the sync stamp
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+PIN_COOKIE = 'primary_until'
+PIN_HEADER = 'X-Primary-Until'
+READ_METHODS = {'GET', 'HEAD'}
+
+# Forget pins once this many identities are tracked; they expire after a few seconds anyway
+MAX_PINNED_IDENTITIES = 10000
+
+
+def replica_read(view):
+    """Mark a read-only GET view as safe to serve from the replica.
+
+    Place it directly under the route decorator. Views that fill shared caches
+    should not use it: a stale replica would be cached under a fresh version.
+    """
+    view.replica_read = True
+    return view
+
+
+def pins_own_writes(view):
+    """Mark a non-GET view that calls ReadReplica.pin itself, only once it has written"""
+    view.pins_own_writes = True
+    return view
+
+
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = current_app.extensions.get('read_replica')
+        if replica is not None and replica.use_replica():
+            return replica.engine
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy whose sessions can route reads to the replica"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # The view did not verify a token
+        return None
+
+
+class ReadReplica:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.engine = None
+        self.window = 5.0
+        self.sync_interval = 2.0
+        self._lock = threading.Lock()
+        self._pins = {}
+        self._routed = {"replica": 0, "primary": 0, "pinned": 0}
+        self._source_path = None
+        self._replica_path = None
+        self._ready = False
+        self._syncer_pid = None
+        self._syncer_lock = threading.Lock()
+        self._syncs = {"runs": 0, "skipped": 0, "failures": 0, "last_at": None, "last_duration_ms": None}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from models import db
+
+        app.extensions['read_replica'] = self
+        uri = app.config.get('REPLICA_DATABASE_URI')
+        if not uri:
+            return
+
+        self.window = app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS', self.window)
+        self.sync_interval = app.config.get('REPLICA_SYNC_INTERVAL', self.sync_interval)
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **{REPLICA_BIND: uri})
+        with app.app_context():
+            primary = db.get_engine(app)
+            self.engine = db.get_engine(app, bind=REPLICA_BIND)
+        self.enabled = True
+
+        busy_timeout = int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+        if self.engine.dialect.name == 'sqlite':
+            @event.listens_for(self.engine, 'connect')
+            def read_only(dbapi_connection, connection_record):
+                # A view that writes by mistake fails loudly instead of diverging from the primary
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA query_only=ON")
+                cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+                cursor.close()
+
+            if primary.dialect.name == 'sqlite':
+                self._source_path = primary.url.database
+                self._replica_path = self.engine.url.database
+
+        app.after_request(self._pin_after_write)
+        if self._replica_path and self.sync_interval:
+            # Started from the first request so each (forked) worker runs its own thread
+            app.before_request(self._ensure_syncer)
+
+    def use_replica(self):
+        """Whether the current request's queries go to the replica; decided once per request"""
+        if not self.enabled or not has_request_context():
+            return False
+        route = g.get('replica_route')
+        if route is None:
+            route = self._choose_route()
+            g.replica_route = route
+            with self._lock:
+                self._routed[route] += 1
+        return route == 'replica'
+
+    def _choose_route(self):
+        view = current_app.view_functions.get(request.endpoint)
+        if request.method not in READ_METHODS or not getattr(view, 'replica_read', False):
+            return 'primary'
+        if self._replica_path and not self._replica_ready():
+            return 'primary'
+
+        now = time.time()
+        pinned_until = self._client_pin(now)
+        identity = _current_identity()
+        if identity is not None:
+            with self._lock:
+                pinned_until = max(pinned_until, self._pins.get(identity, 0))
+        return 'pinned' if pinned_until > now else 'replica'
+
+    def _client_pin(self, now):
+        """The latest pin the client sent back, by header or cookie"""
+        pinned_until = 0
+        for value in (request.headers.get(PIN_HEADER), request.cookies.get(PIN_COOKIE)):
+            try:
+                pinned_until = max(pinned_until, float(value or 0))
+            except ValueError:
+                pass
+        # No write pins for longer than the window: a later time was not set by us
+        return pinned_until if pinned_until <= now + self.window else 0
+
+    def _pin_after_write(self, response):
+        if getattr(current_app.view_functions.get(request.endpoint), 'pins_own_writes', False):
+            return response
+        return self.pin_if_written(response)
+
+    def pin_if_written(self, response):
+        """Pin the client if the current request was a successful write"""
+        if not self.enabled or request.method in READ_METHODS or request.method == 'OPTIONS':
+            return response
+        if response.status_code >= 400:
+            return response
+        return self.pin(response)
+
+    def pin(self, response):
+        """Pin the current client to the primary for the read-your-writes window"""
+        now = time.time()
+        pinned_until = now + self.window
+        identity = _current_identity()
+        if identity is not None:
+            with self._lock:
+                if len(self._pins) >= MAX_PINNED_IDENTITIES:
+                    self._pins = {key: until for key, until in self._pins.items() if until > now}
+                self._pins[identity] = pinned_until
+        response.headers[PIN_HEADER] = f"{pinned_until:.3f}"
+        response.set_cookie(PIN_COOKIE, f"{pinned_until:.3f}", max_age=int(self.window) + 1,
+                            httponly=True, samesite='Lax')
+        return response
+
+    def _ensure_syncer(self):
+        if self._syncer_pid == os.getpid():
+            return
+        with self._syncer_lock:
+            if self._syncer_pid == os.getpid():
+                return
+            self._syncer_pid = os.getpid()
+            thread = threading.Thread(target=self._sync_loop, name='replica-sync', daemon=True)
+            thread.start()
+
+    def _sync_loop(self):
+        while True:
+            try:
+                self.sync()
+            except Exception:
+                self._syncs["failures"] += 1
+                logger.exception("Replica sync failed")
+            time.sleep(self.sync_interval)
+
+    def sync(self):
+        """Copy the primary SQLite file onto the replica; returns False when skipped"""
+        if not self._replica_path:
+            raise RuntimeError("Replica sync needs SQLite files for both the primary and the replica")
+
+        # Every worker runs a sync thread: an exclusive lock lets one copy at a time, and the
+        # time of the last copy (kept in the lock file) stops the others from repeating it
+        with open(self._sync_stamp_path(), 'a+') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    self._syncs["skipped"] += 1
+                    return False
+            if time.time() - self._last_sync() < self.sync_interval / 2:
+                self._syncs["skipped"] += 1
+                return False
+
+            start = time.perf_counter()
+            source = sqlite3.connect(self._source_path)
+            target = sqlite3.connect(self._replica_path, timeout=30)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+
+            lock_file.truncate(0)
+            lock_file.write(str(time.time()))
+
+        self._syncs.update(runs=self._syncs["runs"] + 1, last_at=time.time(),
+                           last_duration_ms=round((time.perf_counter() - start) * 1000, 2))
+        return True
+
+    def _sync_stamp_path(self):
+        return self._replica_path + '.sync-lock'
+
+    def _last_sync(self):
+        try:
+            with open(self._sync_stamp_path()) as f:
+                return float(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _replica_ready(self):
+        # The replica file can exist before its first copy (any connection creates it), so
+        # wait for a sync stamp; once there, the replica never goes back to being empty
+        if not self._ready:
+            self._ready = self._last_sync() > 0
+        return self._ready
+
+    def stats(self):
+        with self._lock:
+            routed, pinned_identities = dict(self._routed), len(self._pins)
+        return {
+            "enabled": self.enabled,
+            "read_your_writes_seconds": self.window,
+            "routed": routed,
+            "pinned_identities": pinned_identities,
+            "sync_interval": self.sync_interval if self._replica_path else None,
+            "syncs": dict(self._syncs),
+        }
@@ -0,0 +1,119 @@
+from flask import Blueprint, jsonify, current_app, request, send_from_directory
+from flask_jwt_extended import jwt_required
+import structured_logging
+import cache
+import recommendations
+from models import db
+from profiling import make_token
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/admission', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_admission_stats():
+    admission = current_app.extensions['admission']
+    
+    return jsonify({"admission": admission.stats()}), 200
+
+@admin_bp.route('/sqlite', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_sqlite_settings():
+    return jsonify({"sqlite": current_app.extensions['sqlite_profile'].stats()}), 200
+
+@admin_bp.route('/replica', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_replica_stats():
+    return jsonify({"replica": current_app.extensions['read_replica'].stats()}), 200
+
+@admin_bp.route('/live', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_live_stats():
+    return jsonify({"live": current_app.extensions['live_updates'].stats()}), 200
+
+@admin_bp.route('/cache', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_cache_stats():
+    return jsonify({"cache": cache.stats()}), 200
+
+@admin_bp.route('/statements', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_statement_cache_stats():
+    """Compiled statement cache hits and misses in this worker"""
+    metrics = current_app.extensions['metrics']
+    
+    return jsonify({"compiled_cache": metrics.compiled_cache_stats(db.engine)}), 200
+
+@admin_bp.route('/logging', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_logging_settings():
+    return jsonify({"logging": structured_logging.logging_stats()}), 200
+
+@admin_bp.route('/logging/request-dumps', methods=['PUT'])
+@jwt_required()  # Should add admin check in production
+def set_request_dump():
+    """Turn header dumps on or off for one endpoint (or '*') in every worker sharing the cache"""
+    data = request.get_json()
+    
+    if not data.get('endpoint'):
+        return jsonify({"error": "Endpoint is required"}), 400
+    
+    structured_logging.set_request_dump(data['endpoint'], data.get('enabled', True))
+    
+    return jsonify({"logging": structured_logging.logging_stats()}), 200
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_slow_queries():
+    """Slowest statement fingerprints in this worker, by total time"""
+    slow_queries = current_app.extensions['slow_queries']
+    limit = request.args.get('limit', 20, type=int)
+    
+    return jsonify({
+        "threshold_ms": slow_queries.threshold * 1000,
+        "slow_queries": slow_queries.top(limit),
+        "recent": slow_queries.recent()
+    }), 200
+
+@admin_bp.route('/slow-queries', methods=['DELETE'])
+@jwt_required()  # Should add admin check in production
+def reset_slow_queries():
+    current_app.extensions['slow_queries'].reset()
+    
+    return jsonify({"message": "Slow query log cleared"}), 200
+
+@admin_bp.route('/profiles', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_profiles():
+    profiling = current_app.extensions['profiling']
+    endpoint = request.args.get('endpoint')
+    
+    profiles = profiling.list_profiles()
+    if endpoint:
+        profiles = [p for p in profiles if p['endpoint'] == endpoint]
+    
+    return jsonify({"profiles": profiles}), 200
+
+@admin_bp.route('/profiles/<endpoint>/<filename>', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def download_profile(endpoint, filename):
+    profiling = current_app.extensions['profiling']
+    
+    return send_from_directory(profiling.profile_dir, f"{endpoint}/{filename}", as_attachment=True)
+
+@admin_bp.route('/profiles/token', methods=['POST'])
+@jwt_required()  # Should add admin check in production
+def create_profile_token():
+    """Short-lived value for the X-Profile header"""
+    profiling = current_app.extensions['profiling']
+    token, expires = make_token(profiling.secret)
+    
+    return jsonify({"header": "X-Profile", "token": token, "expires_at": expires}), 201
+
+@admin_bp.route('/recommendations/rebuild', methods=['POST'])
+@jwt_required()  # Should add admin check in production
+def rebuild_recommendations():
+    """Recompute the co-occurrence index from the whole order history"""
+    stats = recommendations.rebuild(db.session, current_app.config['RECOMMENDATIONS_TOP_K'])
+    db.session.commit()
+    
+    return jsonify({"message": "Recommendations rebuilt", "recommendations": stats}), 200
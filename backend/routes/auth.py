@@ -2,7 +2,11 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, get_jwt_identity, jwt_required
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-from models import db, User
+from models import db, User, GiftCard
+from sqlalchemy import select
+import etags
+import serializers
+import statements
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -12,7 +16,7 @@ def register():
         data = request.get_json()
         
         # Check if user already exists
-        if User.query.filter_by(email=data['email']).first():
+        if statements.user_by_email(data['email']):
             return jsonify({"error": "Email already registered"}), 400
         
         if User.query.filter_by(username=data['username']).first():
@@ -54,7 +58,7 @@ def login():
     try:
         data = request.get_json()
         
-        user = User.query.filter_by(email=data['email']).first()
+        user = statements.user_by_email(data['email'])
         
         if not user or not check_password_hash(user.password, data['password']):
             return jsonify({"error": "Invalid email or password"}), 401
@@ -78,26 +82,16 @@ def login():
 
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
+@etags.user_etag()
 def profile():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = statements.user(user_id)
         
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        return jsonify({
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "birthday": user.birthday.strftime('%Y-%m-%d') if user.birthday else None,
-                "loyalty_points": user.loyalty_points,
-                "created_at": user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else None
-            }
-        }), 200
+        return jsonify({"user": serializers.user(user)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -106,13 +100,20 @@ def profile():
 def update_profile():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = statements.user(user_id)
         
         if not user:
             return jsonify({"error": "User not found"}), 404
         
         data = request.get_json()
         
+        # Gift cards this user sent show their name to the receivers. Bumped before
+        # the changes below so the caller's increment shares their UPDATE.
+        receiver_ids = db.session.execute(
+            select(GiftCard.receiver_id).where(GiftCard.sender_id == user_id).distinct()
+        ).scalars().all()
+        etags.bump(user_id, *receiver_ids)
+        
         # Update user data
         user.first_name = data.get('first_name', user.first_name)
         user.last_name = data.get('last_name', user.last_name)
@@ -126,15 +127,7 @@ def update_profile():
         
         return jsonify({
             "message": "Profile updated successfully",
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "birthday": user.birthday.strftime('%Y-%m-%d') if user.birthday else None,
-                "loyalty_points": user.loyalty_points
-            }
+            "user": serializers.user(user)
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500 
\ No newline at end of file
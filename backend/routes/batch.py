@@ -0,0 +1,154 @@
+from flask import Blueprint, request, jsonify, current_app, g
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from models import db
+from replicas import PIN_HEADER, READ_METHODS, pins_own_writes
+from sqlite_profile import deferred_begin
+import logging
+import statements
+
+batch_bp = Blueprint('batch', __name__)
+logger = logging.getLogger(__name__)
+
+BATCH_METHODS = {'GET', 'POST', 'PUT', 'DELETE'}
+
+# Passed on to every sub-request: the caller's token and its read-your-writes pin
+SHARED_HEADERS = ('Authorization', PIN_HEADER, 'Cookie')
+
+def end_transaction():
+    """End the session's transaction but keep loaded objects for the next sub-request.
+
+    As at the end of a standalone request, changes a view did not commit are rolled back.
+    """
+    session = db.session()
+    if session.new or session.dirty or session.deleted:
+        session.rollback()
+        return
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+
+def run_subrequest(app, method, path, body=None, headers=None):
+    """Dispatch one sub-request to its view in-process and return a result dict.
+
+    The sub-request gets its own request context inside the batch's app
+    context, so it shares the batch's DB session (and identity map) and g.
+    It runs in a transaction of its own, so its method decides whether that
+    starts with BEGIN IMMEDIATE, and it picks its own replica route. A write
+    reloads whatever it uses from the identity map inside that transaction. Only
+    the view runs: before/after request hooks (admission, metrics,
+    compression) already apply to the batch as a whole. A successful write
+    still pins the caller to the primary, as it would on its own.
+    """
+    builder = EnvironBuilder(
+        path=path,
+        method=method,
+        json=body,
+        headers=headers,
+        environ_base={'REMOTE_ADDR': request.remote_addr}
+    )
+
+    with app.request_context(builder.get_environ()):
+        g.pop('replica_route', None)
+        if method not in READ_METHODS:
+            # Objects kept from earlier sub-requests (the caller above all) may predate this
+            # transaction's write lock: reload them in it, or a write would use stale values
+            db.session.expire_all()
+        try:
+            try:
+                rv = app.dispatch_request()
+            except HTTPException as e:
+                rv = app.handle_http_exception(e)
+            except Exception as e:
+                # JWT errors go to their registered handlers; anything unhandled is re-raised
+                rv = app.handle_user_exception(e)
+            if isinstance(rv, HTTPException):
+                error = rv
+                rv = error.get_response()
+                rv.set_data(current_app.json.dumps({"error": error.description}))
+                rv.mimetype = 'application/json'
+            response = app.make_response(rv)
+            end_transaction()
+            app.extensions['read_replica'].pin_if_written(response)
+        except Exception:
+            logger.exception("Batched request failed", extra={"method": method, "path": path})
+            db.session.rollback()
+            return {"status": 500, "headers": {}, "body": {"error": "Internal server error"}}
+        finally:
+            g.pop('replica_route', None)
+
+    if response.is_json:
+        result_body = response.get_json()
+    elif response.mimetype.startswith('text/'):
+        result_body = response.get_data(as_text=True)
+    else:
+        result_body = None  # binary bodies (QR codes, images) have to be fetched directly
+    response.close()
+
+    result_headers = {key: value for key, value in response.headers.items() if key != 'Content-Length'}
+    return {"status": response.status_code, "headers": result_headers, "body": result_body}
+
+@batch_bp.route('', methods=['POST'])
+@deferred_begin
+@pins_own_writes
+def batch():
+    """Run several API requests in one round trip: {"requests": [{"method", "path", "body", "headers"}]}"""
+    data = request.get_json(silent=True) or {}
+    subrequests = data.get('requests')
+    max_requests = current_app.config['BATCH_MAX_REQUESTS']
+
+    if not isinstance(subrequests, list) or not subrequests:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+
+    if len(subrequests) > max_requests:
+        return jsonify({"error": f"At most {max_requests} requests per batch"}), 400
+
+    # Sub-requests act as the batch's caller unless they say otherwise
+    shared_headers = {name: request.headers[name] for name in SHARED_HEADERS if name in request.headers}
+    
+    # The identity map only holds weak references, so keep the caller loaded for the whole
+    # batch: every sub-request's statements.user() lookup then finds it without a query.
+    # This read is the batch's only statement, so end it before the sub-requests run theirs.
+    verify_jwt_in_request(optional=True)
+    caller_id = get_jwt_identity()
+    caller = statements.user(caller_id) if caller_id is not None else None
+    end_transaction()
+    wrote = False
+
+    app = current_app._get_current_object()
+    responses = []
+    for subrequest in subrequests:
+        if not isinstance(subrequest, dict):
+            responses.append({"status": 400, "headers": {}, "body": {"error": "Each request must be an object"}})
+            continue
+
+        method = str(subrequest.get('method', 'GET')).upper()
+        path = subrequest.get('path')
+
+        if method not in BATCH_METHODS:
+            responses.append({"status": 405, "headers": {},
+                              "body": {"error": f"Method must be one of: {', '.join(sorted(BATCH_METHODS))}"}})
+            continue
+
+        if not isinstance(path, str) or not path.startswith('/api/') or path.startswith('/api/batch'):
+            responses.append({"status": 400, "headers": {},
+                              "body": {"error": "path must be an /api/ URL other than /api/batch"}})
+            continue
+
+        headers = dict(shared_headers, **(subrequest.get('headers') or {}))
+        result = run_subrequest(app, method, path, subrequest.get('body'), headers)
+        responses.append(result)
+        if PIN_HEADER in result["headers"]:
+            # Later sub-requests read what this one wrote, wherever their queries go
+            shared_headers[PIN_HEADER] = result["headers"][PIN_HEADER]
+            wrote = True
+
+    del caller
+    response = jsonify({"responses": responses})
+    if wrote:
+        current_app.extensions['read_replica'].pin(response)
+    return response, 200
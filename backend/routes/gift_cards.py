@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, GiftCard, User
+from models import db, GiftCard
+from replicas import replica_read
 from datetime import datetime, timedelta
 import uuid
+import etags
+import serializers
+import statements
 
 gift_cards_bp = Blueprint('gift_cards', __name__)
 
@@ -22,7 +26,7 @@ def create_gift_card():
         return jsonify({"error": "Receiver email is required"}), 400
     
     # Check if receiver is a registered user
-    receiver = User.query.filter_by(email=receiver_email).first()
+    receiver = statements.user_by_email(receiver_email)
     receiver_id = receiver.id if receiver else None
     
     # Create gift card
@@ -36,6 +40,7 @@ def create_gift_card():
     )
     
     db.session.add(new_gift_card)
+    etags.bump(user_id, receiver_id)
     db.session.commit()
     
     return jsonify({
@@ -45,48 +50,36 @@ def create_gift_card():
             "code": new_gift_card.code,
             "amount": new_gift_card.amount,
             "receiver_email": new_gift_card.receiver_email,
-            "expiration_date": new_gift_card.expiration_date.strftime('%Y-%m-%d')
+            "expiration_date": new_gift_card.expiration_date
         }
     }), 201
 
 @gift_cards_bp.route('/', methods=['GET'])
+@replica_read
 @jwt_required()
+@etags.user_etag()
 def get_user_gift_cards():
     user_id = get_jwt_identity()
     
     # Get gift cards sent by the user
-    sent_gift_cards = GiftCard.query.filter_by(sender_id=user_id).all()
+    sent_gift_cards = statements.gift_cards_sent_by(user_id)
     
     # Get gift cards received by the user
-    received_gift_cards = GiftCard.query.filter_by(receiver_id=user_id).all()
+    received_gift_cards = statements.gift_cards_received_by(user_id)
     
-    sent_result = []
-    for gift_card in sent_gift_cards:
-        sent_result.append({
-            "id": gift_card.id,
-            "code": gift_card.code,
-            "receiver_email": gift_card.receiver_email,
-            "amount": gift_card.amount,
-            "message": gift_card.message,
-            "created_at": gift_card.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            "expiration_date": gift_card.expiration_date.strftime('%Y-%m-%d'),
-            "is_redeemed": gift_card.is_redeemed
-        })
+    sent_result = [
+        dict(serializers.gift_card(gift_card), receiver_email=gift_card.receiver_email)
+        for gift_card in sent_gift_cards
+    ]
     
     received_result = []
     for gift_card in received_gift_cards:
-        sender = User.query.get(gift_card.sender_id)
-        received_result.append({
-            "id": gift_card.id,
-            "code": gift_card.code,
-            "sender_name": f"{sender.first_name} {sender.last_name}" if sender else "Unknown",
-            "sender_email": sender.email if sender else "Unknown",
-            "amount": gift_card.amount,
-            "message": gift_card.message,
-            "created_at": gift_card.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            "expiration_date": gift_card.expiration_date.strftime('%Y-%m-%d'),
-            "is_redeemed": gift_card.is_redeemed
-        })
+        sender = gift_card.sender
+        received_result.append(dict(
+            serializers.gift_card(gift_card),
+            sender_name=f"{sender.first_name} {sender.last_name}" if sender else "Unknown",
+            sender_email=sender.email if sender else "Unknown"
+        ))
     
     return jsonify({
         "sent_gift_cards": sent_result,
@@ -102,7 +95,7 @@ def redeem_gift_card():
     if not data.get('code'):
         return jsonify({"error": "Gift card code is required"}), 400
     
-    gift_card = GiftCard.query.filter_by(code=data['code']).first()
+    gift_card = statements.gift_card_by_code(data['code'])
     
     if not gift_card:
         return jsonify({"error": "Gift card not found"}), 404
@@ -121,6 +114,8 @@ def redeem_gift_card():
     if not gift_card.receiver_id:
         gift_card.receiver_id = user_id
     
+    # The sender and the receiver both list the card
+    etags.bump(user_id, gift_card.sender_id, gift_card.receiver_id)
     db.session.commit()
     
     return jsonify({
@@ -128,6 +123,6 @@ def redeem_gift_card():
         "gift_card": {
             "id": gift_card.id,
             "amount": gift_card.amount,
-            "redeemed_at": gift_card.redeemed_at.strftime('%Y-%m-%d %H:%M:%S')
+            "redeemed_at": gift_card.redeemed_at
         }
     }), 200 
\ No newline at end of file
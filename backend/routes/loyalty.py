@@ -1,28 +1,62 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, Order
+from models import db, Order
+from replicas import replica_read
 from datetime import datetime
+from structured_logging import dump_request
+import logging
+import etags
+import statements
 
 loyalty_bp = Blueprint('loyalty', __name__)
+logger = logging.getLogger(__name__)
+
+# Reward catalogue - in a real app, these would come from a database
+REWARDS = [
+    {
+        "id": 1,
+        "name": "Free Coffee",
+        "description": "Get a free coffee of your choice",
+        "points_required": 50
+    },
+    {
+        "id": 2,
+        "name": "Free Pastry",
+        "description": "Get a free pastry of your choice",
+        "points_required": 75
+    },
+    {
+        "id": 3,
+        "name": "10% Off Next Order",
+        "description": "Get 10% off your next order",
+        "points_required": 30
+    },
+    {
+        "id": 4,
+        "name": "Free Breakfast Set",
+        "description": "Get a free breakfast set",
+        "points_required": 100
+    }
+]
+REWARDS_BY_ID = {reward["id"]: reward for reward in REWARDS}
 
 @loyalty_bp.route('/points', methods=['GET'])
+@replica_read
 @jwt_required()
+@etags.user_etag()
 def get_loyalty_points():
     try:
-        # Print headers for debugging
-        print("Authorization header:", request.headers.get('Authorization', 'Missing'))
-        
         user_id = get_jwt_identity()
         if not user_id:
             return jsonify({"error": "Invalid token", "success": False}), 401
             
-        user = User.query.get(user_id)
+        user = statements.user(user_id)
         
         if not user:
             return jsonify({"error": "User not found", "success": False}), 404
         
         # Get point history (last 10 transactions)
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.order_date.desc()).limit(10).all()
+        orders = statements.recent_orders_for_user(user_id, 10)
         
         point_history = []
         for order in orders:
@@ -30,7 +64,7 @@ def get_loyalty_points():
             if order.points_earned > 0 or order.points_used > 0:
                 point_history.append({
                     "order_id": order.id,
-                    "date": order.order_date.strftime('%Y-%m-%d %H:%M:%S'),
+                    "date": order.order_date,
                     "points_earned": order.points_earned or 0,  # Ensure we never return None
                     "points_used": order.points_used or 0       # Ensure we never return None
                 })
@@ -38,8 +72,9 @@ def get_loyalty_points():
         # Ensure we have an integer for loyalty points
         loyalty_points = user.loyalty_points if user.loyalty_points is not None else 0
         
-        # Debug message to help diagnose issues
-        print(f"User {user_id} has {loyalty_points} loyalty points with {len(point_history)} history entries")
+        logger.debug("Loyalty points loaded", extra={
+            "user_id": user_id, "loyalty_points": loyalty_points, "history_entries": len(point_history)
+        })
         
         return jsonify({
             "loyalty_points": loyalty_points,
@@ -47,7 +82,7 @@ def get_loyalty_points():
             "success": True
         }), 200
     except Exception as e:
-        print(f"Error in get_loyalty_points: {str(e)}")
+        logger.exception("Error in get_loyalty_points")
         # Provide more context in the error response
         error_message = str(e)
         error_type = type(e).__name__
@@ -59,11 +94,13 @@ def get_loyalty_points():
         }), 500
 
 @loyalty_bp.route('/rewards', methods=['GET'])
+@replica_read
 @jwt_required()
+@etags.user_etag()
 def get_available_rewards():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = statements.user(user_id)
         
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -71,40 +108,12 @@ def get_available_rewards():
         # Ensure we have an integer for loyalty points
         loyalty_points = user.loyalty_points if user.loyalty_points is not None else 0
         
-        # Define rewards - in a real app, these would come from a database
         rewards = [
-            {
-                "id": 1,
-                "name": "Free Coffee",
-                "description": "Get a free coffee of your choice",
-                "points_required": 50,
-                "is_available": loyalty_points >= 50
-            },
-            {
-                "id": 2,
-                "name": "Free Pastry",
-                "description": "Get a free pastry of your choice",
-                "points_required": 75,
-                "is_available": loyalty_points >= 75
-            },
-            {
-                "id": 3,
-                "name": "10% Off Next Order",
-                "description": "Get 10% off your next order",
-                "points_required": 30,
-                "is_available": loyalty_points >= 30
-            },
-            {
-                "id": 4,
-                "name": "Free Breakfast Set",
-                "description": "Get a free breakfast set",
-                "points_required": 100,
-                "is_available": loyalty_points >= 100
-            }
+            dict(reward, is_available=loyalty_points >= reward["points_required"])
+            for reward in REWARDS
         ]
         
-        # Debug message to help diagnose issues
-        print(f"User {user_id} requesting rewards with {loyalty_points} points available")
+        logger.debug("Rewards requested", extra={"user_id": user_id, "loyalty_points": loyalty_points})
         
         return jsonify({
             "loyalty_points": loyalty_points,
@@ -112,7 +121,7 @@ def get_available_rewards():
             "success": True
         }), 200
     except Exception as e:
-        print(f"Error in get_available_rewards: {str(e)}")
+        logger.exception("Error in get_available_rewards")
         # Provide more context in the error response
         error_message = str(e)
         error_type = type(e).__name__
@@ -128,38 +137,31 @@ def get_available_rewards():
 def redeem_reward(reward_id):
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = statements.user(user_id)
         
         if not user:
             return jsonify({"error": "User not found"}), 404
         
-        # Define rewards mapping - in a real app, these would come from a database
-        rewards = {
-            1: {"name": "Free Coffee", "points": 50},
-            2: {"name": "Free Pastry", "points": 75},
-            3: {"name": "10% Off Next Order", "points": 30},
-            4: {"name": "Free Breakfast Set", "points": 100}
-        }
-        
-        if reward_id not in rewards:
+        if reward_id not in REWARDS_BY_ID:
             return jsonify({"error": "Reward not found"}), 404
         
-        reward = rewards[reward_id]
+        reward = REWARDS_BY_ID[reward_id]
         
         # Ensure we have an integer for loyalty points
         loyalty_points = user.loyalty_points if user.loyalty_points is not None else 0
         
-        if loyalty_points < reward["points"]:
+        if loyalty_points < reward["points_required"]:
             return jsonify({"error": "Not enough loyalty points"}), 400
         
         # Generate redemption code
         redemption_code = "REWARD" + str(reward_id) + str(user_id) + str(int(datetime.now().timestamp()))[-6:]
         
-        # Debug message
-        print(f"User {user_id} redeeming reward {reward_id} ({reward['name']}) for {reward['points']} points")
+        logger.info("Reward redeemed", extra={
+            "user_id": user_id, "reward_id": reward_id, "points_used": reward["points_required"]
+        })
         
         # Deduct points
-        user.loyalty_points = loyalty_points - reward["points"]
+        user.loyalty_points = loyalty_points - reward["points_required"]
         
         # Create a point history record - we'll use an order with order_id=0 to indicate a redemption
         redemption_order = Order(
@@ -167,10 +169,11 @@ def redeem_reward(reward_id):
             status='completed',
             total_amount=0,
             points_earned=0,
-            points_used=reward["points"]
+            points_used=reward["points_required"]
         )
         
         db.session.add(redemption_order)
+        etags.bump(user_id)
         db.session.commit()
         
         return jsonify({
@@ -179,13 +182,13 @@ def redeem_reward(reward_id):
             "redemption_code": redemption_code,
             "redemption_details": {
                 "reward_name": reward["name"],
-                "points_used": reward["points"],
-                "date": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                "points_used": reward["points_required"],
+                "date": datetime.now()
             },
             "success": True
         }), 200
     except Exception as e:
-        print(f"Error in redeem_reward: {str(e)}")
+        logger.exception("Error in redeem_reward")
         db.session.rollback()
         # Provide more context in the error response
         error_message = str(e)
@@ -205,10 +208,8 @@ def cors_test():
         # Just return empty response for preflight
         return '', 200
     
-    # Print headers to server console for debugging
-    print("Request headers:")
-    for header, value in request.headers:
-        print(f"  {header}: {value}")
+    # Header dumps go to the log only when switched on for this route (see /api/admin/logging)
+    dump_request(logger)
     
     # Return headers in response for client-side debugging
     headers_dict = {h[0]: h[1] for h in request.headers}
@@ -1,9 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Order, OrderItem, Product, User
+from models import db, Order, OrderItem
+from replicas import replica_read
 from datetime import datetime
+import logging
+import cache
+import etags
+import live_updates
+import recommendations
+import serializers
+import statements
 
 orders_bp = Blueprint('orders', __name__)
+logger = logging.getLogger(__name__)
+
+def serialize_item(item):
+    product = item.product
+    return dict(serializers.order_item(item), product_name=product.name if product else "Unknown")
 
 @orders_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -20,8 +33,12 @@ def create_order():
     order_items = []
     points_earned = 0
     
+    # Load every product in the order with one query
+    product_ids = {item_data['product_id'] for item_data in data['items']}
+    products = {product.id: product for product in statements.products_by_ids(product_ids)}
+    
     for item_data in data['items']:
-        product = Product.query.get(item_data['product_id'])
+        product = products.get(item_data['product_id'])
         
         if not product or not product.is_available:
             return jsonify({"error": f"Product with id {item_data['product_id']} not available"}), 400
@@ -54,7 +71,7 @@ def create_order():
     
     # Apply loyalty points if requested
     points_used = 0
-    user = User.query.get(user_id)
+    user = statements.user(user_id)
     
     if data.get('use_points', False) and user.loyalty_points > 0:
         # Simple conversion: 10 points = $1 off
@@ -66,6 +83,13 @@ def create_order():
             points_used = points_to_use
             user.loyalty_points -= points_used
     
+    # Add loyalty points
+    if points_earned > 0:
+        user.loyalty_points += points_earned
+    
+    # Before the flush below, so it shares the user's UPDATE
+    etags.bump(user_id)
+    
     # Create order
     new_order = Order(
         user_id=user_id,
@@ -79,136 +103,103 @@ def create_order():
     db.session.add(new_order)
     db.session.flush()  # Get the order ID without committing
     
-    # Create order items
-    for item in order_items:
-        new_item = OrderItem(
-            order_id=new_order.id,
-            product_id=item['product_id'],
-            quantity=item['quantity'],
-            customizations=item['customizations'],
-            unit_price=item['unit_price'],
-            total_price=item['total_price']
-        )
-        db.session.add(new_item)
+    # Create order items in a single executemany instead of one INSERT per item
+    db.session.bulk_insert_mappings(OrderItem, [
+        dict(item, order_id=new_order.id) for item in order_items
+    ])
+    
+    # Count the order in the co-occurrence index, in the same transaction
+    recommendations.record_order(db.session, product_ids, current_app.config['RECOMMENDATIONS_TOP_K'])
     
-    # Add loyalty points
-    if points_earned > 0:
-        user.loyalty_points += points_earned
-        
     # Log loyalty points activity
-    print(f"User {user_id} earned {points_earned} points and used {points_used} points. New balance: {user.loyalty_points}")
+    logger.info("Loyalty points updated", extra={
+        "user_id": user_id,
+        "points_earned": points_earned,
+        "points_used": points_used,
+        "balance": user.loyalty_points
+    })
     
     db.session.commit()
     
     return jsonify({
         "message": "Order created successfully",
-        "order": {
-            "id": new_order.id,
-            "status": new_order.status,
-            "total_amount": new_order.total_amount,
-            "points_earned": new_order.points_earned,
-            "points_used": new_order.points_used,
-            "order_date": new_order.order_date.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        "order": serializers.order(new_order)
     }), 201
 
 @orders_bp.route('/', methods=['GET'])
+@replica_read
 @jwt_required()
+@etags.user_etag(cache.MENU)  # items carry product names
 def get_user_orders():
     user_id = get_jwt_identity()
     
-    orders = Order.query.filter_by(user_id=user_id).order_by(Order.order_date.desc()).all()
-    
-    result = []
-    for order in orders:
-        order_items = []
-        for item in order.items:
-            product = Product.query.get(item.product_id)
-            order_items.append({
-                "product_name": product.name if product else "Unknown",
-                "quantity": item.quantity,
-                "customizations": item.customizations,
-                "unit_price": item.unit_price,
-                "total_price": item.total_price
-            })
-        
-        result.append({
-            "id": order.id,
-            "status": order.status,
-            "total_amount": order.total_amount,
-            "points_earned": order.points_earned,
-            "points_used": order.points_used,
-            "order_date": order.order_date.strftime('%Y-%m-%d %H:%M:%S'),
-            "items": order_items
-        })
+    # Items and their products are loaded up front rather than one query per item
+    orders = statements.orders_for_user(user_id)
+    
+    result = [
+        dict(serializers.order(order), items=[serialize_item(item) for item in order.items])
+        for order in orders
+    ]
     
     return jsonify({"orders": result}), 200
 
 @orders_bp.route('/<int:order_id>', methods=['GET'])
+@replica_read
 @jwt_required()
+@etags.user_etag(cache.MENU)
 def get_order(order_id):
     user_id = get_jwt_identity()
     
-    order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+    order = statements.order_for_user(order_id, user_id)
     
     if not order:
         return jsonify({"error": "Order not found"}), 404
     
-    order_items = []
-    for item in order.items:
-        product = Product.query.get(item.product_id)
-        order_items.append({
-            "product_name": product.name if product else "Unknown",
-            "product_id": item.product_id,
-            "quantity": item.quantity,
-            "customizations": item.customizations,
-            "unit_price": item.unit_price,
-            "total_price": item.total_price
-        })
-    
-    result = {
-        "id": order.id,
-        "status": order.status,
-        "total_amount": order.total_amount,
-        "points_earned": order.points_earned,
-        "points_used": order.points_used,
-        "order_date": order.order_date.strftime('%Y-%m-%d %H:%M:%S'),
-        "table_number": order.table_number,
-        "items": order_items
-    }
+    result = dict(serializers.order_detail(order), items=[serialize_item(item) for item in order.items])
     
     return jsonify({"order": result}), 200
 
+@orders_bp.route('/<int:order_id>/poll', methods=['GET'])
+@jwt_required()
+def poll_order(order_id):
+    """Long poll for a customer's order: held until its status differs from ?since=<status>"""
+    user_id = get_jwt_identity()
+    live = current_app.extensions['live_updates']
+    
+    def snapshot():
+        row = db.session.execute(live_updates.order_status_query(order_id, user_id)).first()
+        # End the read transaction so the next check sees new commits
+        db.session.rollback()
+        return live_updates.order_status_body(row) if row else None
+    
+    body = live.hold(snapshot, request.args.get('since'), live_updates.wait_seconds(request.args, live.max_wait))
+    
+    if body is None:
+        return jsonify({"error": "Order not found"}), 404
+    
+    return jsonify(body), 200
+
 # Admin routes for order management
 @orders_bp.route('/admin/all', methods=['GET'])
+@replica_read
 @jwt_required()  # Should add admin check in production
 def get_all_orders():
     status = request.args.get('status')
     
-    query = Order.query
+    # Plain rows of the listed columns rather than a full Order per row
+    query = serializers.select_fields(Order, serializers.ORDER_SUMMARY_FIELDS)
     
     if status:
-        query = query.filter_by(status=status)
+        query = query.where(Order.status == status)
     
-    orders = query.order_by(Order.order_date.desc()).all()
+    rows = db.session.execute(query.order_by(Order.order_date.desc()))
     
-    result = []
-    for order in orders:
-        result.append({
-            "id": order.id,
-            "user_id": order.user_id,
-            "status": order.status,
-            "total_amount": order.total_amount,
-            "order_date": order.order_date.strftime('%Y-%m-%d %H:%M:%S'),
-            "table_number": order.table_number
-        })
-    
-    return jsonify({"orders": result}), 200
+    return jsonify({"orders": serializers.rows_as_dicts(serializers.ORDER_SUMMARY_FIELDS, rows)}), 200
 
 @orders_bp.route('/<int:order_id>/status', methods=['PUT'])
 @jwt_required()  # Should add admin check in production
 def update_order_status(order_id):
-    order = Order.query.get(order_id)
+    order = statements.order(order_id)
     
     if not order:
         return jsonify({"error": "Order not found"}), 404
@@ -223,6 +214,7 @@ def update_order_status(order_id):
         return jsonify({"error": f"Status must be one of: {', '.join(valid_statuses)}"}), 400
     
     order.status = data['status']
+    etags.bump(order.user_id)
     db.session.commit()
     
     return jsonify({
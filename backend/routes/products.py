@@ -1,13 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Product, Customization
+from models import db, Product, Customization, ProductRecommendation
+from replicas import replica_read
+import cache
+from compression import PrecompressedBody
+import image_uploads
+import menu_changes
+import msgpack_codec
+import search
+import serializers
+import statements
+import os
 
 products_bp = Blueprint('products', __name__)
 
-@products_bp.route('/', methods=['GET'])
-def get_products():
-    category = request.args.get('category')
-    
+def build_products_body(category=None, mimetype='application/json'):
+    """Serialize the available menu once per format; the result is cached per menu version"""
     query = Product.query
     
     if category:
@@ -15,52 +23,119 @@ def get_products():
     
     products = query.filter_by(is_available=True).all()
     
-    result = []
-    for product in products:
-        result.append({
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "price": product.price,
-            "category": product.category,
-            "image_url": product.image_url,
-            "points_value": product.points_value
-        })
+    result = [serializers.product(product) for product in products]
+    
+    if mimetype == msgpack_codec.MIMETYPE:
+        data = msgpack_codec.packb({"products": result})
+    else:
+        data = current_app.json.dumps({"products": result}).encode('utf-8')
+    return PrecompressedBody(data, mimetype=mimetype, min_size=current_app.config['COMPRESSION_MIN_SIZE'])
+
+@products_bp.route('/', methods=['GET'])
+def get_products():
+    category = request.args.get('category')
+    mimetype = msgpack_codec.preferred(request.accept_mimetypes)
+    
+    body = cache.get_cached(cache.MENU, ('products', category, mimetype), lambda: build_products_body(category, mimetype))
     
-    return jsonify({"products": result}), 200
+    response = body.to_response(200)
+    response.headers['X-Menu-Version'] = str(cache.get_version(cache.MENU))
+    if msgpack_codec.msgpack is not None:
+        response.vary.add('Accept')
+    return response
+
+@products_bp.route('/changes', methods=['GET'])
+def get_menu_changes():
+    """Products and customizations changed since ?since=<revision>, tombstones included.
+    
+    Served from the primary so a kiosk never sees the revision go backwards.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"error": "since must be a menu revision number"}), 400
+    
+    # Read the counter before the rows: a write committing in between then shows up
+    # in these rows (and again next time) instead of falling between two syncs
+    revision, reset_revision = menu_changes.current(db.session)
+    
+    # New kiosks, kiosks from before a menu reset and ones synced against another database start over
+    full = since <= 0 or since < reset_revision or since > revision
+    
+    products = serializers.select_fields(Product, serializers.PRODUCT_CHANGE_FIELDS)
+    customizations = serializers.select_fields(Customization, serializers.CUSTOMIZATION_CHANGE_FIELDS)
+    if full:
+        products = products.where(Product.is_deleted.is_(False))
+        customizations = customizations.where(Customization.is_deleted.is_(False))
+    else:
+        # Range scans on the revision indexes: the cost follows the number of changes, not the menu size
+        products = products.where(Product.revision > since)
+        customizations = customizations.where(Customization.revision > since)
+    
+    products = serializers.rows_as_dicts(serializers.PRODUCT_CHANGE_FIELDS,
+                                         db.session.execute(products.order_by(Product.revision, Product.id)))
+    customizations = serializers.rows_as_dicts(serializers.CUSTOMIZATION_CHANGE_FIELDS,
+                                               db.session.execute(customizations.order_by(Customization.revision, Customization.id)))
+    
+    revision = max([revision] + [row["revision"] for row in products] + [row["revision"] for row in customizations])
+    
+    return jsonify({
+        "revision": revision,
+        "reset": full,
+        "products": products,
+        "customizations": customizations
+    }), 200
+
+@products_bp.route('/search', methods=['GET'])
+@replica_read
+def search_products():
+    """Available products matching ?q=, best first; ?category= narrows them and ?limit= caps them"""
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({"error": "q is required"}), 400
+
+    limit = min(max(request.args.get('limit', search.DEFAULT_LIMIT, type=int), 1), search.MAX_LIMIT)
+    products, fuzzy = search.search(db.session, text, limit, request.args.get('category'))
+
+    return jsonify({
+        "query": text,
+        "fuzzy": fuzzy,
+        "products": products
+    }), 200
 
 @products_bp.route('/<int:product_id>', methods=['GET'])
+@replica_read
 def get_product(product_id):
-    product = Product.query.get(product_id)
+    product = statements.product(product_id)
     
     if not product:
         return jsonify({"error": "Product not found"}), 404
     
     # Get customization options for the product
-    customizations = Customization.query.filter_by(product_id=product.id).all()
-    customization_options = []
-    
-    for customization in customizations:
-        customization_options.append({
-            "id": customization.id,
-            "name": customization.name,
-            "options": customization.options,
-            "price_impact": customization.price_impact
-        })
-    
-    result = {
-        "id": product.id,
-        "name": product.name,
-        "description": product.description,
-        "price": product.price,
-        "category": product.category,
-        "image_url": product.image_url,
-        "points_value": product.points_value,
-        "customizations": customization_options
-    }
+    customizations = statements.customizations_for_product(product.id)
+    customization_options = [serializers.customization(customization) for customization in customizations]
+    
+    result = dict(serializers.product(product), customizations=customization_options)
     
     return jsonify({"product": result}), 200
 
+@products_bp.route('/<int:product_id>/recommendations', methods=['GET'])
+@replica_read
+def get_recommendations(product_id):
+    """Available products most often ordered with this one, from the precomputed top-k table"""
+    top_k = current_app.config['RECOMMENDATIONS_TOP_K']
+    limit = min(max(request.args.get('limit', 5, type=int), 1), top_k)
+
+    query = serializers.select_fields(Product, serializers.PRODUCT_FIELDS) \
+        .join(ProductRecommendation, ProductRecommendation.recommended_id == Product.id) \
+        .where(ProductRecommendation.product_id == product_id,
+               Product.is_available.is_(True), Product.is_deleted.is_(False)) \
+        .order_by(ProductRecommendation.position) \
+        .limit(limit)
+    products = serializers.rows_as_dicts(serializers.PRODUCT_FIELDS, db.session.execute(query))
+
+    return jsonify({"product_id": product_id, "products": products}), 200
+
 # Admin routes for product management
 @products_bp.route('/', methods=['POST'])
 @jwt_required()  # Should add admin check in production
@@ -78,20 +153,25 @@ def create_product():
     )
     
     db.session.add(new_product)
-    db.session.commit()
+    db.session.flush()  # Get the product ID (and its menu revision) without committing
     
-    # Add customizations if provided
+    # Add customizations if provided, in a single executemany. Bulk inserts skip the
+    # flush hook, so they take the same menu revision as the product explicitly.
     if 'customizations' in data:
-        for customization_data in data['customizations']:
-            customization = Customization(
-                product_id=new_product.id,
-                name=customization_data['name'],
-                options=customization_data['options'],
-                price_impact=customization_data.get('price_impact', {})
-            )
-            db.session.add(customization)
-        
-        db.session.commit()
+        db.session.bulk_insert_mappings(Customization, [
+            {
+                "product_id": new_product.id,
+                "name": customization_data['name'],
+                "options": customization_data['options'],
+                "price_impact": customization_data.get('price_impact', {}),
+                "revision": menu_changes.allocate(db.session)
+            }
+            for customization_data in data['customizations']
+        ])
+    
+    db.session.commit()
+    
+    cache.bump_version(cache.MENU)
     
     return jsonify({
         "message": "Product created successfully",
@@ -106,7 +186,7 @@ def create_product():
 @products_bp.route('/<int:product_id>', methods=['PUT'])
 @jwt_required()  # Should add admin check in production
 def update_product(product_id):
-    product = Product.query.get(product_id)
+    product = statements.product(product_id)
     
     if not product:
         return jsonify({"error": "Product not found"}), 404
@@ -122,7 +202,12 @@ def update_product(product_id):
     product.is_available = data.get('is_available', product.is_available)
     product.points_value = data.get('points_value', product.points_value)
     
+    # Making a deleted product available again restores it, so kiosks drop its tombstone
+    if product.is_available:
+        product.is_deleted = False
+    
     db.session.commit()
+    cache.bump_version(cache.MENU)
     
     return jsonify({
         "message": "Product updated successfully",
@@ -138,13 +223,59 @@ def update_product(product_id):
 @products_bp.route('/<int:product_id>', methods=['DELETE'])
 @jwt_required()  # Should add admin check in production
 def delete_product(product_id):
-    product = Product.query.get(product_id)
+    product = statements.product(product_id)
     
     if not product:
         return jsonify({"error": "Product not found"}), 404
     
-    # Instead of deleting, mark as unavailable
+    # Instead of deleting, mark as unavailable and leave a tombstone for the kiosk change feed
     product.is_available = False
+    product.is_deleted = True
     db.session.commit()
+    cache.bump_version(cache.MENU)
+    
+    return jsonify({"message": "Product deleted successfully"}), 200 
+
+@products_bp.route('/<int:product_id>/image', methods=['POST'])
+@jwt_required()  # Should add admin check in production
+def upload_product_image(product_id):
+    """Accept a raw image body (e.g. Content-Type: image/jpeg) and process it in the background"""
+    product = statements.product(product_id)
+    
+    if not product:
+        return jsonify({"error": "Product not found"}), 404
+    
+    max_bytes = current_app.config['MAX_IMAGE_UPLOAD_BYTES']
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({"error": f"Image must be at most {max_bytes} bytes"}), 413
+    
+    # Stream straight to disk; never touch request.data so the body is not buffered
+    try:
+        upload_path = image_uploads.save_stream(request.stream, current_app.config['IMAGE_UPLOAD_DIR'], max_bytes)
+    except image_uploads.UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except image_uploads.InvalidImage as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        image_uploads.validate(upload_path)
+    except image_uploads.InvalidImage as e:
+        os.unlink(upload_path)
+        return jsonify({"error": str(e)}), 400
+    
+    job = image_uploads.submit(current_app._get_current_object(), product.id, upload_path)
+    
+    return jsonify({
+        "message": "Image accepted for processing",
+        "job": job
+    }), 202
+
+@products_bp.route('/image-jobs/<job_id>', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def get_image_job(job_id):
+    job = image_uploads.get_job(job_id)
+    
+    if not job:
+        return jsonify({"error": "Image job not found"}), 404
     
-    return jsonify({"message": "Product deleted successfully"}), 200 
\ No newline at end of file
+    return jsonify({"job": job}), 200
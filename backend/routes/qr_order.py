@@ -1,27 +1,44 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Table, Order
-import qrcode
+from models import db, Table
+from replicas import replica_read
 from io import BytesIO
 import os
+import cache
+import live_updates
+import serializers
+import statements
 
 qr_order_bp = Blueprint('qr_order', __name__)
 
+QR_MAX_AGE = 60 * 60  # 1 hour
+
+def render_qr_png(qr_data):
+    import qrcode  # pulls in PIL, so only load it once a QR code is actually needed
+    
+    img = qrcode.make(qr_data)
+    img_io = BytesIO()
+    img.save(img_io, 'PNG')
+    return img_io.getvalue()
+
+def get_table_qr_png(table_number):
+    # QR codes are deterministic, so render each one once per table set version
+    frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+    qr_data = f"{frontend_url}/table/{table_number}"
+    return cache.get_cached(cache.TABLES, ('qr', qr_data), lambda: render_qr_png(qr_data))
+
+def get_table_numbers():
+    return cache.get_cached(cache.TABLES, 'numbers', lambda: frozenset(
+        row[0] for row in db.session.query(Table.table_number)
+    ))
+
 @qr_order_bp.route('/tables', methods=['GET'])
+@replica_read
 @jwt_required()  # Should add admin check in production
 def get_tables():
-    tables = Table.query.all()
-    
-    result = []
-    for table in tables:
-        result.append({
-            "id": table.id,
-            "table_number": table.table_number,
-            "qr_code_url": table.qr_code_url,
-            "is_occupied": table.is_occupied
-        })
+    rows = db.session.execute(serializers.select_fields(Table, serializers.TABLE_FIELDS))
     
-    return jsonify({"tables": result}), 200
+    return jsonify({"tables": serializers.rows_as_dicts(serializers.TABLE_FIELDS, rows)}), 200
 
 @qr_order_bp.route('/tables', methods=['POST'])
 @jwt_required()  # Should add admin check in production
@@ -32,7 +49,7 @@ def create_table():
         return jsonify({"error": "Table number is required"}), 400
     
     # Check if table already exists
-    if Table.query.filter_by(table_number=data['table_number']).first():
+    if statements.table_by_number(data['table_number']):
         return jsonify({"error": "Table already exists"}), 400
     
     new_table = Table(
@@ -47,6 +64,7 @@ def create_table():
     qr_code_url = f"/api/qr-order/tables/{new_table.id}/qr"
     new_table.qr_code_url = qr_code_url
     db.session.commit()
+    cache.bump_version(cache.TABLES)
     
     return jsonify({
         "message": "Table created successfully",
@@ -59,26 +77,20 @@ def create_table():
 
 @qr_order_bp.route('/tables/<int:table_id>/qr', methods=['GET'])
 def get_table_qr(table_id):
-    table = Table.query.get(table_id)
+    table = statements.table(table_id)
     
     if not table:
         return jsonify({"error": "Table not found"}), 404
     
-    # Generate QR code with the frontend URL
-    frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
-    qr_data = f"{frontend_url}/table/{table.table_number}"
+    # QR code points at the frontend table page
+    png = get_table_qr_png(table.table_number)
     
-    img = qrcode.make(qr_data)
-    img_io = BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
-    
-    return send_file(img_io, mimetype='image/png')
+    return send_file(BytesIO(png), mimetype='image/png', max_age=QR_MAX_AGE)
 
 @qr_order_bp.route('/tables/<int:table_id>/status', methods=['PUT'])
 @jwt_required()  # Should add admin check in production
 def update_table_status(table_id):
-    table = Table.query.get(table_id)
+    table = statements.table(table_id)
     
     if not table:
         return jsonify({"error": "Table not found"}), 404
@@ -101,38 +113,47 @@ def update_table_status(table_id):
     }), 200
 
 @qr_order_bp.route('/tables/<int:table_id>/orders', methods=['GET'])
+@replica_read
 @jwt_required()  # Should add admin check in production
 def get_table_orders(table_id):
-    table = Table.query.get(table_id)
+    table_number = db.session.execute(live_updates.table_number_query(table_id)).scalar()
     
-    if not table:
+    if table_number is None:
         return jsonify({"error": "Table not found"}), 404
     
-    # Get active orders for the table
-    orders = Order.query.filter_by(table_number=table.table_number).filter(
-        Order.status.in_(['pending', 'processing'])
-    ).all()
-    
-    result = []
-    for order in orders:
-        result.append({
-            "id": order.id,
-            "user_id": order.user_id,
-            "status": order.status,
-            "total_amount": order.total_amount,
-            "order_date": order.order_date.strftime('%Y-%m-%d %H:%M:%S')
-        })
-    
-    return jsonify({"orders": result}), 200
+    # Active orders for the table, as plain rows
+    rows = db.session.execute(live_updates.table_orders_query(table_number))
+    
+    return jsonify({"orders": serializers.rows_as_dicts(serializers.TABLE_ORDER_FIELDS, rows)}), 200
+
+@qr_order_bp.route('/tables/<int:table_id>/orders/poll', methods=['GET'])
+@jwt_required()  # Should add admin check in production
+def poll_table_orders(table_id):
+    """Long poll for kitchen screens: held until the open orders differ from ?since=<version>"""
+    live = current_app.extensions['live_updates']
+    
+    def snapshot():
+        table_number = db.session.execute(live_updates.table_number_query(table_id)).scalar()
+        body = None
+        if table_number is not None:
+            body = live_updates.table_orders_body(db.session.execute(live_updates.table_orders_query(table_number)))
+        # End the read transaction so the next check sees new commits
+        db.session.rollback()
+        return body
+    
+    body = live.hold(snapshot, request.args.get('since'), live_updates.wait_seconds(request.args, live.max_wait))
+    
+    if body is None:
+        return jsonify({"error": "Table not found"}), 404
+    
+    return jsonify(body), 200
 
 @qr_order_bp.route('/validate/<int:table_number>', methods=['GET'])
 def validate_table(table_number):
-    table = Table.query.filter_by(table_number=table_number).first()
-    
-    if not table:
+    if table_number not in get_table_numbers():
         return jsonify({"error": "Invalid table"}), 404
     
     return jsonify({
-        "table_number": table.table_number,
+        "table_number": table_number,
         "is_valid": True
     }), 200 
\ No newline at end of file
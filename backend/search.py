@@ -0,0 +1,194 @@
+"""Product search (GET /api/products/search).
+
+On SQLite, product names, descriptions and categories are indexed in an
+FTS5 table, product_search. It is an external-content index over the
+product table, kept in step by triggers, so every write path is covered,
+bulk and Core ones included. Each query word matches as a prefix ("capp"
+finds Cappuccino). Results are ranked by bm25, with the name weighted
+above the category and the category above the description.
+
+When nothing matches, the query is retried against product_trigrams, an
+FTS5 trigram index of the names. A name sharing enough three-letter
+sequences with the query counts as a match, so "capucino" still finds
+Cappuccino.
+
+On Postgres, the same ranked prefix search runs on a GIN expression index
+over a weighted tsvector, and the typo fallback uses pg_trgm. Postgres
+maintains both indexes itself.
+"""
+import re
+
+from sqlalchemy import DDL, event, func, literal, literal_column, or_, table, column
+
+from models import Product
+import serializers
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MAX_TERMS = 8
+
+# bm25 column weights, in product_search column order
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+CATEGORY_WEIGHT = 5.0
+
+# Share of the query's trigrams a name must contain to count as a typo match
+FUZZY_MIN_SIMILARITY = 0.3
+# Trigram candidates fetched per result slot before scoring them in Python
+FUZZY_CANDIDATES_PER_RESULT = 5
+
+WORD = re.compile(r'\w+')
+
+SEARCH = table('product_search', column('rowid'), column('rank'))
+TRIGRAMS = table('product_trigrams', column('rowid'), column('rank'))
+# FTS5 sorts by its rank column itself, so the join is driven by the index in rank order
+RANKING = f'bm25({NAME_WEIGHT}, {DESCRIPTION_WEIGHT}, {CATEGORY_WEIGHT})'
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE product_search USING fts5("
+    "name, description, category, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE product_trigrams USING fts5("
+    "name, content='product', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER product_search_insert AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_search (rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); "
+    "INSERT INTO product_trigrams (rowid, name) VALUES (new.id, new.name); "
+    "END",
+    "CREATE TRIGGER product_search_delete AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_search (product_search, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); "
+    "INSERT INTO product_trigrams (product_trigrams, rowid, name) VALUES ('delete', old.id, old.name); "
+    "END",
+    # Only writes to the indexed columns reindex: price and availability changes skip it
+    "CREATE TRIGGER product_search_update AFTER UPDATE OF name, description, category ON product BEGIN "
+    "INSERT INTO product_search (product_search, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); "
+    "INSERT INTO product_trigrams (product_trigrams, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO product_search (rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); "
+    "INSERT INTO product_trigrams (rowid, name) VALUES (new.id, new.name); "
+    "END",
+]
+SQLITE_DROP = ["DROP TABLE IF EXISTS product_search", "DROP TABLE IF EXISTS product_trigrams"]
+
+PG_CONFIG = 'simple'
+PG_DOCUMENT = (
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(category, '')), 'B') || "
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(description, '')), 'C')"
+)
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX ix_product_search ON product USING gin (({PG_DOCUMENT}))",
+    "CREATE INDEX ix_product_name_trgm ON product USING gin (name gin_trgm_ops)",
+]
+
+for statement in SQLITE_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in SQLITE_DROP:
+    event.listen(Product.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRES_DDL:
+    event.listen(Product.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+def terms(text):
+    """The lowercased words of a query, at most MAX_TERMS of them"""
+    return WORD.findall(text.lower())[:MAX_TERMS]
+
+
+def trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def similarity(words, name):
+    """Share of the query words' trigrams found in the name"""
+    wanted = set().union(*(trigrams(word) for word in words))
+    if not wanted:
+        return 0.0
+    found = set().union(*(trigrams(word) for word in terms(name)))
+    return len(wanted & found) / len(wanted)
+
+
+def _available(query, category):
+    query = query.where(Product.is_available.is_(True), Product.is_deleted.is_(False))
+    if category:
+        query = query.where(Product.category == category)
+    return query
+
+
+def _sqlite_ranked(session, words, limit, category):
+    # Quoted so that words are never read as FTS5 operators; * makes each one a prefix
+    match = ' '.join(f'"{word}"*' for word in words)
+    query = serializers.select_fields(Product, serializers.PRODUCT_FIELDS) \
+        .join(SEARCH, SEARCH.c.rowid == Product.id) \
+        .where(literal_column('product_search').match(match), SEARCH.c.rank.match(RANKING)) \
+        .order_by(SEARCH.c.rank)
+    return session.execute(_available(query, category).limit(limit))
+
+
+def _sqlite_fuzzy(session, words, limit, category):
+    grams = set().union(*(trigrams(word) for word in words))
+    if not grams:
+        return []
+    # Names sharing the most (and rarest) trigrams with the query come first
+    match = ' OR '.join(f'"{gram}"' for gram in sorted(grams))
+    query = serializers.select_fields(Product, serializers.PRODUCT_FIELDS) \
+        .join(TRIGRAMS, TRIGRAMS.c.rowid == Product.id) \
+        .where(literal_column('product_trigrams').match(match)) \
+        .order_by(TRIGRAMS.c.rank)
+    rows = session.execute(_available(query, category).limit(limit * FUZZY_CANDIDATES_PER_RESULT)).all()
+
+    name = serializers.PRODUCT_FIELDS.index('name')
+    scored = [(similarity(words, row[name]), index, row) for index, row in enumerate(rows)]
+    scored = [entry for entry in scored if entry[0] >= FUZZY_MIN_SIMILARITY]
+    scored.sort(key=lambda entry: (-entry[0], entry[1]))
+    return [row for _, _, row in scored[:limit]]
+
+
+def _postgres_ranked(session, words, limit, category):
+    document = literal_column(PG_DOCUMENT)
+    tsquery = func.to_tsquery(PG_CONFIG, ' & '.join(f'{word}:*' for word in words))
+    query = serializers.select_fields(Product, serializers.PRODUCT_FIELDS) \
+        .where(document.op('@@')(tsquery)) \
+        .order_by(func.ts_rank(document, tsquery).desc())
+    return session.execute(_available(query, category).limit(limit))
+
+
+def _postgres_fuzzy(session, words, limit, category):
+    text = ' '.join(words)
+    # word_similarity above pg_trgm.word_similarity_threshold, served by ix_product_name_trgm
+    query = serializers.select_fields(Product, serializers.PRODUCT_FIELDS) \
+        .where(literal(text).op('<%')(Product.name)) \
+        .order_by(func.word_similarity(text, Product.name).desc())
+    return session.execute(_available(query, category).limit(limit))
+
+
+def _substring(session, words, limit, category):
+    # Other databases: every word somewhere in the name, description or category, unranked
+    query = serializers.select_fields(Product, serializers.PRODUCT_FIELDS).order_by(Product.name)
+    for word in words:
+        pattern = f'%{word}%'
+        query = query.where(or_(Product.name.ilike(pattern), Product.description.ilike(pattern),
+                                Product.category.ilike(pattern)))
+    return session.execute(_available(query, category).limit(limit))
+
+
+def search(session, text, limit=DEFAULT_LIMIT, category=None):
+    """(product dicts, fuzzy): ranked matches for `text`, falling back to typo-tolerant ones"""
+    words = terms(text)
+    if not words:
+        return [], False
+
+    dialect = session.get_bind(mapper=Product.__mapper__).dialect.name
+    if dialect == 'sqlite':
+        ranked, fuzzy = _sqlite_ranked, _sqlite_fuzzy
+    elif dialect == 'postgresql':
+        ranked, fuzzy = _postgres_ranked, _postgres_fuzzy
+    else:
+        ranked, fuzzy = _substring, None
+
+    rows = ranked(session, words, limit, category).all()
+    if rows or fuzzy is None:
+        return serializers.rows_as_dicts(serializers.PRODUCT_FIELDS, rows), False
+    return serializers.rows_as_dicts(serializers.PRODUCT_FIELDS, fuzzy(session, words, limit, category)), True
@@ -1,10 +1,23 @@
-from app import app
-from models import db, Product, Customization, Table
+from models import db, Product, Customization, Table, User, Order, OrderItem, GiftCard
 from werkzeug.security import generate_password_hash
 from flask_migrate import Migrate, upgrade
+from images import generate_all
+import menu_changes
+import recommendations
+from datetime import datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import bindparam, event
+import argparse
+import os
+import random
+import time
 
 # Sample data insertion script
-def seed_database():
+def seed_database(app=None, generate_images=True):
+    """Reset the menu and tables to the sample data; defaults to the app built from the environment"""
+    if app is None:
+        from app import app
+    
     with app.app_context():
         # Make sure database is initialized and migrated before adding data
         migrate = Migrate(app, db)
@@ -16,6 +29,8 @@ def seed_database():
         Customization.query.delete()
         Product.query.delete()
         Table.query.delete()
+        # The deleted rows leave no tombstones, so kiosks synced before now start over
+        menu_changes.mark_reset(db.session)
         db.session.commit()
         
         # Add tables
@@ -240,6 +255,289 @@ def seed_database():
             
         db.session.commit()
         print("Sample data added successfully!")
+        
+        if not generate_images:
+            return
+        
+        # Pre-generate responsive image variants for the menu
+        images_dir = os.path.join(app.static_folder, 'images')
+        manifest = generate_all(images_dir)
+        print(f"Generated image variants for {len(manifest)} images")
+
+# Synthetic data at scale (python seed_data.py --scale 1000000)
+
+# Relative order volume per hour of the day: breakfast rush, lunch peak, quiet evening
+HOURLY_WEIGHTS = {
+    7: 6, 8: 10, 9: 8, 10: 5, 11: 6, 12: 9, 13: 8, 14: 5,
+    15: 5, 16: 4, 17: 3, 18: 2, 19: 1,
+}
+# Monday..Sunday
+WEEKDAY_WEIGHTS = [1.0, 0.95, 0.95, 1.0, 1.1, 1.3, 1.2]
+ITEMS_PER_ORDER_WEIGHTS = [50, 30, 15, 5]  # 1..4 items
+CATEGORY_WEIGHTS = {"coffee": 5, "tea": 2, "food": 2, "dessert": 1}
+
+FIRST_NAMES = ["Ana", "Ben", "Chen", "Dara", "Elif", "Femi", "Gia", "Hugo", "Ines", "Jon", "Kai", "Lena"]
+LAST_NAMES = ["Smith", "Garcia", "Kim", "Hoxha", "Rossi", "Novak", "Silva", "Berg", "Ito", "Dubois"]
+
+REDEMPTION_POINTS = [30, 50, 75, 100]  # the loyalty reward catalogue
+
+
+def _speed_pragmas(dbapi_connection, connection_record):
+    # Bulk loading only: a crash mid-load leaves a database you would regenerate anyway
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA cache_size=-262144")  # 256MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _insert_rows(conn, table, rows):
+    """executemany INSERT of dict rows through Core.
+
+    On SQLite the rows go to the driver as tuples, in the same storage format
+    SQLAlchemy uses, because its per-row parameter processing would otherwise
+    cost more than the inserts themselves.
+    """
+    if conn.dialect.name != 'sqlite':
+        conn.execute(table.insert(), rows)
+        return
+
+    columns = list(rows[0])
+    converters = []
+    for name in columns:
+        column_type = table.c[name].type
+        if isinstance(column_type, (db.DateTime, db.Date)):
+            converters.append(lambda value: value.isoformat(sep=' ', timespec='microseconds')
+                              if isinstance(value, datetime) else (value.isoformat() if value else None))
+        elif isinstance(column_type, db.Boolean):
+            converters.append(lambda value: None if value is None else int(value))
+        else:
+            converters.append(None)
+
+    converted = [(i, convert) for i, convert in enumerate(converters) if convert is not None]
+    sql = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+        table.name, ', '.join(f'"{name}"' for name in columns), ', '.join('?' * len(columns))
+    )
+
+    params = []
+    for row in rows:
+        values = list(row.values())
+        for i, convert in converted:
+            values[i] = convert(values[i])
+        params.append(tuple(values))
+    conn.exec_driver_sql(sql, params)
+
+
+def generate_scale(app, orders, seed=42, days=365, batch_size=50000):
+    """Deterministically generate users, orders, order items, gift cards and loyalty activity.
+
+    Replaces every user, order and gift card. Rows are built in Python and
+    written with Core executemany inserts, `batch_size` orders per
+    transaction. The same seed and arguments always produce the same data.
+    """
+    rng = random.Random(seed)
+    user_count = max(10, orders // 20)
+    gift_card_count = orders // 50
+    end = datetime(2024, 1, 1) + timedelta(days=days)
+    start_day = end - timedelta(days=days)
+
+    with app.app_context():
+        db.create_all()
+        engine = db.engine
+        # Pooled connections are dropped so new ones pick up the pragmas (not for in-memory databases)
+        speed_up = engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:')
+        if speed_up:
+            engine.dispose()
+            event.listen(engine, 'connect', _speed_pragmas)
+
+        products = Product.query.filter_by(is_available=True).all()
+        product_ids = [p.id for p in products]
+        product_prices = {p.id: p.price for p in products}
+        product_points = {p.id: p.points_value or 0 for p in products}
+        product_weights = [CATEGORY_WEIGHTS.get(p.category, 1) for p in products]
+        table_numbers = [row[0] for row in db.session.query(Table.table_number)]
+        db.session.remove()
+
+        timer = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(GiftCard.__table__.delete())
+            conn.execute(OrderItem.__table__.delete())
+            conn.execute(Order.__table__.delete())
+            conn.execute(User.__table__.delete())
+
+        # One hash for everyone: hashing is deliberately slow and would dominate the run
+        password = generate_password_hash('password')
+        created = start_day - timedelta(days=30)
+        with engine.begin() as conn:
+            for first in range(0, user_count, batch_size):
+                _insert_rows(conn, User.__table__, [
+                    {
+                        "id": i + 1,
+                        "username": f"user{i + 1}",
+                        "email": f"user{i + 1}@example.com",
+                        "password": password,
+                        "first_name": rng.choice(FIRST_NAMES),
+                        "last_name": rng.choice(LAST_NAMES),
+                        "birthday": None,
+                        "loyalty_points": 0,
+                        "created_at": created + timedelta(seconds=rng.randrange(86400 * 30)),
+                    }
+                    for i in range(first, min(first + batch_size, user_count))
+                ])
+        print(f"Users: {user_count} in {time.perf_counter() - timer:.1f}s")
+
+        # Orders per day follow the weekday weights; times within a day the hourly weights
+        timer = time.perf_counter()
+        day_weights = [WEEKDAY_WEIGHTS[(start_day + timedelta(days=d)).weekday()] for d in range(days)]
+        total_weight = sum(day_weights)
+        hours = list(HOURLY_WEIGHTS)
+        hour_cum_weights = list(accumulate(HOURLY_WEIGHTS.values()))
+        item_counts = (1, 2, 3, 4)
+        item_count_cum_weights = list(accumulate(ITEMS_PER_ORDER_WEIGHTS))
+        product_cum_weights = list(accumulate(product_weights))
+        balances = [0] * (user_count + 1)
+        order_table = Order.__table__
+        item_table = OrderItem.__table__
+        order_rows, item_rows = [], []
+        order_id = item_id = 0
+        carry = 0.0
+
+        # Columns left out of the rows (customizations) are inserted as NULL
+        def flush():
+            with engine.begin() as conn:
+                _insert_rows(conn, order_table, order_rows)
+                if item_rows:
+                    _insert_rows(conn, item_table, item_rows)
+            order_rows.clear()
+            item_rows.clear()
+
+        for day_index in range(days):
+            carry += orders * day_weights[day_index] / total_weight
+            day_orders = int(carry) if day_index < days - 1 else orders - order_id
+            carry -= day_orders
+            day = start_day + timedelta(days=day_index)
+            seconds = sorted(
+                hour * 3600 + rng.randrange(3600)
+                for hour in rng.choices(hours, cum_weights=hour_cum_weights, k=day_orders)
+            )
+            recent = day_index >= days - 1
+
+            for second in seconds:
+                order_id += 1
+                # A few regulars place most of the orders
+                user_id = int(user_count * rng.random() ** 1.5) + 1
+                order_date = day + timedelta(seconds=second)
+
+                # Reward redemptions show up as zero-value orders that only use points
+                if balances[user_id] >= 100 and rng.random() < 0.05:
+                    points = rng.choice(REDEMPTION_POINTS)
+                    balances[user_id] -= points
+                    order_rows.append({
+                        "id": order_id, "user_id": user_id, "status": 'completed', "order_date": order_date,
+                        "total_amount": 0, "points_earned": 0, "points_used": points, "table_number": None,
+                    })
+                    continue
+
+                total = 0.0
+                points_earned = 0
+                item_count = rng.choices(item_counts, cum_weights=item_count_cum_weights)[0]
+                for product_id in rng.choices(product_ids, cum_weights=product_cum_weights, k=item_count):
+                    quantity = 1 if rng.random() < 0.85 else 2
+                    price = product_prices[product_id]
+                    item_id += 1
+                    item_rows.append({
+                        "id": item_id, "order_id": order_id, "product_id": product_id, "quantity": quantity,
+                        "unit_price": price, "total_price": price * quantity,
+                    })
+                    total += price * quantity
+                    points_earned += product_points[product_id] * quantity
+
+                points_used = 0
+                if balances[user_id] >= 50 and rng.random() < 0.1:
+                    points_used = min(balances[user_id], int(total * 10))
+                    total -= points_used / 10
+                balances[user_id] += points_earned - points_used
+
+                if recent:
+                    status = rng.choice(('pending', 'processing', 'completed'))
+                else:
+                    status = 'cancelled' if rng.random() < 0.02 else 'completed'
+                order_rows.append({
+                    "id": order_id, "user_id": user_id, "status": status, "order_date": order_date,
+                    "total_amount": round(total, 2), "points_earned": points_earned, "points_used": points_used,
+                    "table_number": rng.choice(table_numbers) if table_numbers and rng.random() < 0.3 else None,
+                })
+
+                if len(order_rows) >= batch_size:
+                    flush()
+        if order_rows:
+            flush()
+        print(f"Orders: {order_id} with {item_id} items in {time.perf_counter() - timer:.1f}s")
+
+        timer = time.perf_counter()
+        with engine.begin() as conn:
+            update = User.__table__.update().where(User.__table__.c.id == bindparam('uid')).values(
+                loyalty_points=bindparam('points')
+            )
+            for first in range(1, user_count + 1, batch_size):
+                conn.execute(update, [
+                    {"uid": uid, "points": balances[uid]}
+                    for uid in range(first, min(first + batch_size, user_count + 1))
+                ])
+
+            gift_cards = []
+            for i in range(1, gift_card_count + 1):
+                created_at = start_day + timedelta(seconds=rng.randrange(days * 86400))
+                receiver_id = rng.randrange(1, user_count + 1) if rng.random() < 0.7 else None
+                redeemed = receiver_id is not None and rng.random() < 0.6
+                gift_cards.append({
+                    "id": i,
+                    "code": f"S{i:07X}",  # 'S' is not a hex digit, so never clashes with generated codes
+                    "sender_id": rng.randrange(1, user_count + 1),
+                    "receiver_id": receiver_id,
+                    "receiver_email": f"user{receiver_id}@example.com" if receiver_id else f"guest{i}@example.com",
+                    "amount": rng.choice((10, 15, 20, 25, 50)),
+                    "message": "Enjoy!",
+                    "created_at": created_at,
+                    "expiration_date": (created_at + timedelta(days=365)).date(),
+                    "is_redeemed": redeemed,
+                    "redeemed_at": created_at + timedelta(days=rng.randrange(1, 60)) if redeemed else None,
+                })
+                if len(gift_cards) >= batch_size:
+                    _insert_rows(conn, GiftCard.__table__, gift_cards)
+                    gift_cards.clear()
+            if gift_cards:
+                _insert_rows(conn, GiftCard.__table__, gift_cards)
+        print(f"Loyalty balances and {gift_card_count} gift cards in {time.perf_counter() - timer:.1f}s")
+
+        # The orders went in through Core, so the co-occurrence index is rebuilt from them in one pass
+        timer = time.perf_counter()
+        stats = recommendations.rebuild(db.session, app.config['RECOMMENDATIONS_TOP_K'])
+        db.session.commit()
+        print(f"Recommendations: {stats['pairs']} product pairs in {time.perf_counter() - timer:.1f}s")
+
+        if speed_up:
+            event.remove(engine, 'connect', _speed_pragmas)
+            engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the menu and tables, optionally with synthetic data at scale")
+    parser.add_argument('--scale', type=int, metavar='ORDERS',
+                        help='also generate this many orders, with users, items and gift cards to match '
+                             '(replaces all users, orders and gift cards)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for --scale')
+    parser.add_argument('--days', type=int, default=365, help='days of order history for --scale')
+    parser.add_argument('--batch-size', type=int, default=50000, help='orders per transaction for --scale')
+    parser.add_argument('--skip-images', action='store_true', help='do not generate image variants')
+    args = parser.parse_args()
+
+    from app import create_app
+    # Bulk inserts are slow by design; keep them out of the slow-query log
+    app = create_app({'SLOW_QUERY_THRESHOLD_MS': float('inf')})
+    seed_database(app, generate_images=not args.skip_images)
+    if args.scale:
+        generate_scale(app, args.scale, seed=args.seed, days=args.days, batch_size=args.batch_size)
 
 if __name__ == "__main__":
-    seed_database() 
\ No newline at end of file
+    main()
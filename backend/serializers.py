@@ -0,0 +1,58 @@
+"""Per-model serializers shared by the routes.
+
+Each serializer is built once from a declared field list and turns a model
+instance, or a Core row with the same column names, into a dict. Values are
+left as they are; the JSON provider formats dates and datetimes.
+
+Listings that can run to thousands of rows skip the ORM: select_fields()
+reads just the declared columns as plain rows, with no identity map or
+change tracking, and rows_as_dicts() zips them with the field names.
+"""
+from operator import attrgetter
+
+from sqlalchemy import select
+
+PRODUCT_FIELDS = ('id', 'name', 'description', 'price', 'category', 'image_url', 'points_value')
+CUSTOMIZATION_FIELDS = ('id', 'name', 'options', 'price_impact')
+# The kiosk change feed: unavailable and deleted rows included, so it carries the flags and revision
+PRODUCT_CHANGE_FIELDS = PRODUCT_FIELDS + ('is_available', 'is_deleted', 'revision')
+CUSTOMIZATION_CHANGE_FIELDS = ('id', 'product_id', 'name', 'options', 'price_impact', 'is_deleted', 'revision')
+ORDER_FIELDS = ('id', 'status', 'total_amount', 'points_earned', 'points_used', 'order_date')
+ORDER_DETAIL_FIELDS = ORDER_FIELDS + ('table_number',)
+ORDER_ITEM_FIELDS = ('product_id', 'quantity', 'customizations', 'unit_price', 'total_price')
+# The admin listing and the kitchen's per-table feed
+ORDER_SUMMARY_FIELDS = ('id', 'user_id', 'status', 'total_amount', 'order_date', 'table_number')
+TABLE_ORDER_FIELDS = ('id', 'user_id', 'status', 'total_amount', 'order_date')
+TABLE_FIELDS = ('id', 'table_number', 'qr_code_url', 'is_occupied')
+GIFT_CARD_FIELDS = ('id', 'code', 'amount', 'message', 'created_at', 'expiration_date', 'is_redeemed')
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'birthday', 'loyalty_points', 'created_at')
+
+
+def serializer(*fields):
+    """Return a function mapping an object to {field: getattr(obj, field)} for `fields`"""
+    if len(fields) == 1:
+        name, = fields
+        return lambda obj: {name: getattr(obj, name)}
+
+    get = attrgetter(*fields)
+    return lambda obj: dict(zip(fields, get(obj)))
+
+
+def select_fields(model, fields):
+    """A Core select of `model`'s columns named in `fields`, in that order"""
+    return select(*[getattr(model, name) for name in fields])
+
+
+def rows_as_dicts(fields, rows):
+    """Dicts for rows from select_fields(model, fields)"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+product = serializer(*PRODUCT_FIELDS)
+customization = serializer(*CUSTOMIZATION_FIELDS)
+order = serializer(*ORDER_FIELDS)
+order_detail = serializer(*ORDER_DETAIL_FIELDS)
+order_item = serializer(*ORDER_ITEM_FIELDS)
+order_summary = serializer(*ORDER_SUMMARY_FIELDS)
+gift_card = serializer(*GIFT_CARD_FIELDS)
+user = serializer(*USER_FIELDS)
@@ -0,0 +1,162 @@
+"""Slow-query log with query plan capture.
+
+Every statement is timed through SQLAlchemy cursor events. Statements slower
+than SLOW_QUERY_THRESHOLD_MS are grouped by fingerprint (the SQL with literals
+and parameter lists collapsed) along with the route that issued them, and
+the first time a fingerprint is seen its plan is captured with
+EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL). Recent slow statements
+are kept in a ring buffer and also logged to the 'slow_queries' logger, which
+can be pointed at a rotating file with SLOW_QUERY_LOG_FILE.
+"""
+import logging
+import logging.handlers
+import re
+import threading
+import time
+from collections import deque
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('slow_queries')
+
+EXPLAINABLE = ('select', 'with', 'update', 'delete')
+MAX_FINGERPRINTS = 500
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Normalise a statement so executions differing only in values group together."""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+def explain(conn, statement, parameters):
+    """Return the plan for a statement as text lines, using the raw DBAPI connection.
+
+    Going through the DBAPI cursor keeps the EXPLAIN itself out of the
+    SQLAlchemy events (and out of the metrics).
+    """
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        sql = f"EXPLAIN QUERY PLAN {statement}"
+    elif dialect == 'postgresql':
+        sql = f"EXPLAIN {statement}"
+    else:
+        return None
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(sql, parameters)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    if dialect == 'sqlite':
+        # (id, parent, notused, detail); indent children under their parent
+        depth = {0: -1}
+        lines = []
+        for row_id, parent, _, detail in rows:
+            depth[row_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[row_id] + detail)
+        return lines
+    return [row[0] for row in rows]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['slow_query_start'].pop()
+    log = current_app.extensions.get('slow_queries') if has_app_context() else None
+    if log is None or elapsed < log.threshold:
+        return
+
+    route = request.endpoint if has_request_context() else None
+    log.record(conn, statement, parameters, elapsed, route or 'background', executemany)
+
+
+class SlowQueryLog:
+    def __init__(self, app=None):
+        self.threshold = 0.1
+        self.capture_plans = True
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._recent = deque(maxlen=200)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 100) / 1000.0
+        self.capture_plans = app.config.get('SLOW_QUERY_CAPTURE_PLANS', True)
+        self._recent = deque(self._recent, maxlen=app.config.get('SLOW_QUERY_BUFFER_SIZE', 200))
+        app.extensions['slow_queries'] = self
+
+        log_file = app.config.get('SLOW_QUERY_LOG_FILE')
+        if log_file and not logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def record(self, conn, statement, parameters, elapsed, route, executemany=False):
+        key = fingerprint(statement)
+        with self._lock:
+            entry = self._fingerprints.get(key)
+            if entry is None:
+                if len(self._fingerprints) >= MAX_FINGERPRINTS:
+                    # Forget the cheapest fingerprint to stay bounded
+                    cheapest = min(self._fingerprints, key=lambda k: self._fingerprints[k]["total_time"])
+                    del self._fingerprints[cheapest]
+                entry = self._fingerprints[key] = {
+                    "fingerprint": key,
+                    "count": 0,
+                    "total_time": 0.0,
+                    "max_time": 0.0,
+                    "routes": {},
+                    "plan": None,
+                }
+            entry["count"] += 1
+            entry["total_time"] += elapsed
+            entry["max_time"] = max(entry["max_time"], elapsed)
+            entry["last_seen"] = time.time()
+            entry["routes"][route] = entry["routes"].get(route, 0) + 1
+            needs_plan = entry["plan"] is None
+            self._recent.append({"fingerprint": key, "route": route, "duration": elapsed, "at": time.time()})
+
+        if needs_plan and self.capture_plans and not executemany and statement.lstrip().lower().startswith(EXPLAINABLE):
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception as e:
+                plan = [f"EXPLAIN failed: {e}"]
+            with self._lock:
+                entry["plan"] = plan
+
+        logger.warning("Slow query", extra={
+            "fingerprint": key, "route": route, "duration_ms": round(elapsed * 1000, 2)
+        })
+
+    def top(self, limit=20):
+        with self._lock:
+            entries = sorted(self._fingerprints.values(), key=lambda e: e["total_time"], reverse=True)
+            return [dict(entry, routes=dict(entry["routes"])) for entry in entries[:limit]]
+
+    def recent(self):
+        with self._lock:
+            return list(self._recent)
+
+    def reset(self):
+        with self._lock:
+            self._fingerprints.clear()
+            self._recent.clear()
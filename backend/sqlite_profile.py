@@ -0,0 +1,190 @@
+"""Production settings for SQLite.
+
+With SQLITE_PROFILE=tuned (the default) connections are pooled and each new
+one gets WAL journaling, a busy timeout, synchronous=NORMAL, a memory map, a
+larger page cache and in-memory temp tables. Transactions are started explicitly:
+requests that can write (anything but GET/HEAD/OPTIONS) open theirs with
+BEGIN IMMEDIATE, taking the write lock up front so that two deferred
+transactions never deadlock upgrading to writers - the case where SQLite
+returns "database is locked" without waiting for the busy timeout. A
+background thread in each worker runs a passive WAL checkpoint periodically
+so the -wal file does not grow without bound between automatic checkpoints.
+
+SQLITE_PROFILE=default leaves pysqlite's behaviour untouched.
+"""
+import logging
+import os
+import threading
+import time
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+PROFILES = ('tuned', 'default')
+
+# Checkpoint in TRUNCATE mode once the WAL holds more frames than this (about 40MB with 4KB pages)
+TRUNCATE_AFTER_FRAMES = 10000
+
+
+def deferred_begin(view):
+    """Mark a non-GET view whose own queries only read, so they start with a plain BEGIN.
+
+    Place it directly under the route decorator.
+    """
+    view.deferred_begin = True
+    return view
+
+
+def _immediate_begin():
+    if not has_request_context() or request.method in READ_METHODS:
+        return False
+    return not getattr(current_app.view_functions.get(request.endpoint), 'deferred_begin', False)
+
+
+class SQLiteProfile:
+    def __init__(self, app=None):
+        self.profile = 'tuned'
+        self.busy_timeout = 5000
+        self.mmap_size = 256 * 1024 * 1024
+        self.cache_size_kb = 64 * 1024
+        self.checkpoint_interval = 60.0
+        self.enabled = False
+        self.in_memory = False
+        self._engine = None
+        self._checkpointer = None
+        self._checkpointer_pid = None
+        self._checkpoint_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._checkpoints = {"runs": 0, "failures": 0, "last": None, "last_at": None}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.profile = app.config.get('SQLITE_PROFILE', self.profile)
+        if self.profile not in PROFILES:
+            raise ValueError(f"SQLITE_PROFILE must be one of {', '.join(PROFILES)}, not {self.profile!r}")
+        self.busy_timeout = app.config.get('SQLITE_BUSY_TIMEOUT_MS', self.busy_timeout)
+        self.mmap_size = app.config.get('SQLITE_MMAP_SIZE', self.mmap_size)
+        self.cache_size_kb = app.config.get('SQLITE_CACHE_SIZE_KB', self.cache_size_kb)
+        self.checkpoint_interval = app.config.get('SQLITE_CHECKPOINT_INTERVAL', self.checkpoint_interval)
+        app.extensions['sqlite_profile'] = self
+
+        url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        if self.profile == 'tuned' and url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+            # Flask-SQLAlchemy defaults file databases to NullPool, which would throw away
+            # the page cache and memory map after every request, so keep connections pooled
+            options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+            options.setdefault('poolclass', QueuePool)
+            options.setdefault('pool_size', app.config.get('SQLITE_POOL_SIZE', 8))
+            options.setdefault('connect_args', {}).setdefault('check_same_thread', False)
+
+        with app.app_context():
+            self._engine = db.engine
+        if self._engine.dialect.name != 'sqlite' or self.profile != 'tuned':
+            return
+
+        self.enabled = True
+        self.in_memory = self._engine.url.database in (None, '', ':memory:')
+        event.listen(self._engine, 'connect', self._on_connect)
+        event.listen(self._engine, 'begin', self._on_begin)
+        event.listen(self._engine, 'commit', self._on_end)
+        event.listen(self._engine, 'rollback', self._on_end)
+
+        if self.checkpoint_interval and not self.in_memory:
+            # Started from the first request so each (forked) worker runs its own thread
+            app.before_request(self._ensure_checkpointer)
+
+    def pragmas(self):
+        statements = [
+            f"PRAGMA busy_timeout={int(self.busy_timeout)}",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA cache_size=-{int(self.cache_size_kb)}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+        if not self.in_memory:
+            statements.insert(0, "PRAGMA journal_mode=WAL")
+        return statements
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        # Stop pysqlite from issuing its own (deferred) BEGIN; _on_begin emits ours
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for statement in self.pragmas():
+            cursor.execute(statement)
+        cursor.close()
+
+    def _on_begin(self, conn):
+        immediate = _immediate_begin()
+        if immediate:
+            # Writers in this process queue on a lock instead of SQLite's busy handler,
+            # which polls with growing sleeps and lets a waiting thread miss its turn
+            self._write_lock.acquire()
+            conn.info['sqlite_write_lock'] = True
+        # Straight to the driver so BEGIN is not counted as a query by metrics and query budgets
+        try:
+            conn.connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        except Exception:
+            self._on_end(conn)
+            raise
+
+    def _on_end(self, conn):
+        if conn.info.pop('sqlite_write_lock', False):
+            self._write_lock.release()
+
+    def _ensure_checkpointer(self):
+        if self._checkpointer_pid == os.getpid():
+            return
+        with self._checkpoint_lock:
+            if self._checkpointer_pid == os.getpid():
+                return
+            self._checkpointer_pid = os.getpid()
+            self._checkpointer = threading.Thread(target=self._checkpoint_loop, name='sqlite-checkpoint', daemon=True)
+            self._checkpointer.start()
+
+    def _checkpoint_loop(self):
+        while True:
+            time.sleep(self.checkpoint_interval)
+            try:
+                self.checkpoint()
+            except Exception:
+                self._checkpoints["failures"] += 1
+                logger.exception("WAL checkpoint failed")
+
+    def checkpoint(self, mode='PASSIVE'):
+        """Run a WAL checkpoint; escalates to TRUNCATE when the log has grown large."""
+        raw = self._engine.raw_connection()
+        try:
+            busy, log_frames, checkpointed = raw.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            if mode == 'PASSIVE' and log_frames > TRUNCATE_AFTER_FRAMES:
+                busy, log_frames, checkpointed = raw.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        finally:
+            raw.close()
+
+        result = {"busy": bool(busy), "log_frames": log_frames, "checkpointed_frames": checkpointed}
+        self._checkpoints.update(runs=self._checkpoints["runs"] + 1, last=result, last_at=time.time())
+        return result
+
+    def stats(self):
+        settings = {}
+        if self._engine is not None and self._engine.dialect.name == 'sqlite':
+            raw = self._engine.raw_connection()
+            try:
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store'):
+                    settings[name] = raw.execute(f"PRAGMA {name}").fetchone()[0]
+            finally:
+                raw.close()
+        return {
+            "profile": self.profile,
+            "enabled": self.enabled,
+            "pragmas": settings,
+            "checkpoint_interval": self.checkpoint_interval,
+            "checkpoints": dict(self._checkpoints),
+        }
@@ -0,0 +1,108 @@
+"""Prebuilt statements for the hottest lookups.
+
+Each statement is built once, at import, with bound parameters in place of
+values. A request then only binds its values and executes: no Query object,
+filter_by() chain or select() to construct, and SQLAlchemy finds the SQL in
+its compiled cache under the same cache key every time. The functions below
+run them on the current session and return ORM instances, like the legacy
+Model.query calls they replace.
+"""
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import configure_mappers, selectinload
+
+from models import db, Customization, GiftCard, Order, OrderItem, Product, Table, User
+
+# Backrefs such as OrderItem.product only exist once the mappers are configured
+configure_mappers()
+
+PRODUCT_BY_ID = select(Product).where(Product.id == bindparam('product_id'))
+PRODUCTS_BY_IDS = select(Product).where(Product.id.in_(bindparam('product_ids', expanding=True)))
+CUSTOMIZATIONS_BY_PRODUCT = select(Customization).where(Customization.product_id == bindparam('product_id'))
+
+USER_BY_EMAIL = select(User).where(User.email == bindparam('email'))
+
+ORDER_BY_ID = select(Order).where(Order.id == bindparam('order_id'))
+# Items and their products are loaded up front rather than one query per item
+ORDERS_BY_USER = select(Order).options(
+    selectinload(Order.items).joinedload(OrderItem.product)
+).where(Order.user_id == bindparam('user_id')).order_by(Order.order_date.desc())
+ORDER_FOR_USER = select(Order).options(
+    selectinload(Order.items).joinedload(OrderItem.product)
+).where(Order.id == bindparam('order_id'), Order.user_id == bindparam('user_id'))
+RECENT_ORDERS_BY_USER = select(Order).where(
+    Order.user_id == bindparam('user_id')
+).order_by(Order.order_date.desc()).limit(bindparam('limit'))
+
+TABLE_BY_ID = select(Table).where(Table.id == bindparam('table_id'))
+TABLE_BY_NUMBER = select(Table).where(Table.table_number == bindparam('table_number'))
+
+GIFT_CARD_BY_CODE = select(GiftCard).where(GiftCard.code == bindparam('code'))
+GIFT_CARDS_SENT_BY = select(GiftCard).where(GiftCard.sender_id == bindparam('user_id'))
+GIFT_CARDS_RECEIVED_BY = select(GiftCard).options(
+    selectinload(GiftCard.sender)
+).where(GiftCard.receiver_id == bindparam('user_id'))
+
+
+def _one(statement, **params):
+    return db.session.execute(statement, params).scalars().first()
+
+
+def _all(statement, **params):
+    return db.session.execute(statement, params).scalars().all()
+
+
+def product(product_id):
+    return _one(PRODUCT_BY_ID, product_id=product_id)
+
+
+def products_by_ids(product_ids):
+    return _all(PRODUCTS_BY_IDS, product_ids=list(product_ids))
+
+
+def customizations_for_product(product_id):
+    return _all(CUSTOMIZATIONS_BY_PRODUCT, product_id=product_id)
+
+
+def user(user_id):
+    # Identity map first: sub-requests of one /api/batch share the session and load the caller once
+    return db.session.get(User, user_id)
+
+
+def user_by_email(email):
+    return _one(USER_BY_EMAIL, email=email)
+
+
+def order(order_id):
+    return _one(ORDER_BY_ID, order_id=order_id)
+
+
+def orders_for_user(user_id):
+    return _all(ORDERS_BY_USER, user_id=user_id)
+
+
+def order_for_user(order_id, user_id):
+    return _one(ORDER_FOR_USER, order_id=order_id, user_id=user_id)
+
+
+def recent_orders_for_user(user_id, limit):
+    return _all(RECENT_ORDERS_BY_USER, user_id=user_id, limit=limit)
+
+
+def table(table_id):
+    return _one(TABLE_BY_ID, table_id=table_id)
+
+
+def table_by_number(table_number):
+    return _one(TABLE_BY_NUMBER, table_number=table_number)
+
+
+def gift_card_by_code(code):
+    return _one(GIFT_CARD_BY_CODE, code=code)
+
+
+def gift_cards_sent_by(user_id):
+    return _all(GIFT_CARDS_SENT_BY, user_id=user_id)
+
+
+def gift_cards_received_by(user_id):
+    return _all(GIFT_CARDS_RECEIVED_BY, user_id=user_id)
@@ -0,0 +1,239 @@
+"""Non-blocking structured logging.
+
+Request threads only put records on an in-memory queue; a QueueListener
+thread formats them as one JSON object per line and writes them to stdout.
+Filters on the queue side redact credentials, sample chatty loggers and add
+the current endpoint. Full request dumps are off by default and can be
+switched on per endpoint at runtime through the admin API. The switch is
+kept in the cache backend, so with CACHE_BACKEND=sqlite it applies to every
+worker on the host.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+
+from flask import has_request_context, request
+
+import cache
+
+REDACTED = '[REDACTED]'
+SENSITIVE_HEADERS = {'authorization', 'cookie', 'set-cookie', 'x-profile', 'proxy-authorization'}
+TOKEN_PATTERNS = [
+    re.compile(r'(?i)(bearer\s+)[A-Za-z0-9\-_.~+/]+=*'),
+    re.compile(r'eyJ[A-Za-z0-9\-_]+\.[A-Za-z0-9\-_]+\.[A-Za-z0-9\-_]*'),
+]
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+# Cache setting holding the runtime dump switch, once an admin has changed it
+REQUEST_DUMPS_SETTING = 'request_dumps'
+
+_listener = None
+_handler = None
+# LOG_REQUEST_DUMP_ENDPOINTS: what dumps start as before any runtime change
+_default_dump_endpoints = frozenset()
+
+
+def redact(value):
+    if isinstance(value, str):
+        for pattern in TOKEN_PATTERNS:
+            value = pattern.sub(lambda m: (m.group(1) if m.groups() else '') + REDACTED, value)
+        return value
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in SENSITIVE_HEADERS else redact(item)
+            for key, item in value.items()
+        }
+    return value
+
+
+class RedactionFilter(logging.Filter):
+    def filter(self, record):
+        record.msg = redact(record.msg)
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact(arg) for arg in record.args)
+        elif isinstance(record.args, dict):
+            record.args = redact(record.args)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                setattr(record, key, redact(value))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records below WARNING for configured loggers.
+
+    Rates are matched on the longest logger-name prefix, so a rate for
+    'routes' also covers 'routes.orders' unless that has its own.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return self.rates.get('', 1.0)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or getattr(record, 'request_dump', False):
+            return True
+        return random.random() < self.rate_for(record.name)
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        if has_request_context():
+            record.endpoint = request.endpoint
+            record.method = request.method
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Keep `extra` fields and exception text for the JSON formatter on the listener side
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def parse_sample_rates(value):
+    """'routes.orders=0.1,routes.loyalty=0.5' -> {'routes.orders': 0.1, 'routes.loyalty': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def _start_listener():
+    global _listener
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(_handler.queue, stream_handler)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not survive fork (gunicorn preload), so start a fresh one
+    global _listener
+    if _handler is not None:
+        _handler.queue = queue.Queue(_handler.queue.maxsize)
+        _listener = None
+        _start_listener()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging(app):
+    """Route the root logger through the queue once per process."""
+    global _handler
+    set_request_dumps(app.config.get('LOG_REQUEST_DUMP_ENDPOINTS', ()))
+    if _handler is not None:
+        return
+
+    _handler = DroppingQueueHandler(queue.Queue(app.config.get('LOG_QUEUE_SIZE', 10000)))
+    _handler.addFilter(RequestContextFilter())
+    _handler.addFilter(SamplingFilter(app.config.get('LOG_SAMPLE_RATES', {})))
+    _handler.addFilter(RedactionFilter())
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+
+    _start_listener()
+    atexit.register(_stop_listener)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def logging_stats():
+    sampling = next((f for f in _handler.filters if isinstance(f, SamplingFilter)), None) if _handler else None
+    return {
+        "request_dumps": sorted(request_dump_endpoints()),
+        "sample_rates": sampling.rates if sampling else {},
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
+
+
+def set_request_dumps(endpoints):
+    """Set the endpoints dumped until the switch is changed at runtime"""
+    global _default_dump_endpoints
+    _default_dump_endpoints = frozenset(endpoints)
+
+
+def request_dump_endpoints():
+    return cache.get_setting(REQUEST_DUMPS_SETTING, _default_dump_endpoints)
+
+
+def set_request_dump(endpoint, enabled):
+    """Switch dumps for one endpoint (or '*') on or off in every worker sharing the cache backend"""
+    def update(endpoints):
+        return endpoints | {endpoint} if enabled else endpoints - {endpoint}
+    return cache.update_setting(REQUEST_DUMPS_SETTING, update, _default_dump_endpoints)
+
+
+def dump_request(logger):
+    """Log the current request's headers at DEBUG if dumps are on for its endpoint.
+
+    The switch is the gate, so the record bypasses the logger's level check.
+    """
+    endpoints = request_dump_endpoints()
+    if request.endpoint not in endpoints and '*' not in endpoints:
+        return
+    record = logger.makeRecord(
+        logger.name, logging.DEBUG, __file__, 0, "Request dump", None, None,
+        extra={
+            "request_dump": True,
+            "path": request.path,
+            "headers": dict(request.headers),
+        }
+    )
+    logger.handle(record)
@@ -0,0 +1,41 @@
+import pytest
+
+import cache
+from app import create_app
+from seed_data import seed_database
+from tests.factories import make_user, auth_headers_for
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A fresh app on an in-memory SQLite database seeded with the sample menu"""
+    cache.clear()
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'ADMISSION_ENABLED': False,
+        'METRICS_DIR': None,
+        'PROFILE_DIR': str(tmp_path / 'profiles'),
+        'IMAGE_UPLOAD_DIR': str(tmp_path / 'uploads'),
+        'SLOW_QUERY_CAPTURE_PLANS': False,
+    })
+    seed_database(app, generate_images=False)
+    # No app context is held open here: each request must start with an empty
+    # session, otherwise identity-map hits would hide queries from the budgets
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user_id(app):
+    return make_user(app, 'alice', loyalty_points=200)
+
+
+@pytest.fixture
+def auth_headers(app, user_id):
+    return auth_headers_for(app, user_id)
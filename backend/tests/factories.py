@@ -0,0 +1,82 @@
+"""Helpers that insert test data; each runs in its own app context and returns plain ids."""
+import random
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Product, Order, OrderItem, GiftCard
+
+
+def _new_user(username, loyalty_points=0):
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        # Few iterations keep the suite fast; login still checks the hash for real
+        password=generate_password_hash('password', method='pbkdf2:sha256:1000'),
+        first_name=username.title(),
+        last_name='Tester',
+        loyalty_points=loyalty_points
+    )
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def make_user(app, username, loyalty_points=0):
+    with app.app_context():
+        user = _new_user(username, loyalty_points)
+        db.session.commit()
+        return user.id
+
+
+def auth_headers_for(app, user_id):
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+
+def add_orders(app, user_id, count, table_number=None, seed=42):
+    """Insert `count` pending orders with one to three items each."""
+    rng = random.Random(seed)
+    with app.app_context():
+        products = Product.query.all()
+        start = datetime.utcnow() - timedelta(days=30)
+        for i in range(count):
+            order = Order(
+                user_id=user_id,
+                status='pending',
+                order_date=start + timedelta(minutes=i),
+                total_amount=0,
+                points_earned=1,
+                table_number=table_number
+            )
+            db.session.add(order)
+            db.session.flush()
+            for product in rng.sample(products, rng.randint(1, 3)):
+                db.session.add(OrderItem(
+                    order_id=order.id,
+                    product_id=product.id,
+                    quantity=1,
+                    customizations={},
+                    unit_price=product.price,
+                    total_price=product.price
+                ))
+                order.total_amount += product.price
+        db.session.commit()
+
+
+def add_gift_cards(app, user_id, count):
+    """Give the user `count` gift cards from distinct senders, and send `count` from the user."""
+    expires = datetime.utcnow().date() + timedelta(days=365)
+    with app.app_context():
+        for i in range(count):
+            sender = _new_user(f"sender{i}")
+            db.session.add(GiftCard(
+                sender_id=sender.id, receiver_id=user_id, receiver_email='alice@example.com',
+                amount=10, message='Enjoy', expiration_date=expires
+            ))
+            db.session.add(GiftCard(
+                sender_id=user_id, receiver_email=f"friend{i}@example.com",
+                amount=5, expiration_date=expires
+            ))
+        db.session.commit()
@@ -0,0 +1,62 @@
+"""Fail a test when a block of code issues more SQL statements than allowed."""
+from contextlib import ContextDecorator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Count statements run inside the block and fail if there are more than `limit`.
+
+    Usable as ``with query_budget(3): client.get(...)`` or as a decorator.
+    After the block, ``statements`` holds the SQL that was executed.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.statements = []
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        if exc_type is None and len(self.statements) > self.limit:
+            listing = '\n'.join(f"  {i}. {s}" for i, s in enumerate(self.statements, 1))
+            raise QueryBudgetExceeded(
+                f"{len(self.statements)} SQL statements issued, budget is {self.limit}:\n{listing}"
+            )
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+class orm_loads(ContextDecorator):
+    """Record the ORM instances loaded from the database inside the block in ``loaded``."""
+
+    def __init__(self):
+        self.loaded = []
+
+    def _load(self, target, context):
+        self.loaded.append(target)
+
+    def __enter__(self):
+        self.loaded = []
+        event.listen(Mapper, 'load', self._load)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(Mapper, 'load', self._load)
+        return False
@@ -0,0 +1,51 @@
+import os
+
+from tests.query_budget import query_budget
+
+
+def test_admin_endpoints_do_not_query(client, auth_headers):
+    with query_budget(0):
+        assert client.get('/api/admin/admission', headers=auth_headers).status_code == 200
+        assert client.get('/api/admin/logging', headers=auth_headers).status_code == 200
+        assert client.get('/api/admin/statements', headers=auth_headers).status_code == 200
+        assert client.get('/api/admin/slow-queries', headers=auth_headers).status_code == 200
+        assert client.get('/api/admin/profiles', headers=auth_headers).status_code == 200
+
+
+def test_request_dump_switch(client, auth_headers):
+    response = client.put('/api/admin/logging/request-dumps', json={"endpoint": "test_cors", "enabled": True},
+                          headers=auth_headers)
+    assert response.get_json()["logging"]["request_dumps"] == ["test_cors"]
+
+    client.put('/api/admin/logging/request-dumps', json={"endpoint": "test_cors", "enabled": False},
+               headers=auth_headers)
+
+
+def test_profile_token_round_trip(client, auth_headers):
+    token = client.post('/api/admin/profiles/token', headers=auth_headers).get_json()["token"]
+
+    response = client.get('/api/products/1', headers={'X-Profile': token})
+    profile_id = response.headers['X-Profile-Id']
+
+    profiles = client.get('/api/admin/profiles', headers=auth_headers).get_json()["profiles"]
+    assert [p["id"] for p in profiles] == [profile_id]
+    assert client.get(f'/api/admin/profiles/{profile_id}', headers=auth_headers).status_code == 200
+    assert 'X-Profile-Id' not in client.get('/api/products/1', headers={'X-Profile': '1.forged'}).headers
+
+
+def test_profile_listing_skips_stray_files(app, client, auth_headers):
+    token = client.post('/api/admin/profiles/token', headers=auth_headers).get_json()["token"]
+    profile_id = client.get('/api/products/1', headers={'X-Profile': token}).headers['X-Profile-Id']
+
+    profile_dir = app.config['PROFILE_DIR']
+    endpoint_dir = os.path.join(profile_dir, profile_id.split('/')[0])
+    for name in ('.DS_Store', '.tmp-partial', 'notes-1.txt'):
+        with open(os.path.join(endpoint_dir, name), 'w') as f:
+            f.write('x')
+    with open(os.path.join(profile_dir, '.DS_Store'), 'w') as f:
+        f.write('x')
+
+    response = client.get('/api/admin/profiles', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [p["id"] for p in response.get_json()["profiles"]] == [profile_id]
@@ -0,0 +1,170 @@
+import threading
+
+import pytest
+
+import cache
+from admission import AdmissionController
+from app import create_app
+from seed_data import seed_database
+from tests.factories import auth_headers_for, make_user
+
+
+class Holder:
+    """Threads that each take a slot in a lane and keep it until released"""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.done = threading.Event()
+        self.threads = []
+
+    def hold(self, lane, count):
+        admitted = []
+        for _ in range(count):
+            ready = threading.Event()
+
+            def run():
+                got_slot = self.controller.acquire(lane)
+                admitted.append(got_slot)
+                ready.set()
+                self.done.wait(5)
+                if got_slot:
+                    self.controller.release(lane)
+
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            ready.wait(5)
+            self.threads.append(thread)
+        return admitted
+
+    def release_all(self):
+        self.done.set()
+        for thread in self.threads:
+            thread.join(5)
+
+
+@pytest.fixture
+def controller():
+    controller = AdmissionController()
+    controller.max_in_flight = 4
+    controller.reserved_critical = 1
+    controller.low_priority_limit = 1
+    controller.poll_limit = 2
+    controller.queue_timeout = 0.05
+    return controller
+
+
+@pytest.fixture
+def holder(controller):
+    holder = Holder(controller)
+    yield holder
+    holder.release_all()
+
+
+def test_critical_requests_use_the_reserved_slot(controller, holder):
+    assert holder.hold('normal', 3) == [True] * 3
+
+    # The normal lane stops short of the reserved slot, which only critical traffic may take
+    assert controller.acquire('normal') is False
+    assert controller.acquire('low') is False
+    assert controller.acquire('critical') is True
+    assert controller.acquire('critical') is False
+
+    controller.release('critical')
+
+
+def test_low_priority_lane_has_its_own_cap(controller, holder):
+    assert holder.hold('low', 1) == [True]
+
+    assert controller.acquire('low') is False
+    assert holder.hold('normal', 2) == [True, True]
+    assert controller.acquire('critical') is True
+
+    controller.release('critical')
+
+
+def test_polls_have_their_own_lane(controller, holder):
+    assert controller.route_class('qr_order.poll_table_orders') == 'poll'
+    assert holder.hold('poll', 2) == [True, True]
+
+    # Held polls are capped on their own and leave every other slot free
+    assert controller.acquire('poll') is False
+    assert holder.hold('normal', 3) == [True] * 3
+    assert controller.acquire('critical') is True
+    controller.release('critical')
+
+
+def test_queued_request_is_admitted_when_a_slot_frees(controller):
+    controller.queue_timeout = 5
+    assert controller.acquire('low') is True
+
+    release = threading.Timer(0.05, controller.release, ('low',))
+    release.start()
+    assert controller.acquire('low') is True
+    release.join()
+
+    lanes = controller.stats()["lanes"]
+    assert lanes["low"]["queued"] == 1
+    assert lanes["low"]["shed"] == 0
+    assert lanes["low"]["queue_wait_max"] > 0
+    controller.release('low')
+
+
+def test_stats_count_admitted_shed_and_in_flight(controller, holder):
+    holder.hold('normal', 3)
+    controller.acquire('normal')
+    controller.acquire('normal')
+
+    stats = controller.stats()
+
+    assert stats["in_flight"] == 3
+    assert stats["lanes"]["normal"]["admitted"] == 3
+    assert stats["lanes"]["normal"]["shed"] == 2
+    assert stats["lanes"]["normal"]["queued"] == 2
+    assert stats["lanes"]["normal"]["in_flight"] == 3
+    assert stats["lanes"]["critical"]["admitted"] == 0
+
+    holder.release_all()
+    assert controller.stats()["in_flight"] == 0
+
+
+@pytest.fixture
+def admission_app(tmp_path):
+    cache.clear()
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'ADMISSION_ENABLED': True,
+        'ADMISSION_MAX_IN_FLIGHT': 2,
+        'ADMISSION_RESERVED_CRITICAL': 1,
+        'ADMISSION_QUEUE_TIMEOUT': 0.01,
+        'ADMISSION_RETRY_AFTER': 7,
+        'METRICS_DIR': None,
+        'PROFILE_DIR': str(tmp_path / 'profiles'),
+        'SLOW_QUERY_CAPTURE_PLANS': False,
+    })
+    seed_database(app, generate_images=False)
+    return app
+
+
+def test_shed_requests_get_503_with_retry_after(admission_app):
+    controller = admission_app.extensions['admission']
+    client = admission_app.test_client()
+    headers = auth_headers_for(admission_app, make_user(admission_app, 'alice'))
+
+    holder = Holder(controller)
+    try:
+        holder.hold('normal', 1)
+
+        response = client.get('/api/products/')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '7'
+
+        # Order placement still gets through on the reserved slot
+        response = client.post('/api/orders/', json={"items": [{"product_id": 1}]}, headers=headers)
+        assert response.status_code == 201
+    finally:
+        holder.release_all()
+
+    assert controller.stats()["in_flight"] == 0
+    assert controller.stats()["lanes"]["low"]["shed"] == 1
@@ -0,0 +1,33 @@
+from tests.query_budget import query_budget
+
+
+def test_register_budget(client):
+    with query_budget(4):
+        response = client.post('/api/auth/register', json={
+            "username": "carol", "email": "carol@example.com", "password": "secret"
+        })
+
+    assert response.status_code == 201
+    assert response.get_json()["access_token"]
+
+
+def test_login_budget(client, user_id):
+    with query_budget(1):
+        response = client.post('/api/auth/login', json={"email": "alice@example.com", "password": "password"})
+
+    assert response.status_code == 200
+
+
+def test_profile_budget(client, auth_headers):
+    with query_budget(1):
+        response = client.get('/api/auth/profile', headers=auth_headers)
+
+    assert response.get_json()["user"]["username"] == "alice"
+
+
+def test_update_profile_budget(client, auth_headers):
+    # Includes the lookup of gift card receivers whose data version moves with the sender's name
+    with query_budget(4):
+        response = client.put('/api/auth/profile', json={"first_name": "Alicia"}, headers=auth_headers)
+
+    assert response.get_json()["user"]["first_name"] == "Alicia"
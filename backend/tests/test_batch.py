@@ -0,0 +1,156 @@
+import sqlite3
+
+import pytest
+from flask import jsonify
+
+import cache
+from app import create_app
+from seed_data import seed_database
+from tests.factories import add_orders, auth_headers_for, make_user
+from tests.query_budget import query_budget
+from tests.test_sqlite_profile import write_lock_is_free
+
+LOYALTY_SCREEN = [{"method": "GET", "path": "/api/loyalty/points"}, {"method": "GET", "path": "/api/loyalty/rewards"}]
+
+
+def test_batch_matches_individual_requests(app, client, user_id, auth_headers):
+    add_orders(app, user_id, 3)
+    paths = ['/api/loyalty/points', '/api/loyalty/rewards', '/api/orders/', '/api/products/?category=coffee']
+
+    response = client.post('/api/batch', json={"requests": [{"path": path} for path in paths]}, headers=auth_headers)
+
+    assert response.status_code == 200
+    results = response.get_json()["responses"]
+    assert [result["status"] for result in results] == [200] * len(paths)
+    for path, result in zip(paths, results):
+        assert result["body"] == client.get(path, headers=auth_headers).get_json()
+
+
+def test_batch_shares_the_session(client, auth_headers):
+    # Loading the user once for both sub-requests: the rewards lookup hits the identity map
+    with query_budget(2):
+        response = client.post('/api/batch', json={"requests": LOYALTY_SCREEN}, headers=auth_headers)
+
+    assert [result["status"] for result in response.get_json()["responses"]] == [200, 200]
+
+
+def test_batch_writes_are_visible_to_later_requests(client, auth_headers):
+    response = client.post('/api/batch', json={"requests": [
+        {"method": "POST", "path": "/api/orders/", "body": {"items": [{"product_id": 1, "quantity": 2}]}},
+        {"method": "GET", "path": "/api/orders/"},
+    ]}, headers=auth_headers)
+
+    created, listed = response.get_json()["responses"]
+    assert created["status"] == 201
+    assert [order["id"] for order in listed["body"]["orders"]] == [created["body"]["order"]["id"]]
+
+
+def test_batch_errors_are_per_request(client, auth_headers):
+    response = client.post('/api/batch', json={"requests": [
+        {"path": "/api/products/1"},
+        {"path": "/api/nope"},
+        {"path": "/api/batch"},
+        {"method": "PATCH", "path": "/api/products/1"},
+    ]}, headers=auth_headers)
+
+    assert [result["status"] for result in response.get_json()["responses"]] == [200, 404, 400, 405]
+    assert "error" in response.get_json()["responses"][1]["body"]
+
+
+def test_batch_without_token(client):
+    results = client.post('/api/batch', json={"requests": LOYALTY_SCREEN + [{"path": "/api/products/1"}]}).get_json()
+
+    assert [result["status"] for result in results["responses"]] == [401, 401, 200]
+
+
+def test_batch_limits(app, client):
+    assert client.post('/api/batch', json={"requests": []}).status_code == 400
+
+    too_many = [{"path": "/api/products/1"}] * (app.config['BATCH_MAX_REQUESTS'] + 1)
+    assert client.post('/api/batch', json={"requests": too_many}).status_code == 400
+
+
+@pytest.fixture
+def admission_app(tmp_path):
+    cache.clear()
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'ADMISSION_ENABLED': True,
+        'METRICS_DIR': None,
+        'PROFILE_DIR': str(tmp_path / 'profiles'),
+        'SLOW_QUERY_CAPTURE_PLANS': False,
+    })
+    seed_database(app, generate_images=False)
+    return app
+
+
+def test_batch_holds_one_admission_slot(admission_app):
+    admission = admission_app.extensions['admission']
+    headers = auth_headers_for(admission_app, make_user(admission_app, 'alice'))
+
+    response = admission_app.test_client().post('/api/batch', json={"requests": LOYALTY_SCREEN}, headers=headers)
+
+    assert [result["status"] for result in response.get_json()["responses"]] == [200, 200]
+    assert admission.stats()["in_flight"] == 0
+
+
+def file_app(tmp_path):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'cafe.db'}",
+        'SQLITE_CHECKPOINT_INTERVAL': 0,
+        'ADMISSION_ENABLED': False,
+        'METRICS_DIR': None,
+    })
+
+
+def test_get_only_batch_does_not_hold_the_write_lock(tmp_path):
+    app = file_app(tmp_path)
+    profile = app.extensions['sqlite_profile']
+    # Stands in for a slow read: reports whether another thread could write meanwhile
+    app.add_url_rule('/api/lock-probe', 'lock_probe', lambda: jsonify({"free": write_lock_is_free(profile)}))
+    seed_database(app, generate_images=False)
+    headers = auth_headers_for(app, make_user(app, 'alice'))
+    probe = {"path": "/api/lock-probe"}
+
+    response = app.test_client().post('/api/batch', json={"requests": LOYALTY_SCREEN + [probe]}, headers=headers)
+    assert response.get_json()["responses"][2]["body"] == {"free": True}
+
+    # A write sub-request takes the lock for its own transaction only
+    response = app.test_client().post('/api/batch', json={"requests": [
+        {"method": "POST", "path": "/api/orders/", "body": {"items": [{"product_id": 1}]}},
+        probe,
+    ]}, headers=headers)
+    created, probed = response.get_json()["responses"]
+    assert created["status"] == 201
+    assert probed["body"] == {"free": True}
+    assert write_lock_is_free(profile)
+
+
+def test_batched_writes_see_changes_made_after_the_caller_was_loaded(tmp_path):
+    app = file_app(tmp_path)
+
+    def spend_elsewhere():
+        # Another worker takes 100 points between the batch loading the caller and the redeem
+        conn = sqlite3.connect(tmp_path / 'cafe.db')
+        with conn:
+            conn.execute("UPDATE user SET loyalty_points = loyalty_points - 100 WHERE id = ?", (user_id,))
+        conn.close()
+        return jsonify({})
+
+    app.add_url_rule('/api/spend-elsewhere', 'spend_elsewhere', spend_elsewhere)
+    seed_database(app, generate_images=False)
+    user_id = make_user(app, 'alice', loyalty_points=200)
+    client = app.test_client()
+    headers = auth_headers_for(app, user_id)
+
+    response = client.post('/api/batch', json={"requests": [
+        {"path": "/api/spend-elsewhere"},
+        {"method": "POST", "path": "/api/loyalty/rewards/1/redeem"},
+    ]}, headers=headers)
+
+    assert response.get_json()["responses"][1]["body"]["remaining_points"] == 50
+    assert client.get('/api/loyalty/points', headers=headers).get_json()["loyalty_points"] == 50
@@ -0,0 +1,82 @@
+import multiprocessing
+
+import pytest
+
+import cache
+from app import create_app
+from seed_data import seed_database
+from tests.factories import make_user, auth_headers_for
+from tests.query_budget import query_budget
+
+
+def build_in_child(path, queue):
+    backend = cache.SQLiteBackend(path)
+    queue.put(backend.get(cache.MENU, 'body', backend.get_version(cache.MENU)))
+    backend.bump_version(cache.MENU)
+
+
+def test_sqlite_backend_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    backend = cache.SQLiteBackend(path)
+    backend.set(cache.MENU, 'body', 0, b'menu')
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    child = context.Process(target=build_in_child, args=(path, queue))
+    child.start()
+    child.join()
+
+    # The other process saw the entry, and its version bump invalidated it here
+    assert queue.get() == (True, b'menu')
+    assert backend.get_version(cache.MENU) == 1
+    assert backend.get(cache.MENU, 'body', 1) == (False, None)
+
+
+def test_sqlite_backend_drops_stale_and_excess_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'MAX_ENTRIES_PER_NAMESPACE', 3)
+    backend = cache.SQLiteBackend(str(tmp_path / 'cache.db'))
+    backend.set(cache.TABLES, 'old', 0, b'x')
+    for i in range(5):
+        backend.set(cache.TABLES, ('qr', i), 1, b'png')
+
+    assert backend.sizes()[cache.TABLES]["entries"] == 3
+    assert backend.get(cache.TABLES, ('qr', 4), 1) == (True, b'png')
+    assert backend.get(cache.TABLES, ('qr', 0), 1) == (False, None)
+
+
+@pytest.fixture
+def shared_cache_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'ADMISSION_ENABLED': False,
+        'METRICS_DIR': None,
+        'CACHE_BACKEND': 'sqlite',
+        'CACHE_PATH': str(tmp_path / 'cache' / 'cache.db'),
+    })
+    seed_database(app, generate_images=False)
+    return app
+
+
+def test_menu_served_from_shared_cache(shared_cache_app):
+    client = shared_cache_app.test_client()
+    headers = auth_headers_for(shared_cache_app, make_user(shared_cache_app, 'alice'))
+
+    first = client.get('/api/products/')
+    with query_budget(0):
+        assert client.get('/api/products/').data == first.data
+
+    client.put('/api/products/1', json={"price": 9.99}, headers=headers)
+    prices = {p["id"]: p["price"] for p in client.get('/api/products/').get_json()["products"]}
+    assert prices[1] == 9.99
+
+    stats = client.get('/api/admin/cache', headers=headers).get_json()["cache"]
+    assert stats["backend"] == 'sqlite'
+    assert stats["namespaces"][cache.MENU]["hits"] == 1
+    assert stats["namespaces"][cache.MENU]["misses"] == 2
+    assert stats["namespaces"][cache.MENU]["entries"] == 1
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'cafe_cache_lookups_total{namespace="menu",result="hit"} 1' in metrics
+    assert 'cafe_cache_entries{namespace="menu"} 1' in metrics
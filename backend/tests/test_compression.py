@@ -0,0 +1,79 @@
+import gzip
+
+import pytest
+from flask import Response, stream_with_context
+
+import compression
+
+
+@pytest.fixture
+def text_app(app):
+    @app.route('/_test/text/<int:size>')
+    def text(size):
+        return Response('x' * size, mimetype='text/plain')
+
+    @app.route('/_test/png')
+    def png():
+        return Response(b'\x89PNG' + b'\0' * 4096, mimetype='image/png')
+
+    @app.route('/_test/stream')
+    def stream():
+        return Response(stream_with_context(iter(['y' * 4096])), mimetype='text/plain')
+
+    return app
+
+
+def test_gzip_is_negotiated(text_app):
+    response = text_app.test_client().get('/_test/text/2000', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == b'x' * 2000
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_is_preferred_when_accepted(text_app):
+    response = text_app.test_client().get('/_test/text/2000', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert compression.brotli.decompress(response.data) == b'x' * 2000
+
+
+@pytest.mark.parametrize('accept', [None, 'identity', 'gzip;q=0'])
+def test_identity_when_nothing_else_is_accepted(text_app, accept):
+    headers = {'Accept-Encoding': accept} if accept else {}
+    response = text_app.test_client().get('/_test/text/2000', headers=headers)
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b'x' * 2000
+
+
+def test_small_and_non_text_responses_are_left_alone(text_app):
+    client = text_app.test_client()
+    min_size = text_app.config['COMPRESSION_MIN_SIZE']
+
+    assert 'Content-Encoding' not in client.get(f'/_test/text/{min_size - 1}', headers={'Accept-Encoding': 'gzip'}).headers
+    assert client.get(f'/_test/text/{min_size}', headers={'Accept-Encoding': 'gzip'}).headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in client.get('/_test/png', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_streamed_responses_are_not_buffered(text_app):
+    response = text_app.test_client().get('/_test/stream', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b'y' * 4096
+
+
+def test_menu_is_served_precompressed(client, monkeypatch):
+    identity = client.get('/api/products/').data
+    client.get('/api/products/', headers={'Accept-Encoding': 'gzip'})
+
+    # The cached body already holds every encoding: nothing is compressed per request
+    def fail(*args):
+        raise AssertionError("menu compressed again")
+    monkeypatch.setattr(compression, 'compress', fail)
+    response = client.get('/api/products/', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == identity
@@ -0,0 +1,108 @@
+import pytest
+
+from tests.factories import add_gift_cards, add_orders, auth_headers_for, make_user
+from tests.query_budget import query_budget
+
+PERSONAL = ['/api/auth/profile', '/api/loyalty/points', '/api/loyalty/rewards', '/api/orders/', '/api/gift-cards/']
+
+
+def revalidate(client, path, headers, etag):
+    return client.get(path, headers=dict(headers, **{'If-None-Match': etag}))
+
+
+@pytest.mark.parametrize('path', PERSONAL)
+def test_unchanged_data_is_not_modified(app, client, user_id, auth_headers, path):
+    add_orders(app, user_id, 3)
+    first = client.get(path, headers=auth_headers)
+
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/"')
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Authorization' in first.headers['Vary']
+
+    with query_budget(1):
+        second = revalidate(client, path, auth_headers, first.headers['ETag'])
+
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_placing_an_order_changes_personal_etags(client, auth_headers):
+    etags = {path: client.get(path, headers=auth_headers).headers['ETag'] for path in PERSONAL}
+
+    client.post('/api/orders/', json={"items": [{"product_id": 1, "quantity": 1}]}, headers=auth_headers)
+
+    for path, etag in etags.items():
+        assert revalidate(client, path, auth_headers, etag).status_code == 200
+
+
+def test_order_status_update_changes_customer_etag(app, client, user_id, auth_headers):
+    add_orders(app, user_id, 1)
+    etag = client.get('/api/orders/', headers=auth_headers).headers['ETag']
+
+    client.put('/api/orders/1/status', json={"status": "completed"}, headers=auth_headers)
+
+    response = revalidate(client, '/api/orders/', auth_headers, etag)
+    assert response.status_code == 200
+    assert response.get_json()["orders"][0]["status"] == "completed"
+
+
+def test_gift_cards_change_both_parties_etags(app, client, auth_headers):
+    bob_headers = auth_headers_for(app, make_user(app, 'bob'))
+    etag = client.get('/api/gift-cards/', headers=auth_headers).headers['ETag']
+    bob_etag = client.get('/api/gift-cards/', headers=bob_headers).headers['ETag']
+
+    code = client.post('/api/gift-cards/', json={"amount": 10, "receiver_email": "bob@example.com"},
+                       headers=auth_headers).get_json()["gift_card"]["code"]
+    assert revalidate(client, '/api/gift-cards/', auth_headers, etag).status_code == 200
+    assert revalidate(client, '/api/gift-cards/', bob_headers, bob_etag).status_code == 200
+
+    etag = client.get('/api/gift-cards/', headers=auth_headers).headers['ETag']
+    client.post('/api/gift-cards/redeem', json={"code": code}, headers=bob_headers)
+    sent = revalidate(client, '/api/gift-cards/', auth_headers, etag)
+    assert sent.status_code == 200
+    assert sent.get_json()["sent_gift_cards"][0]["is_redeemed"] is True
+
+
+def test_renaming_a_sender_changes_receivers_etags(app, client, user_id, auth_headers):
+    add_gift_cards(app, user_id, 1)
+    sender_headers = auth_headers_for(app, user_id + 1)
+    etag = client.get('/api/gift-cards/', headers=auth_headers).headers['ETag']
+
+    client.put('/api/auth/profile', json={"first_name": "Renamed"}, headers=sender_headers)
+
+    received = revalidate(client, '/api/gift-cards/', auth_headers, etag).get_json()["received_gift_cards"]
+    assert received[0]["sender_name"].startswith("Renamed")
+
+
+def test_menu_changes_only_affect_order_etags(app, client, user_id, auth_headers):
+    add_orders(app, user_id, 1)
+    orders_etag = client.get('/api/orders/', headers=auth_headers).headers['ETag']
+    profile_etag = client.get('/api/auth/profile', headers=auth_headers).headers['ETag']
+
+    client.put('/api/products/1', json={"name": "Renamed"}, headers=auth_headers)
+
+    assert revalidate(client, '/api/orders/', auth_headers, orders_etag).status_code == 200
+    assert revalidate(client, '/api/auth/profile', auth_headers, profile_etag).status_code == 304
+
+
+def test_etags_are_per_user(app, client, auth_headers):
+    etag = client.get('/api/auth/profile', headers=auth_headers).headers['ETag']
+    bob_headers = auth_headers_for(app, make_user(app, 'bob'))
+
+    response = revalidate(client, '/api/auth/profile', bob_headers, etag)
+
+    assert response.status_code == 200
+    assert response.get_json()["user"]["username"] == "bob"
+
+
+def test_batched_requests_revalidate(client, auth_headers):
+    etag = client.get('/api/loyalty/points', headers=auth_headers).headers['ETag']
+
+    results = client.post('/api/batch', json={"requests": [
+        {"path": "/api/loyalty/points", "headers": {"If-None-Match": etag}},
+    ]}, headers=auth_headers).get_json()["responses"]
+
+    assert results[0]["status"] == 304
+    assert results[0]["headers"]["ETag"] == etag
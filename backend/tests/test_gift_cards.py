@@ -0,0 +1,40 @@
+import pytest
+
+from tests.factories import add_gift_cards
+from tests.query_budget import query_budget
+
+SIZES = [1, 10, 50]
+
+
+def test_create_gift_card_budget(client, auth_headers):
+    with query_budget(4):
+        response = client.post('/api/gift-cards/', json={"amount": 20, "receiver_email": "bob@example.com"},
+                               headers=auth_headers)
+
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize('card_count', SIZES)
+def test_get_user_gift_cards_budget(app, client, user_id, auth_headers, card_count):
+    add_gift_cards(app, user_id, card_count)
+
+    # Caller (ETag version), sent cards, received cards, their senders
+    with query_budget(4):
+        response = client.get('/api/gift-cards/', headers=auth_headers)
+
+    data = response.get_json()
+    assert len(data["sent_gift_cards"]) == card_count
+    assert len(data["received_gift_cards"]) == card_count
+    assert data["received_gift_cards"][0]["sender_email"].startswith("sender")
+
+
+@pytest.mark.parametrize('card_count', SIZES)
+def test_redeem_gift_card_budget(app, client, user_id, auth_headers, card_count):
+    add_gift_cards(app, user_id, card_count)
+    code = client.get('/api/gift-cards/', headers=auth_headers).get_json()["received_gift_cards"][0]["code"]
+
+    # Includes one UPDATE bumping the sender's and receiver's data versions
+    with query_budget(4):
+        response = client.post('/api/gift-cards/redeem', json={"code": code}, headers=auth_headers)
+
+    assert response.status_code == 200
@@ -0,0 +1,17 @@
+import threading
+
+import images
+
+
+def test_concurrent_manifest_updates_keep_every_entry(tmp_path):
+    def add(worker):
+        for index in range(20):
+            images.update_manifest(str(tmp_path), {f"{worker}-{index}.jpg": {160: {"jpeg": f"{worker}-{index}.jpg"}}})
+
+    threads = [threading.Thread(target=add, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(images.load_manifest(str(tmp_path))) == 8 * 20
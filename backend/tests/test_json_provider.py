@@ -0,0 +1,63 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import json_provider
+import serializers
+from tests.factories import add_orders
+
+TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def provider(request, app, monkeypatch):
+    if request.param == 'orjson' and json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+    if request.param == 'json':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    return app.json
+
+
+def test_dates_keep_the_api_format(provider):
+    body = {"at": datetime(2024, 3, 1, 9, 5, 7, 123456), "on": date(2024, 3, 1), "price": Decimal('4.50')}
+
+    assert provider.loads(provider.dumps(body)) == {"at": "2024-03-01 09:05:07", "on": "2024-03-01", "price": "4.50"}
+
+
+def test_response_is_compact_and_sorted(app, provider):
+    with app.app_context():
+        response = provider.response({"b": 1, "a": [1, 2]})
+
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'{"a":[1,2],"b":1}\n'
+
+
+def test_serializer_reads_declared_fields():
+    class Row:
+        id = 1
+        table_number = 4
+
+    assert serializers.serializer('id', 'table_number')(Row()) == {"id": 1, "table_number": 4}
+    assert serializers.serializer('id')(Row()) == {"id": 1}
+
+
+def test_admin_listing_timestamps(app, client, user_id, auth_headers):
+    add_orders(app, user_id, 3)
+
+    orders = client.get('/api/orders/admin/all', headers=auth_headers).get_json()["orders"]
+
+    assert len(orders) == 3
+    assert set(orders[0]) == set(serializers.ORDER_SUMMARY_FIELDS)
+    assert all(TIMESTAMP.match(order["order_date"]) for order in orders)
+
+
+def test_gift_card_dates(client, auth_headers):
+    client.post('/api/gift-cards/', json={"receiver_email": "bob@example.com", "amount": 10}, headers=auth_headers)
+
+    sent = client.get('/api/gift-cards/', headers=auth_headers).get_json()["sent_gift_cards"][0]
+
+    assert TIMESTAMP.match(sent["created_at"])
+    assert re.match(r'^\d{4}-\d{2}-\d{2}$', sent["expiration_date"])
+    assert sent["receiver_email"] == "bob@example.com"
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import cache
+from app import create_app
+from asgi import CafeASGI
+from seed_data import seed_database
+from tests.factories import add_orders
+
+
+@pytest.fixture
+def app(tmp_path):
+    """File-backed: waiters and writers run on separate threads, which one in-memory connection cannot serve"""
+    cache.clear()
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'cafe.db'}",
+        'SQLITE_CHECKPOINT_INTERVAL': 0,
+        'ADMISSION_ENABLED': False,
+        'METRICS_DIR': None,
+    })
+    seed_database(app, generate_images=False)
+    return app
+
+
+def later(delay, action):
+    timer = threading.Timer(delay, action)
+    timer.start()
+    return timer
+
+
+def test_poll_table_orders_returns_at_once_without_version(client, auth_headers, user_id, app):
+    add_orders(app, user_id, 2, table_number=1)
+
+    body = client.get('/api/qr-order/tables/1/orders/poll?wait=5', headers=auth_headers).get_json()
+
+    assert len(body["orders"]) == 2
+    assert body["version"]
+
+
+def test_poll_table_orders_wakes_on_new_order(client, auth_headers, app):
+    version = client.get('/api/qr-order/tables/1/orders/poll', headers=auth_headers).get_json()["version"]
+
+    later(0.2, lambda: app.test_client().post('/api/orders/', json={"items": [{"product_id": 1}], "table_number": 1},
+                                              headers=auth_headers))
+    start = time.monotonic()
+    body = client.get(f'/api/qr-order/tables/1/orders/poll?since={version}&wait=10', headers=auth_headers).get_json()
+
+    assert time.monotonic() - start < 5
+    assert len(body["orders"]) == 1
+    assert body["version"] != version
+
+
+def test_poll_order_times_out_unchanged(client, auth_headers, user_id, app):
+    add_orders(app, user_id, 1)
+
+    start = time.monotonic()
+    body = client.get('/api/orders/1/poll?since=pending&wait=0.3', headers=auth_headers).get_json()
+
+    assert time.monotonic() - start >= 0.3
+    assert body == {"order": {"id": 1, "status": "pending"}, "version": "pending"}
+    assert client.get('/api/orders/99/poll', headers=auth_headers).status_code == 404
+
+
+def test_polls_beyond_the_cap_answer_at_once(app, auth_headers, user_id):
+    add_orders(app, user_id, 1)
+    live = app.extensions['live_updates']
+    live.max_held = 2
+    path = '/api/orders/1/poll?since=pending&wait=10'
+
+    held = [threading.Thread(target=app.test_client().get, args=(path,), kwargs={"headers": auth_headers})
+            for _ in range(2)]
+    for thread in held:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while live.stats()["holding"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    start = time.monotonic()
+    body = app.test_client().get(path, headers=auth_headers).get_json()
+    assert time.monotonic() - start < 1
+    assert body["version"] == 'pending'
+
+    app.test_client().put('/api/orders/1/status', json={"status": "processing"}, headers=auth_headers)
+    for thread in held:
+        thread.join(5)
+    stats = app.test_client().get('/api/admin/live', headers=auth_headers).get_json()["live"]
+    assert stats["held"] == 2
+    assert stats["answered_at_once"] == 1
+    assert stats["holding"] == 0
+
+
+async def call(asgi_app, path, headers=()):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path.split('?')[0],
+             'query_string': path.partition('?')[2].encode(), 'headers': list(headers)}
+    await asgi_app(scope, receive, send)
+    return messages[0]['status'], messages[1]['body']
+
+
+def test_asgi_holds_many_polls_in_one_thread(app, auth_headers, user_id):
+    add_orders(app, user_id, 1)
+    asgi_app = CafeASGI(app)
+    headers = [(b'authorization', auth_headers['Authorization'].encode())]
+
+    async def scenario():
+        polls = [asyncio.ensure_future(call(asgi_app, '/api/orders/1/poll?since=pending&wait=10', headers))
+                 for _ in range(200)]
+        await asyncio.sleep(0.3)
+        assert not any(poll.done() for poll in polls)
+
+        # One status change, made through the Flask app on another thread, releases every waiter
+        await asyncio.to_thread(app.test_client().put, '/api/orders/1/status', json={"status": "processing"},
+                                headers=auth_headers)
+        return await asyncio.wait_for(asyncio.gather(*polls), 5)
+
+    results = asyncio.run(scenario())
+
+    assert {status for status, _ in results} == {200}
+    assert all(b'"processing"' in body for _, body in results)
+
+
+def test_asgi_poll_requires_token(app):
+    status, _ = asyncio.run(call(CafeASGI(app), '/api/qr-order/tables/1/orders/poll'))
+
+    assert status == 401
+
+
+def test_asgi_without_adapter_only_serves_native_routes(app):
+    with pytest.raises(RuntimeError, match='asgiref'):
+        asyncio.run(call(CafeASGI(app), '/api/products/'))
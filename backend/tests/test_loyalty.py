@@ -0,0 +1,39 @@
+import pytest
+
+from tests.factories import add_orders
+from tests.query_budget import query_budget
+
+SIZES = [1, 10, 50]
+
+
+@pytest.mark.parametrize('order_count', SIZES)
+def test_get_loyalty_points_budget(app, client, user_id, auth_headers, order_count):
+    add_orders(app, user_id, order_count)
+
+    with query_budget(2):
+        response = client.get('/api/loyalty/points', headers=auth_headers)
+
+    data = response.get_json()
+    assert data["loyalty_points"] == 200
+    assert len(data["point_history"]) == min(order_count, 10)
+
+
+def test_get_available_rewards_budget(client, auth_headers):
+    with query_budget(1):
+        response = client.get('/api/loyalty/rewards', headers=auth_headers)
+
+    assert all(reward["is_available"] for reward in response.get_json()["available_rewards"])
+
+
+def test_redeem_reward_budget(client, auth_headers):
+    with query_budget(4):
+        response = client.post('/api/loyalty/rewards/1/redeem', headers=auth_headers)
+
+    assert response.get_json()["remaining_points"] == 150
+
+
+def test_cors_test_budget(client):
+    with query_budget(0):
+        response = client.get('/api/loyalty/cors-test')
+
+    assert response.status_code == 200
@@ -0,0 +1,102 @@
+from sqlalchemy import text
+
+import menu_changes
+import serializers
+from models import db, Product
+from seed_data import seed_database
+from tests.query_budget import query_budget
+
+
+def changes(client, since=None):
+    path = '/api/products/changes' if since is None else f'/api/products/changes?since={since}'
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_first_sync_returns_the_whole_menu(app, client):
+    body = changes(client)
+
+    with app.app_context():
+        product_count = Product.query.count()
+    assert body["reset"] is True
+    assert body["revision"] > 0
+    assert len(body["products"]) == product_count
+    assert set(body["products"][0]) == set(serializers.PRODUCT_CHANGE_FIELDS)
+    assert {c["product_id"] for c in body["customizations"]} <= {p["id"] for p in body["products"]}
+
+
+def test_sync_returns_only_changed_rows(client, auth_headers):
+    revision = changes(client)["revision"]
+    client.put('/api/products/1', json={"price": 9.99}, headers=auth_headers)
+
+    with query_budget(3):
+        body = changes(client, revision)
+
+    assert body["reset"] is False
+    assert body["revision"] == revision + 1
+    assert [(p["id"], p["price"], p["revision"]) for p in body["products"]] == [(1, 9.99, revision + 1)]
+    assert body["customizations"] == []
+    assert changes(client, body["revision"]) == dict(body, products=[], customizations=[])
+
+
+def test_deleted_products_leave_tombstones(client, auth_headers):
+    revision = changes(client)["revision"]
+    client.delete('/api/products/2', headers=auth_headers)
+
+    body = changes(client, revision)
+
+    assert [(p["id"], p["is_deleted"], p["is_available"]) for p in body["products"]] == [(2, True, False)]
+    assert 2 not in {p["id"] for p in changes(client)["products"]}
+
+
+def test_restored_products_come_back(client, auth_headers):
+    revision = changes(client)["revision"]
+    client.delete('/api/products/2', headers=auth_headers)
+    deleted = changes(client, revision)["revision"]
+
+    response = client.put('/api/products/2', json={"is_available": True}, headers=auth_headers)
+    assert response.status_code == 200
+
+    body = changes(client, deleted)
+    assert [(p["id"], p["is_deleted"], p["is_available"]) for p in body["products"]] == [(2, False, True)]
+    assert 2 in {p["id"] for p in changes(client)["products"]}
+    assert 2 in {p["id"] for p in client.get('/api/products/').get_json()["products"]}
+
+
+def test_new_product_and_customizations_share_a_revision(client, auth_headers):
+    revision = changes(client)["revision"]
+    product_id = client.post('/api/products/', json={
+        "name": "Flat White", "price": 3.5, "category": "coffee",
+        "customizations": [{"name": "Size", "options": ["S", "L"], "price_impact": {"S": 0, "L": 0.5}}]
+    }, headers=auth_headers).get_json()["product"]["id"]
+
+    body = changes(client, revision)
+
+    assert [p["id"] for p in body["products"]] == [product_id]
+    assert [(c["product_id"], c["name"]) for c in body["customizations"]] == [(product_id, "Size")]
+    assert {row["revision"] for row in body["products"] + body["customizations"]} == {revision + 1}
+
+
+def test_sync_reads_the_revision_index(app):
+    with app.app_context():
+        query = serializers.select_fields(Product, serializers.PRODUCT_CHANGE_FIELDS).where(Product.revision > 5)
+        sql = str(query.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = ' '.join(row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+    assert 'ix_product_revision' in plan
+
+
+def test_reseeding_resets_kiosks(app, client):
+    revision = changes(client)["revision"]
+
+    seed_database(app, generate_images=False)
+
+    assert changes(client, revision)["reset"] is True
+    with app.app_context():
+        assert menu_changes.current(db.session)[1] > revision
+
+
+def test_unknown_revisions_resync(client):
+    assert changes(client, 10 ** 6)["reset"] is True
+    assert client.get('/api/products/changes?since=latest').status_code == 400
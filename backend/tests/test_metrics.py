@@ -0,0 +1,90 @@
+import json
+
+import metrics
+from metrics import Metrics
+
+
+def samples(client, name):
+    """Metric lines of the /metrics output starting with `name`, as {line without value: value}"""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    values = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line.startswith(name):
+            key, _, value = line.rpartition(' ')
+            values[key] = float(value)
+    return values
+
+
+def test_prometheus_output(client):
+    client.get('/api/products/')
+    client.get('/api/products/')
+    client.get('/api/products/999')
+
+    requests = samples(client, 'cafe_requests_total')
+    assert requests['cafe_requests_total{endpoint="products.get_products",status="200"}'] == 2
+    assert requests['cafe_requests_total{endpoint="products.get_product",status="404"}'] == 1
+    assert not any('endpoint="metrics"' in key for key in requests)
+
+    # Buckets are cumulative and the +Inf bucket equals the count
+    latency = samples(client, 'cafe_request_duration_seconds')
+    buckets = [value for key, value in latency.items()
+               if key.startswith('cafe_request_duration_seconds_bucket{endpoint="products.get_products"')]
+    assert buckets == sorted(buckets)
+    assert len(buckets) == len(metrics.LATENCY_BUCKETS) + 1
+    assert buckets[-1] == latency['cafe_request_duration_seconds_count{endpoint="products.get_products"}'] == 2
+
+    queries = samples(client, 'cafe_db_queries_per_request_sum')
+    assert queries['cafe_db_queries_per_request_sum{endpoint="products.get_products"}'] >= 1
+
+
+def snapshot_of(*observations):
+    worker = Metrics()
+    for observation in observations:
+        worker.observe(*observation)
+    return worker.snapshot()
+
+
+def test_merges_snapshots_from_every_worker(app, client, tmp_path):
+    # Two other workers' last snapshots, next to a file that is not one
+    for name, observations in (
+        ('metrics-101-1.json', [('products.get_products', 200, 0.02, 3, 0.001)]),
+        ('metrics-102-1.json', [('products.get_products', 200, 0.3, 3, 0.002),
+                                ('orders.create_order', 201, 0.04, 9, 0.003)]),
+    ):
+        (tmp_path / name).write_text(json.dumps(snapshot_of(*observations)))
+    (tmp_path / 'metrics-notes.txt').write_text('not a snapshot')
+    app.extensions['metrics'].metrics_dir = str(tmp_path)
+
+    client.get('/api/products/')
+
+    requests = samples(client, 'cafe_requests_total')
+    assert requests['cafe_requests_total{endpoint="products.get_products",status="200"}'] == 3
+    assert requests['cafe_requests_total{endpoint="orders.create_order",status="201"}'] == 1
+    queries = samples(client, 'cafe_db_queries_per_request_sum')
+    assert queries['cafe_db_queries_per_request_sum{endpoint="orders.create_order"}'] == 9
+    latency = samples(client, 'cafe_request_duration_seconds_bucket{endpoint="products.get_products",le="0.25"}')
+    assert list(latency.values()) == [2]
+
+
+def test_flush_writes_a_snapshot_the_next_scrape_reads(app, client, tmp_path):
+    app.extensions['metrics'].metrics_dir = str(tmp_path)
+    worker = Metrics()
+    worker.metrics_dir = str(tmp_path)
+    worker.observe('orders.get_order', 200, 0.01, 2, 0.001)
+    worker.flush()
+
+    assert samples(client, 'cafe_requests_total') == {
+        'cafe_requests_total{endpoint="orders.get_order",status="200"}': 1
+    }
+
+
+def test_clear_snapshots_leaves_other_files(tmp_path):
+    for name in ('metrics-101-1.json', '.tmp-metrics-abc123', 'metrics-notes.txt', 'alerts.yml'):
+        (tmp_path / name).write_text('{}')
+
+    metrics.clear_snapshots(str(tmp_path))
+    metrics.clear_snapshots(str(tmp_path / 'missing'))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['alerts.yml', 'metrics-notes.txt']
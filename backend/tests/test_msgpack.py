@@ -0,0 +1,97 @@
+import asyncio
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip('msgpack')
+
+import msgpack_codec
+from asgi import CafeASGI
+from tests.factories import add_orders
+from tests.test_live_updates import call
+
+MSGPACK = {'Accept': 'application/msgpack'}
+
+
+def json_values(value):
+    """A decoded msgpack body with its timestamps written the way the JSON API writes them"""
+    if isinstance(value, dict):
+        return {key: json_values(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [json_values(item) for item in value]
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None).isoformat(sep=' ')
+    return value
+
+
+def test_timestamps_are_compact_and_whole_seconds():
+    body = {"at": datetime(2024, 3, 1, 9, 5, 7, 123456), "on": date(2024, 3, 1), "price": Decimal('4.50')}
+
+    data = msgpack_codec.packb(body)
+
+    assert msgpack_codec.unpackb(data) == {
+        "at": datetime(2024, 3, 1, 9, 5, 7, tzinfo=timezone.utc),
+        "on": datetime(2024, 3, 1, tzinfo=timezone.utc),
+        "price": "4.50",
+    }
+    assert len(msgpack_codec.packb(body["at"])) == 6
+
+
+@pytest.mark.parametrize('accept, mimetype', [
+    ('application/msgpack', 'application/msgpack'),
+    ('application/msgpack, application/json;q=0.5', 'application/msgpack'),
+    ('application/json, application/msgpack', 'application/json'),
+    ('*/*', 'application/json'),
+])
+def test_negotiation(client, accept, mimetype):
+    response = client.get('/api/products/1', headers={'Accept': accept})
+
+    assert response.mimetype == mimetype
+    assert 'Accept' in response.headers['Vary']
+
+
+@pytest.mark.parametrize('path', [
+    '/api/products/',
+    '/api/products/?category=coffee',
+    '/api/orders/admin/all',
+    '/api/qr-order/tables/2/orders',
+    '/api/orders/',
+    '/api/loyalty/points',
+    '/api/qr-order/tables/99/orders',
+])
+def test_same_payloads_as_json(app, client, user_id, auth_headers, path):
+    add_orders(app, user_id, 5, table_number=2)
+
+    packed = client.get(path, headers=dict(auth_headers, **MSGPACK))
+    plain = client.get(path, headers=auth_headers)
+
+    assert packed.mimetype == 'application/msgpack'
+    assert packed.status_code == plain.status_code
+    assert json_values(msgpack_codec.unpackb(packed.data)) == plain.get_json()
+
+
+def test_menu_is_cached_per_format(client):
+    client.get('/api/products/', headers=MSGPACK)
+
+    assert client.get('/api/products/').mimetype == 'application/json'
+    assert client.get('/api/products/', headers=MSGPACK).mimetype == 'application/msgpack'
+
+
+def test_asgi_polls_negotiate(app, auth_headers, user_id):
+    add_orders(app, user_id, 1)
+    headers = [(b'authorization', auth_headers['Authorization'].encode()), (b'accept', b'application/msgpack')]
+
+    status, body = asyncio.run(call(CafeASGI(app), '/api/orders/1/poll', headers))
+
+    assert status == 200
+    assert msgpack_codec.unpackb(body) == {"order": {"id": 1, "status": "pending"}, "version": "pending"}
+
+
+def test_json_only_without_msgpack(client, monkeypatch):
+    monkeypatch.setattr(msgpack_codec, 'msgpack', None)
+
+    response = client.get('/api/products/1', headers=MSGPACK)
+
+    assert response.mimetype == 'application/json'
+    assert 'Vary' not in response.headers
@@ -0,0 +1,85 @@
+import pytest
+
+from tests.factories import add_orders, make_user
+from tests.query_budget import orm_loads, query_budget
+
+SIZES = [1, 10, 50]
+
+
+@pytest.mark.parametrize('item_count', SIZES)
+def test_create_order_budget(client, auth_headers, item_count):
+    items = [{"product_id": i % 10 + 1, "quantity": 2} for i in range(item_count)]
+
+    # Includes three statements counting the order's product pairs (recommendations.py)
+    with query_budget(9):
+        response = client.post('/api/orders/', json={"items": items, "use_points": True}, headers=auth_headers)
+
+    assert response.status_code == 201
+    order = response.get_json()["order"]
+    assert order["points_used"] > 0
+    items = client.get(f'/api/orders/{order["id"]}', headers=auth_headers).get_json()["order"]["items"]
+    assert len(items) == item_count
+
+
+def test_create_order_rejects_unknown_product(client, auth_headers):
+    with query_budget(1):
+        response = client.post('/api/orders/', json={"items": [{"product_id": 999}]}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('order_count', SIZES)
+def test_get_user_orders_budget(app, client, user_id, auth_headers, order_count):
+    add_orders(app, user_id, order_count)
+
+    # Caller (ETag version), orders, items with products
+    with query_budget(3):
+        response = client.get('/api/orders/', headers=auth_headers)
+
+    orders = response.get_json()["orders"]
+    assert len(orders) == order_count
+    assert all(item["product_name"] != "Unknown" for order in orders for item in order["items"])
+
+
+@pytest.mark.parametrize('order_count', SIZES)
+def test_get_order_budget(app, client, user_id, auth_headers, order_count):
+    add_orders(app, user_id, order_count)
+
+    with query_budget(3):
+        response = client.get(f'/api/orders/{order_count}', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()["order"]["items"]
+
+
+def test_get_order_of_other_user_is_not_found(app, client, user_id, auth_headers):
+    other_id = make_user(app, 'bob')
+    add_orders(app, other_id, 1)
+
+    with query_budget(2):
+        response = client.get('/api/orders/1', headers=auth_headers)
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('order_count', SIZES)
+def test_get_all_orders_budget(app, client, user_id, auth_headers, order_count):
+    add_orders(app, user_id, order_count)
+    add_orders(app, make_user(app, 'bob'), order_count)
+
+    with query_budget(1), orm_loads() as loads:
+        response = client.get('/api/orders/admin/all?status=pending', headers=auth_headers)
+
+    assert len(response.get_json()["orders"]) == 2 * order_count
+    assert loads.loaded == []
+
+
+@pytest.mark.parametrize('order_count', SIZES)
+def test_update_order_status_budget(app, client, user_id, auth_headers, order_count):
+    add_orders(app, user_id, order_count)
+
+    # Includes one UPDATE bumping the customer's data version
+    with query_budget(4):
+        response = client.put(f'/api/orders/{order_count}/status', json={"status": "completed"}, headers=auth_headers)
+
+    assert response.get_json()["order"] == {"id": order_count, "status": "completed"}
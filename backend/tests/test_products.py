@@ -0,0 +1,101 @@
+from io import BytesIO
+
+import pytest
+
+import image_uploads
+from tests.query_budget import query_budget
+
+
+def test_get_products_budget(client):
+    with query_budget(1):
+        response = client.get('/api/products/?category=coffee')
+
+    assert response.status_code == 200
+    assert {p["category"] for p in response.get_json()["products"]} == {"coffee"}
+
+    # Served from the menu cache until the menu changes
+    with query_budget(0):
+        client.get('/api/products/?category=coffee')
+
+
+@pytest.mark.parametrize('product_id', [1, 5, 10])
+def test_get_product_budget(client, product_id):
+    with query_budget(2):
+        response = client.get(f'/api/products/{product_id}')
+
+    assert response.get_json()["product"]["id"] == product_id
+
+
+@pytest.mark.parametrize('customization_count', [0, 5, 20])
+def test_create_product_budget(client, auth_headers, customization_count):
+    customizations = [
+        {"name": f"Option {i}", "options": ["A", "B"], "price_impact": {"A": 0, "B": 0.5}}
+        for i in range(customization_count)
+    ]
+
+    # Includes two statements taking the next menu revision (menu_changes.py)
+    with query_budget(5):
+        response = client.post('/api/products/', json={
+            "name": "Flat White", "price": 3.5, "category": "coffee", "customizations": customizations
+        }, headers=auth_headers)
+
+    assert response.status_code == 201
+
+
+def test_update_product_invalidates_menu(client, auth_headers):
+    client.get('/api/products/')
+
+    with query_budget(5):
+        response = client.put('/api/products/1', json={"price": 9.99}, headers=auth_headers)
+
+    assert response.status_code == 200
+    prices = {p["id"]: p["price"] for p in client.get('/api/products/').get_json()["products"]}
+    assert prices[1] == 9.99
+
+
+def test_delete_product_budget(client, auth_headers):
+    with query_budget(4):
+        response = client.delete('/api/products/1', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert 1 not in {p["id"] for p in client.get('/api/products/').get_json()["products"]}
+
+
+def test_upload_product_image_rejects_non_image(client, auth_headers):
+    with query_budget(1):
+        response = client.post('/api/products/1/image', data=b'not an image', headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_upload_product_image(app, client, auth_headers, tmp_path):
+    from PIL import Image
+
+    app.static_folder = str(tmp_path / 'static')
+    (tmp_path / 'static' / 'images').mkdir(parents=True)
+    photo = BytesIO()
+    Image.new('RGB', (400, 300), 'brown').save(photo, 'JPEG')
+
+    response = client.post('/api/products/1/image', data=photo.getvalue(), headers=auth_headers)
+    assert response.status_code == 202
+    job = response.get_json()["job"]
+    assert job["status"] == 'queued'
+
+    # The worker runs one job at a time: this returns once the upload above is processed
+    image_uploads._executor.submit(lambda: None).result(10)
+
+    with query_budget(1):
+        job = client.get(f'/api/products/image-jobs/{job["id"]}', headers=auth_headers).get_json()["job"]
+    assert job["status"] == 'completed'
+    assert client.get('/api/products/1').get_json()["product"]["image_url"] == job["image_url"]
+
+    filename = job["image_url"].rsplit('/', 1)[1]
+    assert client.get(f'{job["image_url"]}?w=160').status_code == 200
+    assert filename in image_uploads.images.load_manifest(str(tmp_path / 'static' / 'images'))
+
+
+def test_get_image_job_budget(client, auth_headers):
+    with query_budget(1):
+        response = client.get('/api/products/image-jobs/missing', headers=auth_headers)
+
+    assert response.status_code == 404
@@ -0,0 +1,63 @@
+import pytest
+
+from tests.factories import add_orders
+from tests.query_budget import orm_loads, query_budget
+
+SIZES = [1, 10, 50]
+
+
+@pytest.mark.parametrize('table_count', SIZES)
+def test_get_tables_budget(client, auth_headers, table_count):
+    for number in range(100, 100 + table_count):
+        client.post('/api/qr-order/tables', json={"table_number": number}, headers=auth_headers)
+
+    with query_budget(1), orm_loads() as loads:
+        response = client.get('/api/qr-order/tables', headers=auth_headers)
+
+    assert len(response.get_json()["tables"]) == 4 + table_count
+    assert loads.loaded == []
+
+
+def test_create_table_budget(client, auth_headers):
+    with query_budget(5):
+        response = client.post('/api/qr-order/tables', json={"table_number": 5}, headers=auth_headers)
+
+    assert response.status_code == 201
+
+
+def test_get_table_qr_budget(client):
+    with query_budget(1):
+        response = client.get('/api/qr-order/tables/1/qr')
+
+    assert response.mimetype == 'image/png'
+
+
+def test_update_table_status_budget(client, auth_headers):
+    with query_budget(3):
+        response = client.put('/api/qr-order/tables/1/status', json={"is_occupied": True}, headers=auth_headers)
+
+    assert response.get_json()["table"]["is_occupied"] is True
+
+
+@pytest.mark.parametrize('order_count', SIZES)
+def test_get_table_orders_budget(app, client, user_id, auth_headers, order_count):
+    add_orders(app, user_id, order_count, table_number=2)
+
+    with query_budget(2), orm_loads() as loads:
+        response = client.get('/api/qr-order/tables/2/orders', headers=auth_headers)
+
+    assert len(response.get_json()["orders"]) == order_count
+    assert loads.loaded == []
+
+
+def test_get_table_orders_unknown_table(client, auth_headers):
+    assert client.get('/api/qr-order/tables/99/orders', headers=auth_headers).status_code == 404
+
+
+def test_validate_table_budget(client):
+    with query_budget(1):
+        assert client.get('/api/qr-order/validate/3').status_code == 200
+
+    # Table numbers are cached until a table is created
+    with query_budget(0):
+        assert client.get('/api/qr-order/validate/9').status_code == 404
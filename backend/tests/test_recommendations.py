@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+import recommendations
+from models import db, ProductPair, ProductRecommendation
+from tests.factories import add_orders
+from tests.query_budget import query_budget
+
+BUILDS = [False, pytest.param(True, marks=pytest.mark.skipif(recommendations.np is None, reason="numpy not installed"))]
+
+
+def order(client, auth_headers, *product_ids):
+    response = client.post('/api/orders/', json={"items": [{"product_id": pid} for pid in product_ids]},
+                           headers=auth_headers)
+    assert response.status_code == 201
+
+
+def recommended(client, product_id, **params):
+    response = client.get(f'/api/products/{product_id}/recommendations', query_string=params)
+    assert response.status_code == 200
+    return [product["id"] for product in response.get_json()["products"]]
+
+
+def tables(app):
+    with app.app_context():
+        pairs = db.session.query(ProductPair.product_id, ProductPair.other_id, ProductPair.orders).order_by(
+            ProductPair.product_id, ProductPair.other_id).all()
+        top = db.session.query(ProductRecommendation.product_id, ProductRecommendation.position,
+                               ProductRecommendation.recommended_id, ProductRecommendation.orders).order_by(
+            ProductRecommendation.product_id, ProductRecommendation.position).all()
+        return pairs, top
+
+
+def rebuild(app, use_numpy):
+    with app.app_context():
+        stats = recommendations.rebuild(db.session, app.config['RECOMMENDATIONS_TOP_K'], use_numpy=use_numpy)
+        db.session.commit()
+        return stats
+
+
+def test_orders_update_recommendations(client, auth_headers):
+    order(client, auth_headers, 1, 4)
+    order(client, auth_headers, 1, 4, 6)
+    order(client, auth_headers, 1, 6, 6)
+    order(client, auth_headers, 1, 8)
+    order(client, auth_headers, 2)
+
+    with query_budget(1):
+        assert recommended(client, 1) == [4, 6, 8]
+
+    assert recommended(client, 6) == [1, 4]
+    assert recommended(client, 1, limit=2) == [4, 6]
+    assert recommended(client, 2) == []
+
+
+def test_unavailable_products_are_not_recommended(client, auth_headers):
+    order(client, auth_headers, 1, 4, 6)
+    client.put('/api/products/4', json={"is_available": False}, headers=auth_headers)
+
+    assert recommended(client, 1) == [6]
+
+
+@pytest.mark.parametrize('use_numpy', BUILDS)
+def test_incremental_updates_match_a_rebuild(app, client, user_id, auth_headers, use_numpy):
+    # History written without create_order, then picked up by a rebuild
+    add_orders(app, user_id, 30)
+    stats = rebuild(app, use_numpy)
+    assert stats["pairs"] > 0
+
+    rng = random.Random(7)
+    for _ in range(20):
+        order(client, auth_headers, *rng.sample(range(1, 11), rng.randint(1, 4)))
+    incremental = tables(app)
+
+    rebuild(app, use_numpy)
+
+    assert tables(app) == incremental
+
+
+def test_rankings_are_rewritten_in_place(app, client, auth_headers):
+    order(client, auth_headers, 1, 4, 6, 8)
+    order(client, auth_headers, 1, 8)
+    assert recommended(client, 1) == [8, 4, 6]
+
+    # A lower top-k drops the positions past it the next time the product is ordered
+    app.config['RECOMMENDATIONS_TOP_K'] = 2
+    order(client, auth_headers, 1, 6)
+    _, top = tables(app)
+
+    assert [row for row in top if row[0] == 1] == [(1, 1, 6, 2), (1, 2, 8, 2)]
+    assert [row for row in top if row[0] == 4] == [(4, 1, 1, 1), (4, 2, 6, 1), (4, 3, 8, 1)]
+
+
+@pytest.mark.skipif(recommendations.np is None, reason="numpy not installed")
+def test_numpy_and_python_rebuilds_agree(app, user_id):
+    add_orders(app, user_id, 200, seed=3)
+    app.config['RECOMMENDATIONS_TOP_K'] = 3
+
+    assert rebuild(app, use_numpy=True) == rebuild(app, use_numpy=False)
+    python = tables(app)
+    rebuild(app, use_numpy=True)
+
+    assert tables(app) == python
+    assert max(position for _, position, _, _ in python[1]) == 3
+
+
+def test_admin_rebuild(app, client, user_id, auth_headers):
+    add_orders(app, user_id, 10)
+
+    response = client.post('/api/admin/recommendations/rebuild', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()["recommendations"]["recommendations"] > 0
+    assert recommended(client, 1) or recommended(client, 2)
@@ -0,0 +1,153 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import replicas
+from app import create_app
+from replicas import PIN_HEADER
+from seed_data import seed_database
+from tests.factories import make_user, auth_headers_for, add_orders
+
+
+def make_app(tmp_path):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'REPLICA_DATABASE_URI': f"sqlite:///{tmp_path / 'replica.db'}",
+        'REPLICA_SYNC_INTERVAL': 0,
+        'SQLITE_CHECKPOINT_INTERVAL': 0,
+        'ADMISSION_ENABLED': False,
+        'METRICS_DIR': None,
+    })
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    seed_database(app, generate_images=False)
+    return app
+
+
+@pytest.fixture
+def replica(app):
+    return app.extensions['read_replica']
+
+
+def order_count(client, headers):
+    return len(client.get('/api/orders/', headers=headers).get_json()["orders"])
+
+
+def test_marked_reads_go_to_the_replica(app, replica):
+    user_id = make_user(app, 'alice')
+    headers = auth_headers_for(app, user_id)
+    replica.sync()
+
+    # Written straight to the primary, so nothing pins this client
+    add_orders(app, user_id, 3)
+    client = app.test_client()
+    assert order_count(client, headers) == 0
+
+    replica.sync()
+    assert order_count(client, headers) == 3
+    assert replica.stats()["routed"]["replica"] == 2
+
+
+def test_unmarked_views_and_writes_use_the_primary(app, replica):
+    headers = auth_headers_for(app, make_user(app, 'alice'))
+    replica.sync()
+    client = app.test_client()
+
+    assert client.get('/api/auth/profile', headers=headers).status_code == 200
+    assert client.post('/api/orders/', json={"items": [{"product_id": 1}]}, headers=headers).status_code == 201
+    assert replica.stats()["routed"] == {"replica": 0, "primary": 2, "pinned": 0}
+
+
+def test_read_your_writes(app, replica):
+    headers = auth_headers_for(app, make_user(app, 'alice'))
+    replica.sync()
+    client = app.test_client()
+
+    response = client.post('/api/orders/', json={"items": [{"product_id": 1}]}, headers=headers)
+    assert 'primary_until=' in response.headers['Set-Cookie']
+    assert order_count(client, headers) == 1
+
+    # Another client with the same token (no cookie) is pinned by identity in this worker
+    assert order_count(app.test_client(), headers) == 1
+    assert replica.stats()["routed"]["pinned"] == 2
+
+
+def test_read_your_writes_on_another_worker(app, replica, tmp_path):
+    headers = auth_headers_for(app, make_user(app, 'alice'))
+    replica.sync()
+
+    response = app.test_client().post('/api/orders/', json={"items": [{"product_id": 1}]},
+                                      headers=dict(headers, Origin='http://localhost:3000'))
+    pin = response.headers[PIN_HEADER]
+    assert response.headers['Access-Control-Expose-Headers'] == PIN_HEADER
+
+    # A second app on the same databases stands in for another worker: it has never seen
+    # this identity, and a cross-origin client does not send the cookie, only the echoed header
+    other = make_app(tmp_path)
+    other_replica = other.extensions['read_replica']
+    assert order_count(other.test_client(), headers) == 0
+    assert order_count(other.test_client(), dict(headers, **{PIN_HEADER: pin})) == 1
+    assert other_replica.stats()["routed"] == {"replica": 1, "primary": 0, "pinned": 1}
+
+
+def test_implausible_pins_are_ignored(app, replica):
+    headers = auth_headers_for(app, make_user(app, 'alice'))
+    replica.sync()
+    client = app.test_client()
+
+    for value in ('9999999999', 'soon', '0'):
+        client.get('/api/orders/', headers=dict(headers, **{PIN_HEADER: value}))
+
+    assert replica.stats()["routed"] == {"replica": 3, "primary": 0, "pinned": 0}
+
+
+def test_batch_routes_each_sub_request(app, replica):
+    user_id = make_user(app, 'alice')
+    headers = auth_headers_for(app, user_id)
+    replica.sync()
+    add_orders(app, user_id, 1)
+    client = app.test_client()
+
+    # A GET-only batch reads from the replica and does not pin the caller
+    response = client.post('/api/batch', json={"requests": [{"path": "/api/orders/"}]}, headers=headers)
+    assert response.get_json()["responses"][0]["body"]["orders"] == []
+    assert PIN_HEADER not in response.headers
+
+    # After a write sub-request, later ones and the next requests see it on the primary
+    response = client.post('/api/batch', json={"requests": [
+        {"method": "POST", "path": "/api/orders/", "body": {"items": [{"product_id": 1}]}},
+        {"path": "/api/orders/"},
+    ]}, headers=headers)
+    created, listed = response.get_json()["responses"]
+    assert created["status"] == 201
+    assert len(listed["body"]["orders"]) == 2
+    assert PIN_HEADER in response.headers
+    # The primary reads are each batch's caller lookup and the order placement
+    assert replica.stats()["routed"] == {"replica": 1, "primary": 3, "pinned": 1}
+
+
+def test_replica_is_read_only(app, replica):
+    replica.sync()
+
+    with pytest.raises(OperationalError, match='readonly'):
+        with replica.engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM product")
+
+
+def test_sync_without_fcntl(app, replica, monkeypatch):
+    # Windows has no fcntl: syncs still run, spaced out by the stamp alone
+    monkeypatch.setattr(replicas, 'fcntl', None)
+
+    assert replica.sync() is True
+    assert replica.stats()["syncs"]["runs"] == 1
+
+
+def test_reads_stay_on_the_primary_until_first_sync(app, replica):
+    headers = auth_headers_for(app, make_user(app, 'alice'))
+
+    assert order_count(app.test_client(), headers) == 0
+    assert replica.stats()["routed"] == {"replica": 0, "primary": 1, "pinned": 0}
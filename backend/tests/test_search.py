@@ -0,0 +1,75 @@
+import pytest
+
+import search
+from models import db, Product
+from seed_data import seed_database
+from tests.query_budget import query_budget
+
+
+def names(client, q, **params):
+    response = client.get('/api/products/search', query_string=dict(params, q=q))
+    assert response.status_code == 200
+    return [product["name"] for product in response.get_json()["products"]]
+
+
+def test_prefix_matches_ranked_by_name(client):
+    with query_budget(1):
+        response = client.get('/api/products/search?q=lat')
+
+    body = response.get_json()
+    assert body["fuzzy"] is False
+    assert [p["name"] for p in body["products"]] == ["Latte", "Chai Latte"]
+    # Same fields as the menu
+    assert set(body["products"][0]) == {"id", "name", "description", "price", "category", "image_url", "points_value"}
+
+
+def test_every_word_must_match(client):
+    assert names(client, 'chai lat') == ["Chai Latte"]
+    assert names(client, 'steamed milk', category='tea') == ["Chai Latte"]
+
+
+@pytest.mark.parametrize('q, expected', [
+    ('capucino', 'Cappuccino'),
+    ('expresso', 'Espresso'),
+])
+def test_typos_fall_back_to_trigrams(client, q, expected):
+    with query_budget(2):
+        response = client.get('/api/products/search', query_string={"q": q})
+
+    body = response.get_json()
+    assert body["fuzzy"] is True
+    assert [p["name"] for p in body["products"]][0] == expected
+
+
+def test_query_syntax_is_not_interpreted(client):
+    for q in ('"latte', 'NEAR(latte', 'latte OR tea*', 'name:latte'):
+        assert client.get('/api/products/search', query_string={"q": q}).status_code == 200
+    assert client.get('/api/products/search?q=%20').status_code == 400
+
+
+def test_index_follows_product_writes(client, auth_headers):
+    client.put('/api/products/1', json={"name": "Ristretto"}, headers=auth_headers)
+    client.post('/api/products/', json={"name": "Flat White", "price": 3.5, "category": "coffee"},
+                headers=auth_headers)
+
+    assert names(client, 'ristr') == ["Ristretto"]
+    assert "Espresso" not in names(client, 'espresso')
+    assert names(client, 'flat') == ["Flat White"]
+
+
+def test_unavailable_and_deleted_products_are_hidden(client, auth_headers):
+    client.put('/api/products/2', json={"is_available": False}, headers=auth_headers)
+    client.delete('/api/products/3', headers=auth_headers)
+
+    assert names(client, 'cappuccino') == []
+    assert names(client, 'latte') == ["Chai Latte"]
+
+
+def test_reseeding_reindexes_the_menu(app):
+    seed_database(app, generate_images=False)
+
+    with app.app_context():
+        # The delete trigger removed the old products' entries, so each product is indexed once
+        indexed = db.session.execute(db.text("SELECT count(*) FROM product_search_docsize")).scalar()
+        assert indexed == Product.query.count()
+        assert search.search(db.session, 'latte', limit=1)[0][0]["name"] == "Latte"
@@ -0,0 +1,40 @@
+from sqlalchemy import func
+
+from models import db, User, Order, OrderItem, GiftCard
+from seed_data import generate_scale
+
+
+def snapshot():
+    return (
+        User.query.count(),
+        Order.query.count(),
+        OrderItem.query.count(),
+        GiftCard.query.count(),
+        db.session.query(func.sum(Order.total_amount), func.sum(Order.points_used)).one(),
+        db.session.query(func.sum(User.loyalty_points)).scalar(),
+        [(o.user_id, o.order_date, o.status) for o in Order.query.order_by(Order.id).limit(20)],
+    )
+
+
+def test_generate_scale_is_deterministic(app):
+    generate_scale(app, 2000, seed=7, days=30, batch_size=500)
+    with app.app_context():
+        first = snapshot()
+
+    generate_scale(app, 2000, seed=7, days=30, batch_size=500)
+    with app.app_context():
+        assert snapshot() == first
+        users, orders, items, gift_cards = first[:4]
+        assert (users, orders, gift_cards) == (100, 2000, 40)
+        assert items > orders
+
+
+def test_generate_scale_keeps_balances_consistent(app):
+    generate_scale(app, 1000, days=14, batch_size=300)
+    with app.app_context():
+        earned, used = db.session.query(func.sum(Order.points_earned), func.sum(Order.points_used)).one()
+        assert db.session.query(func.sum(User.loyalty_points)).scalar() == earned - used
+        assert db.session.query(func.min(User.loyalty_points)).scalar() >= 0
+        # Nothing before opening time or after closing
+        hours = {o.order_date.hour for o in Order.query}
+        assert min(hours) >= 7 and max(hours) <= 19
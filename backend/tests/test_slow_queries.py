@@ -0,0 +1,40 @@
+import pytest
+
+from slow_queries import fingerprint
+from tests.query_budget import query_budget
+
+
+@pytest.mark.parametrize('first, second', [
+    ("SELECT * FROM product WHERE id = 5 AND name = 'Latte'",
+     "SELECT * FROM product WHERE id = 42 AND name = 'Chai ''Special'''"),
+    ("SELECT * FROM product WHERE price > 3.5", "SELECT * FROM product WHERE price > 10"),
+    ("SELECT * FROM product WHERE id IN (?, ?, ?)", "SELECT * FROM product WHERE id IN (?)"),
+    ("SELECT * FROM product WHERE id IN (%(id_1_1)s, %(id_1_2)s)", "SELECT * FROM product WHERE id IN (%(id_1_1)s)"),
+    ("SELECT * FROM product WHERE id IN (1, 2, 3)", "SELECT * FROM product WHERE id IN (7)"),
+    ("SELECT *\n  FROM product\n WHERE id = ?", "SELECT * FROM product WHERE id = ?"),
+])
+def test_values_collapse_to_one_fingerprint(first, second):
+    assert fingerprint(first) == fingerprint(second)
+
+
+def test_fingerprint_keeps_the_statement_shape():
+    assert fingerprint("SELECT * FROM product WHERE id IN (1, 2) AND name = 'x'") == \
+        "SELECT * FROM product WHERE id IN (...) AND name = ?"
+    # Digits inside identifiers are not literals
+    assert fingerprint("SELECT product_1.id FROM product AS product_1") == "SELECT product_1.id FROM product AS product_1"
+    assert fingerprint("SELECT * FROM product WHERE id = ?") != fingerprint("SELECT * FROM customization WHERE id = ?")
+
+
+def test_plan_is_recorded_for_a_slow_select(app, client, auth_headers):
+    log = app.extensions['slow_queries']
+    log.threshold = 0
+    log.capture_plans = True
+
+    # EXPLAIN runs on the raw connection, so it is not counted as a query
+    with query_budget(2):
+        assert client.get('/api/products/1').status_code == 200
+
+    slow = client.get('/api/admin/slow-queries', headers=auth_headers).get_json()["slow_queries"]
+    product = next(entry for entry in slow if entry["fingerprint"].startswith("SELECT product.id"))
+    assert product["routes"] == {"products.get_product": 1}
+    assert any("product USING INTEGER PRIMARY KEY" in line for line in product["plan"])
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from app import create_app
+from seed_data import seed_database
+from tests.factories import make_user, auth_headers_for
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'cafe.db'}",
+        'SQLITE_CHECKPOINT_INTERVAL': 0,
+    })
+    seed_database(app, generate_images=False)
+    return app
+
+
+def write_lock_is_free(profile):
+    # The lock is re-entrant, so probe it from another thread
+    result = []
+
+    def probe():
+        acquired = profile._write_lock.acquire(blocking=False)
+        if acquired:
+            profile._write_lock.release()
+        result.append(acquired)
+
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_tuned_pragmas(file_app):
+    stats = file_app.extensions['sqlite_profile'].stats()
+
+    assert stats["enabled"]
+    assert stats["pragmas"]["journal_mode"] == 'wal'
+    assert stats["pragmas"]["busy_timeout"] == 5000
+    assert stats["pragmas"]["synchronous"] == 1  # NORMAL
+    assert stats["pragmas"]["temp_store"] == 2  # MEMORY
+
+
+def test_write_lock_released_after_commit_and_rollback(file_app):
+    profile = file_app.extensions['sqlite_profile']
+    client = file_app.test_client()
+    headers = auth_headers_for(file_app, make_user(file_app, 'alice'))
+
+    response = client.post('/api/orders/', json={"items": [{"product_id": 1}]}, headers=headers)
+    assert response.status_code == 201
+    assert write_lock_is_free(profile)
+
+    # Rejected before any write: the transaction is rolled back at teardown
+    response = client.post('/api/orders/', json={"items": [{"product_id": 999}]}, headers=headers)
+    assert response.status_code == 400
+    assert write_lock_is_free(profile)
+
+
+def test_checkpoint(file_app):
+    result = file_app.extensions['sqlite_profile'].checkpoint()
+
+    assert result["busy"] is False
+    assert result["log_frames"] == result["checkpointed_frames"]
+
+
+def test_default_profile_leaves_sqlite_alone(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'plain.db'}",
+        'SQLITE_PROFILE': 'default',
+    })
+    stats = app.extensions['sqlite_profile'].stats()
+
+    assert not stats["enabled"]
+    assert stats["pragmas"]["journal_mode"] == 'delete'
@@ -0,0 +1,38 @@
+import metrics
+import statements
+from tests.factories import add_orders
+
+
+def test_repeated_lookups_reuse_compiled_sql(app, client, user_id, auth_headers):
+    add_orders(app, user_id, 3)
+    paths = ['/api/products/1', '/api/orders/', '/api/orders/1', '/api/loyalty/points', '/api/gift-cards/']
+    for path in paths:
+        assert client.get(path, headers=auth_headers).status_code == 200
+
+    before = metrics.compiled_cache_counts()
+    for path in paths:
+        client.get(path, headers=auth_headers)
+    after = metrics.compiled_cache_counts()
+
+    assert after['miss'] == before['miss']
+    assert after['hit'] > before['hit']
+
+
+def test_lookups_return_instances_or_none(app, user_id):
+    with app.app_context():
+        assert statements.user(user_id).username == 'alice'
+        assert statements.user_by_email('alice@example.com').id == user_id
+        assert statements.product(999) is None
+        assert {p.id for p in statements.products_by_ids({1, 2, 999})} == {1, 2}
+        assert statements.table_by_number(2).table_number == 2
+
+
+def test_compiled_cache_stats(client, auth_headers):
+    client.get('/api/products/1')
+    client.get('/api/products/1')
+
+    stats = client.get('/api/admin/statements', headers=auth_headers).get_json()["compiled_cache"]
+
+    assert stats["hit"] > 0 and 0 < stats["hit_ratio"] <= 1
+    assert stats["entries"] > 0
+    assert 'cafe_db_compiled_cache_total{result="hit"}' in client.get('/metrics').get_data(as_text=True)
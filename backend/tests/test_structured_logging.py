@@ -0,0 +1,92 @@
+import logging
+
+import pytest
+
+import cache
+import structured_logging
+from structured_logging import REDACTED, RedactionFilter, SamplingFilter
+
+TOKEN = 'eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOjF9.c2lnbmF0dXJl'
+
+
+def record(name='routes.orders', level=logging.INFO, msg='message', args=None, **extra):
+    return logging.makeLogRecord(dict(extra, name=name, levelno=level, levelname=logging.getLevelName(level),
+                                      msg=msg, args=args))
+
+
+def test_redaction_covers_message_args_and_extra_fields():
+    entry = record(
+        msg=f'Authorization: Bearer {TOKEN} %s',
+        args=(f'token={TOKEN}',),
+        headers={'Authorization': 'Bearer abc', 'Cookie': 'session=1', 'X-Profile': 'secret', 'Accept': '*/*'},
+    )
+
+    assert RedactionFilter().filter(entry)
+
+    assert TOKEN not in entry.getMessage() and 'abc' not in entry.getMessage()
+    assert entry.msg == f'Authorization: Bearer {REDACTED} %s'
+    assert entry.args == (f'token={REDACTED}',)
+    assert entry.headers == {'Authorization': REDACTED, 'Cookie': REDACTED, 'X-Profile': REDACTED, 'Accept': '*/*'}
+
+
+def test_redaction_of_mapping_args():
+    entry = record(msg='%(auth)s', args={'auth': f'bearer {TOKEN}'})
+    RedactionFilter().filter(entry)
+
+    assert entry.getMessage() == f'bearer {REDACTED}'
+
+
+def test_sampling_uses_the_longest_matching_prefix():
+    sampling = SamplingFilter({'routes': 0.0, 'routes.orders': 1.0})
+
+    assert sampling.rate_for('routes.orders.detail') == 1.0
+    assert sampling.rate_for('routes.loyalty') == 0.0
+    assert sampling.rate_for('app') == 1.0
+    assert sampling.filter(record('routes.orders'))
+    assert not sampling.filter(record('routes.loyalty'))
+
+
+def test_sampling_keeps_warnings_and_request_dumps():
+    sampling = SamplingFilter({'': 0.0})
+
+    assert not sampling.filter(record(level=logging.INFO))
+    assert sampling.filter(record(level=logging.WARNING))
+    assert sampling.filter(record(level=logging.DEBUG, request_dump=True))
+
+
+def test_sampling_keeps_about_the_configured_share(monkeypatch):
+    sampling = SamplingFilter({'routes.orders': 0.25})
+    draws = iter(i / 100 for i in range(100))
+    monkeypatch.setattr(structured_logging.random, 'random', lambda: next(draws))
+
+    assert sum(sampling.filter(record()) for _ in range(100)) == 25
+
+
+@pytest.fixture
+def shared_cache(app, tmp_path):
+    path = str(tmp_path / 'cache.db')
+    app.config.update(CACHE_BACKEND='sqlite', CACHE_PATH=path)
+    cache.configure_cache(app)
+    yield path
+    app.config['CACHE_BACKEND'] = 'memory'
+    cache.configure_cache(app)
+
+
+def test_request_dump_switch_reaches_other_workers(app, client, auth_headers, shared_cache, caplog):
+    response = client.put('/api/admin/logging/request-dumps', json={"endpoint": "test_cors", "enabled": True},
+                          headers=auth_headers)
+    assert response.get_json()["logging"]["request_dumps"] == ["test_cors"]
+
+    # Another worker: its own connection to the same cache file
+    cache._backend = cache.SQLiteBackend(shared_cache)
+    assert structured_logging.request_dump_endpoints() == {"test_cors"}
+
+    with caplog.at_level(logging.DEBUG):
+        client.get('/api/test-cors', headers={'Authorization': f'Bearer {TOKEN}'})
+    dumps = [entry for entry in caplog.records if getattr(entry, 'request_dump', False)]
+    assert len(dumps) == 1
+
+    client.put('/api/admin/logging/request-dumps', json={"endpoint": "test_cors", "enabled": False},
+               headers=auth_headers)
+    cache._backend = cache.SQLiteBackend(shared_cache)
+    assert structured_logging.request_dump_endpoints() == frozenset()
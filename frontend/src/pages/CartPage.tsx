@@ -33,6 +33,7 @@ import {
 	LoyaltyOutlined as LoyaltyIcon,
 } from "@mui/icons-material";
 import { saveToCSVWithLocalStorageFallback } from "../utils/csvUtils";
+import { batchGet } from "../utils/axiosConfig";
 
 interface Product {
 	id: number;
@@ -51,6 +52,7 @@ const CartPage: React.FC = () => {
 		removeFromCart,
 		updateQuantity,
 		clearCart,
+		addToCart,
 		subtotal,
 		total,
 		usePoints,
@@ -62,6 +64,12 @@ const CartPage: React.FC = () => {
 	const [submitting, setSubmitting] = useState<boolean>(false);
 	const [tableNumber, setTableNumber] = useState<string>("");
 	const [error, setError] = useState<string | null>(null);
+	const [suggestions, setSuggestions] = useState<Product[]>([]);
+
+	// Distinct products in the cart, as a stable key for the suggestions effect
+	const cartProductIds = Array.from(
+		new Set(cartItems.map((item) => item.product_id))
+	).join(",");
 
 	// Load product details for cart items
 	useEffect(() => {
@@ -91,6 +99,54 @@ const CartPage: React.FC = () => {
 		}
 	}, [isAuthenticated, navigate]);
 
+	// Upsell: products often ordered with what is in the cart, served from the
+	// precomputed recommendation table in one batched round trip
+	useEffect(() => {
+		const ids = cartProductIds ? cartProductIds.split(",").map(Number) : [];
+		if (ids.length === 0) {
+			setSuggestions([]);
+			return;
+		}
+
+		let cancelled = false;
+		batchGet(ids.slice(0, 10).map((id) => `/api/products/${id}/recommendations?limit=3`))
+			.then((bodies) => {
+				// Rank by best position across the cart's products, skipping what is already in it
+				const scores = new Map<number, { product: Product; score: number }>();
+				bodies.forEach((body) => {
+					body.products.forEach((product: Product, position: number) => {
+						if (ids.includes(product.id)) return;
+						const score = (scores.get(product.id)?.score || 0) + 3 - position;
+						scores.set(product.id, { product, score });
+					});
+				});
+				if (!cancelled) {
+					setSuggestions(
+						Array.from(scores.values())
+							.sort((a, b) => b.score - a.score)
+							.slice(0, 3)
+							.map((entry) => entry.product)
+					);
+				}
+			})
+			.catch((error) => console.error("Error loading suggestions:", error));
+
+		return () => {
+			cancelled = true;
+		};
+	}, [cartProductIds]);
+
+	const handleAddSuggestion = (product: Product) => {
+		addToCart({
+			product_id: product.id,
+			quantity: 1,
+			customizations: {},
+			notes: "",
+			product,
+		});
+		toast.success(`${product.name} added to your cart`);
+	};
+
 	const handleCheckout = async () => {
 		if (cartItems.length === 0) {
 			toast.error("Your cart is empty");
@@ -420,6 +476,35 @@ const CartPage: React.FC = () => {
 								))}
 							</List>
 						</Paper>
+
+						{suggestions.length > 0 && (
+							<Paper elevation={2} sx={{ mt: 3, p: 3 }}>
+								<Typography variant="h6" gutterBottom>
+									Often ordered together
+								</Typography>
+								<List disablePadding>
+									{suggestions.map((product) => (
+										<ListItem
+											key={product.id}
+											disableGutters
+											secondaryAction={
+												<Button
+													size="small"
+													startIcon={<AddIcon />}
+													onClick={() => handleAddSuggestion(product)}
+													sx={{ color: "#5c3d2e" }}>
+													Add
+												</Button>
+											}>
+											<ListItemText
+												primary={product.name}
+												secondary={`$${product.price.toFixed(2)}`}
+											/>
+										</ListItem>
+									))}
+								</List>
+							</Paper>
+						)}
 					</Grid>
 
 					{/* Order Summary */}
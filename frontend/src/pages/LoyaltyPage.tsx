@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import { toast } from "react-toastify";
 import { useAuth } from "../contexts/AuthContext";
-import apiClient from "../utils/axiosConfig";
+import apiClient, { batchGet } from "../utils/axiosConfig";
 import {
 	Container,
 	Typography,
@@ -151,26 +151,26 @@ const LoyaltyPage: React.FC = () => {
 
 				try {
 					// Try to fetch data from the API first
-					const [pointsResponse, rewardsResponse] = await Promise.all([
-						apiClient.get(`/api/loyalty/points`),
-						apiClient.get(`/api/loyalty/rewards`)
+					const [pointsData, rewardsData] = await batchGet([
+						`/api/loyalty/points`,
+						`/api/loyalty/rewards`
 					]);
 
 					// Check if both responses were successful
 					const pointsSuccess =
-						pointsResponse.data && pointsResponse.data.success === true;
+						pointsData && pointsData.success === true;
 					const rewardsSuccess =
-						rewardsResponse.data && rewardsResponse.data.success === true;
+						rewardsData && rewardsData.success === true;
 
 					if (pointsSuccess && rewardsSuccess) {
 						// Set point history from API
-						if (pointsResponse.data.point_history) {
-							setPointHistory(pointsResponse.data.point_history);
+						if (pointsData.point_history) {
+							setPointHistory(pointsData.point_history);
 						}
 
 						// Set rewards from API
-						if (rewardsResponse.data.available_rewards) {
-							setRewards(rewardsResponse.data.available_rewards);
+						if (rewardsData.available_rewards) {
+							setRewards(rewardsData.available_rewards);
 						}
 
 						setUsingMockData(false);
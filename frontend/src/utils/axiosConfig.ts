@@ -1,4 +1,4 @@
-import axios, { AxiosError, AxiosRequestConfig, AxiosResponse } from 'axios';
+import axios, { AxiosError, AxiosInstance, AxiosRequestConfig, AxiosResponse } from 'axios';
 import { toast } from 'react-toastify';
 
 // Create a pre-configured axios instance for API calls
@@ -21,6 +21,31 @@ apiClient.interceptors.request.use((config: AxiosRequestConfig) => {
   return config;
 });
 
+// After a write the API returns X-Primary-Until (epoch seconds): until then our reads must skip
+// the read replica so they see the write. Cookies are not sent cross-origin, so we echo it ourselves.
+const PRIMARY_UNTIL_KEY = 'primaryUntil';
+
+const trackPrimaryPin = (instance: AxiosInstance) => {
+  instance.interceptors.request.use((config: AxiosRequestConfig) => {
+    const primaryUntil = Number(sessionStorage.getItem(PRIMARY_UNTIL_KEY) || 0);
+    if (primaryUntil > Date.now() / 1000 && config.headers) {
+      config.headers['X-Primary-Until'] = String(primaryUntil);
+    }
+    return config;
+  });
+  instance.interceptors.response.use((response: AxiosResponse) => {
+    const until = Number(response.headers?.['x-primary-until']);
+    if (until > Number(sessionStorage.getItem(PRIMARY_UNTIL_KEY) || 0)) {
+      sessionStorage.setItem(PRIMARY_UNTIL_KEY, String(until));
+    }
+    return response;
+  });
+};
+
+// Most pages call the global axios instance directly, so it carries the pin too
+trackPrimaryPin(axios);
+trackPrimaryPin(apiClient);
+
 // Add response interceptor to handle common errors
 apiClient.interceptors.response.use(
   (response: AxiosResponse) => response,
@@ -62,4 +87,35 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Bodies of earlier batched GETs by path. The browser cache never sees inside /api/batch,
+// so batchGet revalidates them itself with If-None-Match and reuses the body on a 304.
+const batchCache = new Map<string, { etag: string; body: any }>();
+
+// Fetch several GET endpoints in one round trip via /api/batch; resolves to their bodies in order
+export const batchGet = async (paths: string[]): Promise<any[]> => {
+  const response = await apiClient.post('/api/batch', {
+    requests: paths.map((path) => {
+      const cached = batchCache.get(path);
+      return cached
+        ? { method: 'GET', path, headers: { 'If-None-Match': cached.etag } }
+        : { method: 'GET', path };
+    }),
+  });
+  return response.data.responses.map(
+    (result: { status: number; headers: Record<string, string>; body: any }, index: number) => {
+      const path = paths[index];
+      if (result.status === 304) {
+        return batchCache.get(path)?.body;
+      }
+      if (result.status >= 400) {
+        throw new Error(`${path} failed with status ${result.status}`);
+      }
+      if (result.headers.ETag) {
+        batchCache.set(path, { etag: result.headers.ETag, body: result.body });
+      }
+      return result.body;
+    }
+  );
+};
+
 export default apiClient; 
\ No newline at end of file